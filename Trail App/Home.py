@@ -1,4 +1,5 @@
 import streamlit as st
+import bootstrap
 
 # Set the page configuration
 st.set_page_config(
@@ -7,6 +8,9 @@ st.set_page_config(
     layout="wide"
 )
 
+# Build the shared resources in the background while the visitor reads this page
+bootstrap.start_warm_up()
+
 # Main page content
 st.title("🌍 Welcome to the EcoTrail App")
 st.markdown(
@@ -0,0 +1,207 @@
+"""Batch report generation for patrol photo folders.
+
+Photos (loose, in a zip, or a directory) are ingested and described concurrently with
+bounded parallelism, yielding each one as it finishes, so a batch takes about as long as
+its slowest photo instead of the sum. The reports are then exported as one merged PDF or
+a zip with one PDF per photo.
+
+Usage (from the repository root):
+    python "Trail App/batch_reports.py" patrol/ --location "San Jose" --pdf patrol.pdf
+    python "Trail App/batch_reports.py" patrol.zip --location "Los Gatos" --zip reports.zip --stub
+"""
+import argparse
+import datetime
+import io
+import os
+import sys
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import report_pipeline
+import telemetry
+
+PHOTO_EXTENSIONS = (".jpg", ".jpeg", ".png")
+MAX_PHOTOS = 200
+MAX_PHOTO_BYTES = 25 * 1024 * 1024
+MAX_BATCH_BYTES = 512 * 1024 * 1024  # uncompressed photo bytes in one batch
+DEFAULT_WORKERS = 8
+
+
+class BatchItem:
+    __slots__ = ("name", "photo", "description", "duplicate", "jpeg", "seconds", "error")
+
+    def __init__(self, name, photo):
+        self.name = name
+        self.photo = photo
+        self.description = None
+        self.duplicate = None
+        self.jpeg = None
+        self.seconds = None
+        self.error = None
+
+
+def is_photo(name):
+    base = os.path.basename(name)
+    return base.lower().endswith(PHOTO_EXTENSIONS) and not base.startswith(".") and "__MACOSX" not in name
+
+
+def _check_limits(count, size):
+    if count > MAX_PHOTOS:
+        raise ValueError(f"A batch can hold at most {MAX_PHOTOS} photos ({count} given)")
+    if size > MAX_BATCH_BYTES:
+        raise ValueError(f"A batch can hold at most {MAX_BATCH_BYTES // 2 ** 20} MB of photos "
+                         f"({size // 2 ** 20} MB given)")
+
+
+def photos_from_zip(data, count=0, size=0):
+    """(name, bytes) for every photo in a zip archive, skipping oversized members.
+
+    The limits are checked against the archive's directory before anything is decompressed;
+    `count` and `size` are the photos and bytes already in the batch.
+    """
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        members = [
+            info for info in archive.infolist()
+            if not info.is_dir() and is_photo(info.filename) and info.file_size <= MAX_PHOTO_BYTES
+        ]
+        _check_limits(count + len(members), size + sum(info.file_size for info in members))
+        return [(info.filename, archive.read(info)) for info in members]
+
+
+def collect(files):
+    """Expand (name, bytes) uploads, unpacking zips, into at most MAX_PHOTOS BatchItems."""
+    items, size = [], 0
+    for name, data in files:
+        if name.lower().endswith(".zip"):
+            photos = photos_from_zip(data, len(items), size)
+        elif is_photo(name) and len(data) <= MAX_PHOTO_BYTES:
+            photos = [(name, data)]
+        else:
+            continue
+        items += [BatchItem(n, d) for n, d in photos]
+        size += sum(len(d) for _, d in photos)
+        _check_limits(len(items), size)
+    return items
+
+
+def collect_directory(path):
+    """BatchItems for the photos in a directory (or a zip file), in name order."""
+    if os.path.isfile(path):
+        with open(path, "rb") as f:
+            return collect([(os.path.basename(path), f.read())])
+    files = []
+    for name in sorted(os.listdir(path)):
+        full = os.path.join(path, name)
+        if os.path.isfile(full):
+            with open(full, "rb") as f:
+                files.append((name, f.read()))
+    return collect(files)
+
+
+def analyze_batch(client, index, items, location, comments="", workers=DEFAULT_WORKERS):
+    """Analyze every item concurrently; yields each BatchItem as soon as it is done."""
+    def run(item):
+        start = time.perf_counter()
+        try:
+            with telemetry.span(report_pipeline.FEATURE, "batch_item"):
+                ingested, item.description, item.duplicate = report_pipeline.analyze(
+                    client, index, location, comments, item.photo
+                )
+            item.jpeg = ingested.jpeg
+        except Exception as e:
+            item.error = f"{type(e).__name__}: {e}"
+        item.photo = None  # the ingested JPEG is all the export needs
+        item.seconds = time.perf_counter() - start
+        return item
+
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(items)))) as pool:
+        for future in as_completed([pool.submit(run, item) for item in items]):
+            yield future.result()
+
+
+def _report(item, location, comments, date):
+    return {"location": location, "description": item.description, "comments": comments,
+            "photo": item.jpeg, "date": date}
+
+
+def export_pdf(renderer, items, location, comments="", date=None):
+    """One PDF with a page per successfully analyzed photo, in upload order."""
+    date = date or datetime.datetime.now()
+    with telemetry.span(report_pipeline.FEATURE, "batch_pdf"):
+        return renderer.render_many([_report(item, location, comments, date) for item in items if not item.error])
+
+
+def export_zip(renderer, items, location, comments="", date=None):
+    """A zip with one PDF per successfully analyzed photo, named after the photo."""
+    date = date or datetime.datetime.now()
+    buffer = io.BytesIO()
+    with telemetry.span(report_pipeline.FEATURE, "batch_zip"), \
+            zipfile.ZipFile(buffer, "w", zipfile.ZIP_STORED) as archive:  # PDFs are already compressed
+        names = set()
+        for item in items:
+            if not item.error:
+                stem = name = os.path.splitext(os.path.basename(item.name))[0]
+                suffix = 1
+                while name in names:  # same file name in two folders of a zip
+                    suffix += 1
+                    name = f"{stem}_{suffix}"
+                names.add(name)
+                archive.writestr(name + ".pdf", renderer.render(**_report(item, location, comments, date)))
+    return buffer.getvalue()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("source", help="directory of photos, or a zip of them")
+    parser.add_argument("--location", required=True, help="where the photos were taken")
+    parser.add_argument("--comments", default="", help="comments added to every report")
+    parser.add_argument("--pdf", help="write one merged PDF here")
+    parser.add_argument("--zip", help="write a zip of per-photo PDFs here")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="photos processed at once")
+    parser.add_argument("--stub", action="store_true", help="use the offline stub model client")
+    args = parser.parse_args(argv)
+    if not args.pdf and not args.zip:
+        parser.error("give --pdf, --zip or both")
+
+    from model_client import SharedClient
+    from report_index import ReportIndex
+    from report_renderer import ReportRenderer
+    if args.stub:
+        from stub_client import StubClient
+        client = SharedClient(StubClient())
+    else:
+        from model_client import make_openai_client
+        from prebuild import load_api_key
+        client = SharedClient(make_openai_client(load_api_key()))
+
+    items = collect_directory(args.source)
+    if not items:
+        print(f"No photos found in {args.source}")
+        return 1
+    start = time.perf_counter()
+    for done, item in enumerate(analyze_batch(client, ReportIndex(), items, args.location, args.comments,
+                                              args.workers), start=1):
+        status = f"✗ {item.error}" if item.error else ("duplicate" if item.duplicate else "analyzed")
+        print(f"[{done}/{len(items)}] {item.name}: {status} in {item.seconds:.1f}s")
+    elapsed = time.perf_counter() - start
+    slowest = max(item.seconds for item in items)
+    failed = sum(1 for item in items if item.error)
+    if failed == len(items):
+        print(f"No reports generated: all {failed} photos failed")
+        return 1
+
+    renderer = ReportRenderer()
+    if args.pdf:
+        with open(args.pdf, "wb") as f:
+            f.write(export_pdf(renderer, items, args.location, args.comments))
+    if args.zip:
+        with open(args.zip, "wb") as f:
+            f.write(export_zip(renderer, items, args.location, args.comments))
+    print(f"✅ {len(items) - failed} reports in {elapsed:.1f}s (slowest photo {slowest:.1f}s, "
+          f"sum {sum(item.seconds for item in items):.1f}s); {failed} failed")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
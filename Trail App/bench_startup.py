@@ -0,0 +1,124 @@
+"""Benchmark cold start and per-rerun time of the app pages.
+
+Import time is measured in fresh interpreters, so every run is a true cold import. Each page
+is then run headless with streamlit.testing.v1.AppTest (stub model, no network): once from a
+cold process-wide cache, then rerun the way Streamlit reruns it on every interaction.
+
+Usage (from the repository root):
+    python "Trail App/bench_startup.py"
+    python "Trail App/bench_startup.py" --output startup.json
+    python "Trail App/bench_startup.py" --compare startup.json   # exit 1 on a regression
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+PAGES = ("Home.py", "pages/1_VirtualTrails.py", "pages/2_ReportSubmission.py", "pages/3_EcoActionsTracker.py",
+         "pages/4_LatencyDashboard.py")
+# What the pages import at top level, and the heavy libraries that should now load only on use
+IMPORTS = ("streamlit", "resources", "bootstrap", "trail_content", "trail_assets", "image_cache",
+           "openai", "PIL.Image", "fpdf", "pandas")
+REGRESSION_TOLERANCE = 0.25  # fraction slower than the baseline before --compare fails
+
+IMPORT_SNIPPET = """
+import sys, time
+sys.path.insert(0, {app_dir!r})
+start = time.perf_counter()
+try:
+    import {module}
+except ImportError:
+    print("nan")
+else:
+    print(time.perf_counter() - start)
+"""
+
+
+def import_time(module, repeat):
+    """Median seconds to import `module` into a fresh interpreter (nan if it is not installed)."""
+    samples = []
+    for _ in range(repeat):
+        out = subprocess.run(
+            [sys.executable, "-c", IMPORT_SNIPPET.format(app_dir=APP_DIR, module=module)],
+            capture_output=True, text=True, check=True,
+        ).stdout
+        samples.append(float(out.strip().splitlines()[-1]))
+    return statistics.median(samples)
+
+
+def page_times(page, reruns):
+    """(first run, median rerun, p95 rerun) seconds for one page."""
+    from streamlit.testing.v1 import AppTest
+
+    app = AppTest.from_file(os.path.join(APP_DIR, page), default_timeout=60)
+    app.secrets["stub_model"] = True
+    app.secrets["openai_api_key"] = "bench"
+    start = time.perf_counter()
+    app.run()
+    first = time.perf_counter() - start
+    if app.exception:
+        raise RuntimeError(f"{page} raised: {app.exception[0].message}")
+    samples = []
+    for _ in range(reruns):
+        start = time.perf_counter()
+        app.run()
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    return first, statistics.median(samples), samples[int(len(samples) * 0.95) - 1]
+
+
+def benchmark(repeat, reruns):
+    results = {"imports": {}, "pages": {}}
+    for module in IMPORTS:
+        results["imports"][module] = import_time(module, repeat)
+        print(f"import {module:<14} {results['imports'][module] * 1000:8.1f} ms")
+
+    sys.path.insert(0, APP_DIR)
+    for page in PAGES:
+        first, median, p95 = page_times(page, reruns)
+        results["pages"][page] = {"first": first, "rerun": median, "rerun_p95": p95}
+        print(f"{page:<30} first {first * 1000:8.1f} ms · rerun {median * 1000:6.1f} ms (p95 {p95 * 1000:.1f} ms)")
+    return results
+
+
+def regressions(results, baseline, tolerance=REGRESSION_TOLERANCE):
+    """Lines describing every measurement more than `tolerance` slower than the baseline."""
+    pairs = [(f"import {m}", t, baseline["imports"].get(m)) for m, t in results["imports"].items()]
+    pairs += [(f"{p} {k}", v, baseline["pages"].get(p, {}).get(k))
+              for p, times in results["pages"].items() for k, v in times.items()]
+    return [
+        f"{name}: {old * 1000:.1f} ms -> {new * 1000:.1f} ms"
+        for name, new, old in pairs
+        if old and new == new and new > old * (1 + tolerance)  # new == new skips nan
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5, help="fresh interpreters per import measurement")
+    parser.add_argument("--reruns", type=int, default=20, help="reruns timed per page")
+    parser.add_argument("--output", help="write the results as JSON")
+    parser.add_argument("--compare", help="baseline JSON from an earlier --output run")
+    args = parser.parse_args()
+
+    results = benchmark(args.repeat, args.reruns)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            slower = regressions(results, json.load(f))
+        for line in slower:
+            print(f"✗ slower than baseline: {line}")
+        if slower:
+            return 1
+        print("✅ No regressions against the baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
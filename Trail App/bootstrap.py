@@ -0,0 +1,52 @@
+import logging
+import threading
+import time
+
+import streamlit as st
+
+import resources
+
+# Start-up hook shared by every page.
+# The first script run in a fresh process starts a background thread that builds the shared
+# resources (catalog, image manifest, stores, model client, PDF fonts, workers), so the
+# imports and setup they need are done before a visitor opens the page that uses them.
+# The thread has no script-run context of its own (it must not borrow the first visitor's),
+# so the warmed getters are declared with show_spinner=False and never touch the page.
+
+log = logging.getLogger(__name__)
+
+WARM_UP_STEPS = (
+    ("trail catalog", resources.get_trail_catalog),
+    ("trail images", resources.get_trail_image_manifest),
+    ("content store", resources.get_content_store),
+    ("response cache", resources.get_response_cache),
+    ("trail search", resources.get_trail_search),  # embeds whatever was generated since the last run
+    ("model client", resources.get_client),
+    ("report queue", resources.get_report_queue),  # also the report index and the PDF renderer's fonts
+    ("eco ledger", resources.get_eco_ledger),
+    ("session store", resources.get_session_store),
+    ("image cache", resources.get_image_cache),
+    ("telemetry", resources.get_telemetry),
+)
+
+
+def warm_up(steps=WARM_UP_STEPS):
+    """Build every shared resource; returns {step: seconds}. Failures are logged, not raised."""
+    timings = {}
+    for name, getter in steps:
+        start = time.perf_counter()
+        try:
+            getter()
+        except Exception:
+            log.exception("Warm-up step %r failed; it will be retried on first use", name)
+        timings[name] = time.perf_counter() - start
+    log.info("Warm-up finished in %.2fs", sum(timings.values()))
+    return timings
+
+
+@st.cache_resource
+def start_warm_up():
+    """Warm up once per process, in the background so the first page is not held up."""
+    thread = threading.Thread(target=warm_up, name="warm-up", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,126 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# Versioned local store for prebuilt trail content.
+# A prebuild writes a new version and only publishes it once every trail has been
+# written and validated, so pages always read a complete, consistent snapshot.
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_STORE_PATH = os.path.join(APP_DIR, "build", "trail_content.sqlite3")
+
+
+class ContentStore:
+    def __init__(self, path=DEFAULT_STORE_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn().executescript(
+            """
+            CREATE TABLE IF NOT EXISTS builds (
+                version INTEGER PRIMARY KEY AUTOINCREMENT,
+                status TEXT NOT NULL,
+                created REAL NOT NULL,
+                published REAL,
+                note TEXT
+            );
+            CREATE TABLE IF NOT EXISTS content (
+                version INTEGER NOT NULL,
+                trail TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                item TEXT NOT NULL DEFAULT '',
+                body TEXT NOT NULL,
+                PRIMARY KEY (version, trail, kind, item)
+            );
+            """
+        )
+        self._active = None
+        self._active_checked = 0.0
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    # --- Build side ---
+    def begin_build(self, note=""):
+        cur = self._conn().execute(
+            "INSERT INTO builds (status, created, note) VALUES ('building', ?, ?)", (time.time(), note)
+        )
+        return cur.lastrowid
+
+    def put(self, version, trail, kind, body, item=""):
+        with self._lock:
+            self._conn().execute(
+                "INSERT OR REPLACE INTO content (version, trail, kind, item, body) VALUES (?, ?, ?, ?, ?)",
+                (version, trail, kind, item, json.dumps(body)),
+            )
+
+    def publish(self, version):
+        self._conn().execute(
+            "UPDATE builds SET status = 'published', published = ? WHERE version = ?", (time.time(), version)
+        )
+        self._active = None
+
+    def fail(self, version, note):
+        self._conn().execute("UPDATE builds SET status = 'failed', note = ? WHERE version = ?", (note, version))
+
+    def prune(self, keep=3):
+        """Drop content from all but the newest `keep` published versions."""
+        conn = self._conn()
+        keep_versions = [row[0] for row in conn.execute(
+            "SELECT version FROM builds WHERE status = 'published' ORDER BY version DESC LIMIT ?", (keep,)
+        )]
+        if not keep_versions:
+            return
+        marks = ",".join("?" * len(keep_versions))
+        conn.execute(f"DELETE FROM content WHERE version NOT IN ({marks})", keep_versions)
+        conn.execute(f"DELETE FROM builds WHERE version NOT IN ({marks}) AND status != 'building'", keep_versions)
+
+    # --- Read side ---
+    def active_version(self):
+        # Re-check for a newer published build at most every few seconds.
+        now = time.time()
+        if self._active is None or now - self._active_checked > 5:
+            row = self._conn().execute(
+                "SELECT MAX(version) FROM builds WHERE status = 'published'"
+            ).fetchone()
+            self._active = row[0]
+            self._active_checked = now
+        return self._active
+
+    def get(self, trail, kind, item=""):
+        version = self.active_version()
+        if version is None:
+            return None
+        row = self._conn().execute(
+            "SELECT body FROM content WHERE version = ? AND trail = ? AND kind = ? AND item = ?",
+            (version, trail, kind, item),
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get_overview(self, trail):
+        return self.get(trail, "overview")
+
+    def get_stops(self, trail):
+        return self.get(trail, "stops")
+
+    def get_stop_detail(self, trail, stop_name):
+        return self.get(trail, "stop", stop_name)
+
+    def items(self, kinds=("overview", "stop")):
+        """(trail, kind, item, body) for every entry of these kinds in the published build."""
+        version = self.active_version()
+        if version is None:
+            return []
+        marks = ",".join("?" * len(kinds))
+        rows = self._conn().execute(
+            f"SELECT trail, kind, item, body FROM content WHERE version = ? AND kind IN ({marks})", (version, *kinds)
+        )
+        return [(trail, kind, item, json.loads(body)) for trail, kind, item, body in rows]
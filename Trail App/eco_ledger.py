@@ -0,0 +1,191 @@
+import bisect
+import os
+import queue
+import secrets
+import sqlite3
+import threading
+import time
+
+import eco_rollups
+
+# Persistent EcoPoints ledger.
+# Every logged action is appended to `events`; `totals` holds each user's running sum and
+# is updated in the same transaction, so reading a total is a single primary-key lookup.
+# Writes from all sessions go through one writer thread that commits them in batches.
+# User ids double as the key to a visitor's points (they travel in the URL), so they are
+# never shown to others: each user gets a random public handle for the leaderboard.
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_LEDGER_PATH = os.path.join(APP_DIR, "data", "eco_ledger.sqlite3")
+BATCH_SIZE = 500
+HANDLE_WORDS = ("Fern", "Heron", "Oak", "Otter", "Quail", "Sage", "Salmon", "Willow", "Bobcat", "Poppy",
+                "Egret", "Alder", "Coyote", "Manzanita", "Newt", "Redwood")
+
+
+class BadgeLevels:
+    """Badge thresholds kept as a sorted array, so lookups are a bisect."""
+
+    def __init__(self, levels):
+        ordered = sorted(levels.items(), key=lambda item: item[1])
+        self.names = [name for name, _ in ordered]
+        self.thresholds = [threshold for _, threshold in ordered]
+
+    def earned(self, points):
+        return self.names[:bisect.bisect_right(self.thresholds, points)]
+
+    def next(self, points):
+        """Return (badge, points still needed), or None once every badge is earned."""
+        i = bisect.bisect_right(self.thresholds, points)
+        if i == len(self.thresholds):
+            return None
+        return self.names[i], self.thresholds[i] - points
+
+
+def new_handle():
+    """A random public name such as 'Heron 4821', unrelated to the user id."""
+    return f"{secrets.choice(HANDLE_WORDS)} {secrets.randbelow(9000) + 1000}"
+
+
+class _Write:
+    def __init__(self, user, actions, trail):
+        self.user = user
+        self.actions = actions
+        self.trail = trail
+        self.done = threading.Event()
+        self.error = None
+
+
+class EcoLedger:
+    def __init__(self, path=DEFAULT_LEDGER_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._writes = queue.Queue()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn().executescript(
+            """
+            CREATE TABLE IF NOT EXISTS events (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user TEXT NOT NULL,
+                action TEXT NOT NULL,
+                points INTEGER NOT NULL,
+                created REAL NOT NULL,
+                trail TEXT
+            );
+            CREATE INDEX IF NOT EXISTS events_user ON events (user, id);
+            CREATE TABLE IF NOT EXISTS totals (
+                user TEXT PRIMARY KEY,
+                points INTEGER NOT NULL,
+                actions INTEGER NOT NULL,
+                updated REAL NOT NULL,
+                handle TEXT
+            );
+            """
+            + eco_rollups.SCHEMA
+        )
+        # Ledgers created before trails and rollups were tracked
+        if "trail" not in {row[1] for row in self._conn().execute("PRAGMA table_info(events)")}:
+            self._conn().execute("ALTER TABLE events ADD COLUMN trail TEXT")
+            self.rebuild_rollups()
+        # ... and before users had public handles
+        if "handle" not in {row[1] for row in self._conn().execute("PRAGMA table_info(totals)")}:
+            self._conn().execute("ALTER TABLE totals ADD COLUMN handle TEXT")
+        users = [user for (user,) in self._conn().execute("SELECT user FROM totals WHERE handle IS NULL")]
+        if users:
+            self._conn().executemany("UPDATE totals SET handle = ? WHERE user = ?", [(new_handle(), u) for u in users])
+        threading.Thread(target=self._writer, name="eco-ledger-writer", daemon=True).start()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def record(self, user, actions, trail=None):
+        """Append `actions` (a list of (action, points)) for `user`; returns once committed."""
+        write = _Write(user, actions, trail)
+        self._writes.put(write)
+        write.done.wait()
+        if write.error is not None:
+            raise write.error
+        return sum(points for _, points in actions)
+
+    def _writer(self):
+        conn = self._conn()
+        while True:
+            # Group commit: everything queued while the previous batch was committing goes together
+            batch = [self._writes.get()]
+            while len(batch) < BATCH_SIZE:
+                try:
+                    batch.append(self._writes.get_nowait())
+                except queue.Empty:
+                    break
+            self._commit(conn, batch)
+
+    def _commit(self, conn, batch):
+        now = time.time()
+        events = [(w.user, action, points, now, w.trail) for w in batch for action, points in w.actions]
+        totals = {}
+        for w in batch:
+            points, count = totals.get(w.user, (0, 0))
+            totals[w.user] = (points + sum(p for _, p in w.actions), count + len(w.actions))
+        error = None
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany(
+                "INSERT INTO events (user, action, points, created, trail) VALUES (?, ?, ?, ?, ?)", events
+            )
+            eco_rollups.apply(conn, events)
+            conn.executemany(
+                "INSERT INTO totals (user, points, actions, updated, handle) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (user) DO UPDATE SET points = points + excluded.points, "
+                "actions = actions + excluded.actions, updated = excluded.updated",
+                [(user, points, count, now, new_handle()) for user, (points, count) in totals.items()],
+            )
+            conn.execute("COMMIT")
+        except Exception as e:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            error = e
+        for w in batch:
+            w.error = error
+            w.done.set()
+
+    def total(self, user):
+        row = self._conn().execute("SELECT points FROM totals WHERE user = ?", (user,)).fetchone()
+        return row[0] if row else 0
+
+    def handle(self, user):
+        """The user's public handle, or None before they have logged anything."""
+        row = self._conn().execute("SELECT handle FROM totals WHERE user = ?", (user,)).fetchone()
+        return row[0] if row else None
+
+    def history(self, user, limit=20):
+        """The user's most recent actions, newest first."""
+        return self._conn().execute(
+            "SELECT action, points, created FROM events WHERE user = ? ORDER BY id DESC LIMIT ?", (user, limit)
+        ).fetchall()
+
+    # --- Community aggregates (served from the rollups, see eco_rollups) ---
+    def leaderboard(self, k=10, period="week"):
+        """(user, handle, points) for the top `k` users; show the handle, not the user id."""
+        top = eco_rollups.top_users(self._conn(), period, k=k)
+        placeholders = ",".join("?" * len(top))
+        handles = dict(self._conn().execute(
+            f"SELECT user, handle FROM totals WHERE user IN ({placeholders})", [user for user, _ in top]
+        )) if top else {}
+        return [(user, handles.get(user) or "Anonymous hiker", points) for user, points in top]
+
+    def action_totals(self, period="week"):
+        return eco_rollups.action_totals(self._conn(), period)
+
+    def action_trend(self, action, period="day", since=None):
+        return eco_rollups.action_trend(self._conn(), action, period, since=since)
+
+    def trail_totals(self, action):
+        return eco_rollups.trail_totals(self._conn(), action)
+
+    def rebuild_rollups(self):
+        eco_rollups.backfill(self._conn())
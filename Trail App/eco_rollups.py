@@ -0,0 +1,139 @@
+import datetime
+
+# Aggregates over the EcoPoints ledger, kept up to date as events are committed.
+# Rollups are bucketed per day, per ISO week and over all time, per action and trail,
+# and per user for the leaderboard. The (period, bucket, points) index makes a top-K
+# query an index walk of K rows however many events there are.
+
+PERIODS = ("day", "week", "all")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS rollup_actions (
+    period TEXT NOT NULL,
+    bucket TEXT NOT NULL,
+    action TEXT NOT NULL,
+    trail TEXT NOT NULL,
+    points INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (period, bucket, action, trail)
+);
+CREATE TABLE IF NOT EXISTS rollup_users (
+    period TEXT NOT NULL,
+    bucket TEXT NOT NULL,
+    user TEXT NOT NULL,
+    points INTEGER NOT NULL,
+    PRIMARY KEY (period, bucket, user)
+);
+CREATE INDEX IF NOT EXISTS rollup_users_top ON rollup_users (period, bucket, points DESC);
+"""
+
+UPSERT_ACTIONS = (
+    "INSERT INTO rollup_actions (period, bucket, action, trail, points, count) VALUES (?, ?, ?, ?, ?, ?) "
+    "ON CONFLICT (period, bucket, action, trail) DO UPDATE SET "
+    "points = points + excluded.points, count = count + excluded.count"
+)
+UPSERT_USERS = (
+    "INSERT INTO rollup_users (period, bucket, user, points) VALUES (?, ?, ?, ?) "
+    "ON CONFLICT (period, bucket, user) DO UPDATE SET points = points + excluded.points"
+)
+
+
+def bucket(period, when):
+    """Bucket label for a timestamp (or datetime): '2026-10-17', '2026-W42' or ''.
+
+    Timestamps are bucketed in UTC so every server agrees on the boundaries.
+    """
+    if not isinstance(when, datetime.datetime):
+        when = datetime.datetime.fromtimestamp(when, datetime.timezone.utc)
+    if period == "day":
+        return when.strftime("%Y-%m-%d")
+    if period == "week":
+        year, week, _ = when.isocalendar()
+        return f"{year}-W{week:02d}"
+    return ""
+
+
+def apply(conn, events):
+    """Fold (user, action, points, created, trail) events into the rollups; call inside the write transaction."""
+    actions, users = {}, {}
+    for user, action, points, created, trail in events:
+        for period in PERIODS:
+            label = bucket(period, created)
+            key = (period, label, action, trail or "")
+            total, count = actions.get(key, (0, 0))
+            actions[key] = (total + points, count + 1)
+            users[(period, label, user)] = users.get((period, label, user), 0) + points
+    conn.executemany(UPSERT_ACTIONS, [(*key, points, count) for key, (points, count) in actions.items()])
+    conn.executemany(UPSERT_USERS, [(*key, points) for key, points in users.items()])
+
+
+def backfill(conn):
+    """Rebuild every rollup from the raw events with vectorized pandas group-bys."""
+    import pandas as pd
+
+    events = pd.read_sql_query("SELECT user, action, points, created, trail FROM events", conn)
+    when = pd.to_datetime(events["created"], unit="s")
+    iso = when.dt.isocalendar()
+    labels = {
+        "day": when.dt.strftime("%Y-%m-%d"),
+        "week": iso["year"].astype(str) + "-W" + iso["week"].astype(str).str.zfill(2),
+        "all": pd.Series("", index=events.index),
+    }
+    events["trail"] = events["trail"].fillna("")
+
+    action_rows, user_rows = [], []
+    for period, label in labels.items():
+        framed = events.assign(period=period, bucket=label)
+        by_action = framed.groupby(["period", "bucket", "action", "trail"], as_index=False).agg(
+            points=("points", "sum"), count=("points", "size")
+        )
+        by_user = framed.groupby(["period", "bucket", "user"], as_index=False)["points"].sum()
+        action_rows += by_action.to_numpy(dtype=object).tolist()
+        user_rows += by_user.to_numpy(dtype=object).tolist()
+
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute("DELETE FROM rollup_actions")
+        conn.execute("DELETE FROM rollup_users")
+        conn.executemany(UPSERT_ACTIONS, action_rows)
+        conn.executemany(UPSERT_USERS, user_rows)
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+
+def top_users(conn, period="week", label=None, k=10):
+    label = bucket(period, datetime.datetime.now(datetime.timezone.utc)) if label is None else label
+    return conn.execute(
+        "SELECT user, points FROM rollup_users WHERE period = ? AND bucket = ? ORDER BY points DESC LIMIT ?",
+        (period, label, k),
+    ).fetchall()
+
+
+def action_totals(conn, period="week", label=None):
+    """(action, count, points) for one bucket, summed over trails."""
+    label = bucket(period, datetime.datetime.now(datetime.timezone.utc)) if label is None else label
+    return conn.execute(
+        "SELECT action, SUM(count), SUM(points) FROM rollup_actions WHERE period = ? AND bucket = ? "
+        "GROUP BY action ORDER BY SUM(count) DESC",
+        (period, label),
+    ).fetchall()
+
+
+def action_trend(conn, action, period="day", since=None):
+    """(bucket, count) for `action` from bucket `since` onwards, oldest first."""
+    return conn.execute(
+        "SELECT bucket, SUM(count) FROM rollup_actions WHERE period = ? AND action = ? AND bucket >= ? "
+        "GROUP BY bucket ORDER BY bucket",
+        (period, action, since or ""),
+    ).fetchall()
+
+
+def trail_totals(conn, action):
+    """(trail, count) for `action` over all time, busiest trail first."""
+    return conn.execute(
+        "SELECT trail, count FROM rollup_actions WHERE period = 'all' AND bucket = '' AND action = ? AND trail != '' "
+        "ORDER BY count DESC",
+        (action,),
+    ).fetchall()
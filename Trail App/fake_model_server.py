@@ -0,0 +1,147 @@
+"""Local stand-in for the OpenAI API, for load tests and offline runs of the app.
+
+Serves POST /v1/chat/completions (plain and streamed as server-sent events) and
+POST /v1/images/generations with the same deterministic content as stub_client, after a
+configurable delay, so the app's real HTTP client, pooling and retries are exercised
+without an API key. Point the app at it with the `openai_base_url` secret.
+
+Usage (from the repository root):
+    python "Trail App/fake_model_server.py" --port 8765 --latency 0.8 --token-delay 0.02
+"""
+import argparse
+import json
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from stub_client import StubClient, respond
+
+DEFAULT_PORT = 8765
+
+
+class LatencyProfile:
+    """How slow the fake model is: a base delay with jitter, plus a delay per streamed token."""
+
+    def __init__(self, latency=0.5, jitter=0.2, token_delay=0.01, image_latency=5.0, error_rate=0.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.token_delay = token_delay
+        self.image_latency = image_latency
+        self.error_rate = error_rate
+
+    def wait(self, base):
+        time.sleep(max(0.0, base * (1 + random.uniform(-self.jitter, self.jitter))))
+
+    def fail(self):
+        return random.random() < self.error_rate
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real API
+    profile = LatencyProfile()
+    images = StubClient().images
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+        self.server.requests += 1
+        if self.profile.fail():
+            return self._json(503, {"error": {"message": "fake overload", "type": "server_error"}})
+        if self.path.endswith("/chat/completions"):
+            return self._chat(body)
+        if self.path.endswith("/images/generations"):
+            return self._image(body)
+        self._json(404, {"error": {"message": f"unknown path {self.path}", "type": "invalid_request_error"}})
+
+    def _chat(self, body):
+        prompt = body["messages"][-1]["content"]
+        if not isinstance(prompt, str):
+            prompt = " ".join(part.get("text", "") for part in prompt if part.get("type") == "text")
+        text = respond(prompt, body.get("response_format"))
+        usage = {"prompt_tokens": len(prompt.split()), "completion_tokens": len(text.split())}
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        base = {"id": f"chatcmpl-{uuid.uuid4().hex}", "created": int(time.time()), "model": body["model"]}
+
+        self.profile.wait(self.profile.latency)  # time to first token
+        if not body.get("stream"):
+            message = {"role": "assistant", "content": text}
+            return self._json(200, {**base, "object": "chat.completion", "usage": usage,
+                                    "choices": [{"index": 0, "message": message, "finish_reason": "stop"}]})
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        chunk = {**base, "object": "chat.completion.chunk"}
+        for token in re.findall(r"\S+\s*|\s+", text):
+            self._event({**chunk, "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}]})
+            if self.profile.token_delay:
+                time.sleep(self.profile.token_delay)
+        self._event({**chunk, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+        if (body.get("stream_options") or {}).get("include_usage"):
+            self._event({**chunk, "choices": [], "usage": usage})
+        self._chunk(b"data: [DONE]\n\n")
+        self._chunk(b"")
+
+    def _image(self, body):
+        self.profile.wait(self.profile.image_latency)
+        result = self.images.generate(model=body.get("model"), prompt=body["prompt"], size=body.get("size", "1024x1024"),
+                                      n=body.get("n", 1))
+        self._json(200, {"created": int(time.time()),
+                         "data": [{"b64_json": item.b64_json, "revised_prompt": body["prompt"]} for item in result.data]})
+
+    def _event(self, payload):
+        self._chunk(b"data: " + json.dumps(payload).encode("utf-8") + b"\n\n")
+
+    def _chunk(self, data):
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+    def _json(self, status, payload):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def serve(port=DEFAULT_PORT, profile=None):
+    """Start the server on a background thread; returns it (base URL in server.base_url)."""
+    handler = type("ProfiledHandler", (Handler,), {"profile": profile or LatencyProfile()})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    server.requests = 0
+    server.base_url = f"http://127.0.0.1:{server.server_address[1]}/v1"
+    threading.Thread(target=server.serve_forever, name="fake-model-server", daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--latency", type=float, default=0.5, help="seconds before the first token")
+    parser.add_argument("--jitter", type=float, default=0.2, help="± fraction applied to every delay")
+    parser.add_argument("--token-delay", type=float, default=0.01, help="seconds between streamed tokens")
+    parser.add_argument("--image-latency", type=float, default=5.0, help="seconds per image generation")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered 503")
+    args = parser.parse_args()
+
+    server = serve(args.port, LatencyProfile(args.latency, args.jitter, args.token_delay, args.image_latency,
+                                             args.error_rate))
+    print(f"Fake model server on {server.base_url} (Ctrl+C to stop)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
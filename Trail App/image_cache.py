@@ -0,0 +1,146 @@
+import base64
+import hashlib
+import io
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import urllib.request
+
+import telemetry
+
+# On-disk cache for generated example images.
+# Each image is keyed on a hash of its generation request and stored as WebP at a few
+# widths, so a repeat request is a file read instead of a ~15 s DALL·E call and the
+# image no longer depends on a temporary URL. Total size is bounded with LRU eviction.
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CACHE_DIR = os.path.join(APP_DIR, ".cache", "images")
+DEFAULT_MAX_BYTES = 100 * 1024 * 1024  # 100 MB of WebP files
+WIDTHS = (256, 512, 1024)
+WEBP_QUALITY = 80
+
+MODEL = "dall-e-3"
+SIZE = "1024x1024"
+QUALITY = "standard"
+
+
+def make_key(model, prompt, size, quality):
+    payload = json.dumps({"model": model, "prompt": prompt, "size": size, "quality": quality}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ImageCache:
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._conn().execute(
+            """
+            CREATE TABLE IF NOT EXISTS images (
+                key TEXT PRIMARY KEY,
+                prompt TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created REAL NOT NULL,
+                accessed REAL NOT NULL
+            )
+            """
+        )
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(os.path.join(self.directory, "index.sqlite3"), timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def _path(self, key, width):
+        return os.path.join(self.directory, key[:2], key, f"{width}.webp")
+
+    def get(self, key, width=WIDTHS[-1]):
+        """Path of the cached variant closest to `width` (not smaller, if possible), or None."""
+        conn = self._conn()
+        if conn.execute("SELECT 1 FROM images WHERE key = ?", (key,)).fetchone() is None:
+            return None
+        fitting = [w for w in WIDTHS if w >= width]
+        path = self._path(key, fitting[0] if fitting else WIDTHS[-1])
+        if not os.path.exists(path):
+            return None
+        conn.execute("UPDATE images SET accessed = ? WHERE key = ?", (time.time(), key))
+        return path
+
+    def put(self, key, prompt, data):
+        """Store encoded image bytes as WebP variants."""
+        from PIL import Image
+
+        image = Image.open(io.BytesIO(data))
+        image.load()
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGB")
+        total = 0
+        for width in WIDTHS:
+            variant = image.copy()
+            variant.thumbnail((width, width), Image.Resampling.LANCZOS)
+            path = self._path(key, width)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            variant.save(path, format="WEBP", quality=WEBP_QUALITY, method=6)
+            total += os.path.getsize(path)
+        now = time.time()
+        with self._write_lock:
+            self._conn().execute(
+                "INSERT OR REPLACE INTO images (key, prompt, size, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                (key, prompt, total, now, now),
+            )
+            self._evict(keep=key)
+
+    def _evict(self, keep=None):
+        """Drop least recently used images until the total fits max_bytes, never `keep`.
+
+        `keep` is the image just stored, which its caller is about to read: it stays even if
+        it alone is over budget, and goes on a later put.
+        """
+        conn = self._conn()
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM images").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in conn.execute("SELECT key, size FROM images WHERE key != ? ORDER BY accessed",
+                                      (keep or "",)).fetchall():
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(os.path.dirname(self._path(key, WIDTHS[0])), ignore_errors=True)
+            conn.execute("DELETE FROM images WHERE key = ?", (key,))
+            total -= size
+
+
+def fetch_image(client, prompt, model=MODEL, size=SIZE, quality=QUALITY):
+    """Generate an image and return its encoded bytes."""
+    response = client.images.generate(
+        model=model,
+        prompt=prompt,
+        size=size,
+        quality=quality,
+        n=1,
+        response_format="b64_json"
+    )
+    item = response.data[0]
+    if getattr(item, "b64_json", None):
+        return base64.b64decode(item.b64_json)
+    with urllib.request.urlopen(item.url, timeout=60) as r:
+        return r.read()
+
+
+def cached_image(cache, client, prompt, width=WIDTHS[-1], model=MODEL, size=SIZE, quality=QUALITY):
+    """Path of a WebP for `prompt`, generating and caching it only on a miss."""
+    key = make_key(model, prompt, size, quality)
+    with telemetry.span("eco_actions", "image", model):
+        path = cache.get(key, width)
+        if path is not None:
+            telemetry.mark_cache_hit()
+            return path
+        cache.put(key, prompt, fetch_image(client, prompt, model, size, quality))
+    return cache.get(key, width)
@@ -0,0 +1,115 @@
+import base64
+import io
+import time
+
+from PIL import Image, ImageOps
+
+# Ingestion for report photos: decode at reduced size, fix orientation and mode,
+# strip metadata, and re-encode as a JPEG that fits a byte budget for the vision model.
+
+DEFAULT_MAX_EDGE = 1536          # gpt-4o scales detailed images to a 768 px short side anyway
+DEFAULT_BYTE_BUDGET = 350 * 1024
+QUALITY_STEPS = (88, 80, 72, 64, 56, 48, 40)
+
+
+class IngestedImage:
+    def __init__(self, jpeg, size, phash, timings):
+        self.jpeg = jpeg
+        self.size = size
+        self.phash = phash
+        self.timings = timings
+
+    @property
+    def data_url(self):
+        return "data:image/jpeg;base64," + base64.b64encode(self.jpeg).decode("ascii")
+
+    def image(self):
+        return Image.open(io.BytesIO(self.jpeg))
+
+
+class _Timer:
+    def __init__(self):
+        self.timings = {}
+        self._last = time.perf_counter()
+
+    def lap(self, step):
+        now = time.perf_counter()
+        self.timings[step] = now - self._last
+        self._last = now
+
+
+def to_rgb(image):
+    """Convert any mode to RGB, flattening transparency onto white."""
+    if image.mode == "RGB":
+        return image
+    if image.mode == "P" and "transparency" in image.info:
+        image = image.convert("RGBA")
+    if image.mode in ("RGBA", "LA", "PA"):
+        background = Image.new("RGB", image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel("A"))
+        return background
+    return image.convert("RGB")
+
+
+def downscale(image, max_edge):
+    if max(image.size) <= max_edge:
+        return image
+    # Cheap integer box reduction first, then a quality resample for the remainder
+    factor = max(image.size) // max_edge
+    if factor > 1:
+        image = image.reduce(factor)
+    if max(image.size) > max_edge:
+        image.thumbnail((max_edge, max_edge), Image.Resampling.LANCZOS)
+    return image
+
+
+def encode_within_budget(image, byte_budget, qualities=QUALITY_STEPS):
+    """Encode at the highest quality step that fits `byte_budget` (the lowest step if none do)."""
+    data = b""
+    for quality in qualities:
+        buffer = io.BytesIO()
+        # No exif/icc arguments: metadata is not carried into the output
+        image.save(buffer, format="JPEG", quality=quality, optimize=True, progressive=True)
+        data = buffer.getvalue()
+        if len(data) <= byte_budget:
+            break
+    return data
+
+
+def dhash(image, hash_size=8):
+    """64-bit difference hash; near-identical photos differ in only a few bits."""
+    small = image.convert("L").resize((hash_size + 1, hash_size), Image.Resampling.BILINEAR)
+    pixels = list(small.getdata())
+    value = 0
+    for row in range(hash_size):
+        for col in range(hash_size):
+            left = pixels[row * (hash_size + 1) + col]
+            right = pixels[row * (hash_size + 1) + col + 1]
+            value = (value << 1) | (left > right)
+    return value
+
+
+def ingest(fp, max_edge=DEFAULT_MAX_EDGE, byte_budget=DEFAULT_BYTE_BUDGET):
+    """Turn an uploaded photo (path or file object) into a compact JPEG plus its perceptual hash."""
+    timer = _Timer()
+    image = Image.open(fp)
+    # For JPEGs, let the decoder scale by 1/2, 1/4 or 1/8 instead of decoding full size
+    scale = max_edge / max(image.size)
+    image.draft("RGB", (round(image.width * scale), round(image.height * scale)))
+    image.load()
+    timer.lap("decode")
+
+    image = ImageOps.exif_transpose(image)
+    image = to_rgb(image)
+    timer.lap("orient")
+
+    image = downscale(image, max_edge)
+    image.info = {}
+    timer.lap("resize")
+
+    jpeg = encode_within_budget(image, byte_budget)
+    timer.lap("encode")
+
+    phash = dhash(image)
+    timer.lap("hash")
+    return IngestedImage(jpeg, image.size, phash, timer.timings)
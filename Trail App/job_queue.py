@@ -0,0 +1,236 @@
+import json
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+import uuid
+
+# Durable job queue backed by SQLite, worked by a pool of background threads.
+# Jobs survive restarts; a job left running by a dead process is picked up again once
+# its lease runs out. An idempotency key makes resubmitting the same work return the
+# existing job instead of queueing it twice. Finished jobs are kept for a retention period
+# (so their results can still be fetched) and then deleted.
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_QUEUE_PATH = os.path.join(APP_DIR, "data", "jobs.sqlite3")
+DEFAULT_MAX_ATTEMPTS = 3
+DEFAULT_LEASE = 300      # seconds a claimed job may run before it is considered abandoned
+RETRY_BASE_DELAY = 5     # seconds; doubled on every failed attempt
+DEFAULT_RETENTION = 7 * 24 * 3600  # seconds a done or failed job is kept
+PRUNE_INTERVAL = 3600    # seconds between deletions of expired finished jobs
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+log = logging.getLogger(__name__)
+
+
+class JobQueue:
+    def __init__(self, path=DEFAULT_QUEUE_PATH, max_attempts=DEFAULT_MAX_ATTEMPTS, lease=DEFAULT_LEASE,
+                 retention=DEFAULT_RETENTION):
+        self.path = path
+        self.max_attempts = max_attempts
+        self.lease = lease
+        self.retention = retention
+        self._last_prune = 0.0
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self._wakeup = threading.Condition()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn().executescript(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                idempotency_key TEXT UNIQUE,
+                status TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                attachment BLOB,
+                result TEXT,
+                artifact BLOB,
+                error TEXT,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                run_after REAL NOT NULL,
+                created REAL NOT NULL,
+                updated REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (status, run_after);
+            CREATE INDEX IF NOT EXISTS jobs_updated ON jobs (status, updated);
+            """
+        )
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def submit(self, kind, payload, attachment=None, idempotency_key=None):
+        """Queue a job and return its id; a known idempotency key returns the existing job's id."""
+        now = time.time()
+        job_id = uuid.uuid4().hex
+        conn = self._conn()
+        with self._write_lock:
+            inserted = conn.execute(
+                "INSERT OR IGNORE INTO jobs "
+                "(id, kind, idempotency_key, status, payload, attachment, run_after, created, updated) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, kind, idempotency_key, QUEUED, json.dumps(payload), attachment, now, now, now),
+            ).rowcount
+        if not inserted:
+            # Resubmitting work that already failed for good gives it a fresh set of attempts, with
+            # the new attachment (a job failed by lease expiry no longer has its own)
+            with self._write_lock:
+                conn.execute(
+                    "UPDATE jobs SET status = ?, attempts = 0, error = NULL, payload = ?, "
+                    "attachment = COALESCE(?, attachment), run_after = ?, updated = ? "
+                    "WHERE idempotency_key = ? AND status = ?",
+                    (QUEUED, json.dumps(payload), attachment, now, now, idempotency_key, FAILED),
+                )
+            job_id = conn.execute("SELECT id FROM jobs WHERE idempotency_key = ?", (idempotency_key,)).fetchone()[0]
+        with self._wakeup:
+            self._wakeup.notify()
+        return job_id
+
+    def get(self, job_id):
+        row = self._conn().execute(
+            "SELECT id, kind, status, payload, result, artifact, error, attempts, created, updated "
+            "FROM jobs WHERE id = ?", (job_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        keys = ("id", "kind", "status", "payload", "result", "artifact", "error", "attempts", "created", "updated")
+        job = dict(zip(keys, row))
+        job["payload"] = json.loads(job["payload"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def claim(self):
+        """Take the next ready job (queued, or running past its lease) or return None.
+
+        A job whose lease ran out on its last attempt (its worker died mid-run every time) is
+        marked failed instead of being run again.
+        """
+        now = time.time()
+        if now - self._last_prune > PRUNE_INTERVAL:
+            self._last_prune = now
+            self.prune()
+        conn = self._conn()
+        with self._write_lock:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(
+                    "UPDATE jobs SET status = ?, attachment = NULL, updated = ?, "
+                    "error = 'Lease expired after ' || attempts || ' attempts' "
+                    "WHERE status = ? AND run_after <= ? AND attempts >= ?",
+                    (FAILED, now, RUNNING, now, self.max_attempts),
+                )
+                row = conn.execute(
+                    "UPDATE jobs SET status = ?, attempts = attempts + 1, run_after = ?, updated = ? "
+                    "WHERE id = (SELECT id FROM jobs WHERE status IN (?, ?) AND run_after <= ? AND attempts < ? "
+                    "ORDER BY run_after LIMIT 1) "
+                    "RETURNING id, kind, payload, attachment, attempts",
+                    (RUNNING, now + self.lease, now, QUEUED, RUNNING, now, self.max_attempts),
+                ).fetchone()
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        if row is None:
+            return None
+        job_id, kind, payload, attachment, attempts = row
+        return {"id": job_id, "kind": kind, "payload": json.loads(payload), "attachment": attachment,
+                "attempts": attempts}
+
+    def complete(self, job_id, attempts, result, artifact=None):
+        """Store a job's result; False if the caller's claim (attempt `attempts`) was lost meanwhile."""
+        with self._write_lock:
+            return self._conn().execute(
+                "UPDATE jobs SET status = ?, result = ?, artifact = ?, attachment = NULL, error = NULL, updated = ? "
+                "WHERE id = ? AND status = ? AND attempts = ?",
+                (DONE, json.dumps(result), artifact, time.time(), job_id, RUNNING, attempts),
+            ).rowcount > 0
+
+    def retry_or_fail(self, job_id, attempts, error):
+        """Requeue with jittered exponential backoff, or mark failed after max_attempts.
+
+        Returns the new status, or None if the job was reclaimed after the caller's lease ran out
+        (attempt `attempts` is no longer the one running); a stale worker never overwrites it.
+        """
+        now = time.time()
+        if attempts >= self.max_attempts:
+            status, run_after = FAILED, now
+        else:
+            status = QUEUED
+            run_after = now + RETRY_BASE_DELAY * 2 ** (attempts - 1) * random.uniform(0.5, 1.5)
+        with self._write_lock:
+            held = self._conn().execute(
+                "UPDATE jobs SET status = ?, error = ?, run_after = ?, updated = ? "
+                "WHERE id = ? AND status = ? AND attempts = ?",
+                (status, error, run_after, now, job_id, RUNNING, attempts),
+            ).rowcount
+        return status if held else None
+
+    def prune(self, older_than=None):
+        """Delete done and failed jobs last updated over `older_than` (default: retention) seconds ago."""
+        cutoff = time.time() - (self.retention if older_than is None else older_than)
+        with self._write_lock:
+            removed = self._conn().execute(
+                "DELETE FROM jobs WHERE status IN (?, ?) AND updated < ?", (DONE, FAILED, cutoff)
+            ).rowcount
+        if removed:
+            log.info("pruned %d finished jobs", removed)
+        return removed
+
+    def wait_for_work(self, timeout):
+        with self._wakeup:
+            self._wakeup.wait(timeout)
+
+    def wake_all(self):
+        with self._wakeup:
+            self._wakeup.notify_all()
+
+
+class WorkerPool:
+    """Background threads that claim jobs and run `handlers[kind](payload, attachment)`.
+
+    A handler returns (result, artifact): a JSON-serialisable result and optional bytes.
+    """
+
+    def __init__(self, queue, handlers, workers=2, poll_interval=1.0):
+        self.queue = queue
+        self.handlers = handlers
+        self.poll_interval = poll_interval
+        self._stop = threading.Event()
+        self._threads = [
+            threading.Thread(target=self._run, name=f"job-worker-{i}", daemon=True) for i in range(workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            job = self.queue.claim()
+            if job is None:
+                self.queue.wait_for_work(self.poll_interval)
+                continue
+            try:
+                result, artifact = self.handlers[job["kind"]](job["payload"], job["attachment"])
+            except Exception as e:
+                status = self.queue.retry_or_fail(job["id"], job["attempts"], f"{type(e).__name__}: {e}")
+                log.warning("job %s attempt %s failed (%s): %s", job["id"], job["attempts"],
+                            status or "lease lost, not recorded", e)
+            else:
+                if not self.queue.complete(job["id"], job["attempts"], result, artifact):
+                    log.warning("job %s attempt %s finished after its lease was lost; result dropped",
+                                job["id"], job["attempts"])
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        self.queue.wake_all()
+        for thread in self._threads:
+            thread.join(timeout)
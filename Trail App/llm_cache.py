@@ -0,0 +1,128 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# Shared on-disk cache for chat completions.
+# Entries are keyed on (model, prompt, temperature, max_tokens) so the same
+# request made from any session or process is answered from disk.
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CACHE_PATH = os.path.join(APP_DIR, ".cache", "llm_cache.sqlite3")
+DEFAULT_TTL = 7 * 24 * 3600          # one week
+DEFAULT_MAX_BYTES = 50 * 1024 * 1024  # 50 MB of response text
+
+
+def make_key(model, prompt, temperature, max_tokens):
+    payload = json.dumps(
+        {"model": model, "prompt": prompt, "temperature": temperature, "max_tokens": max_tokens},
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    def __init__(self, path=DEFAULT_CACHE_PATH, ttl=DEFAULT_TTL, max_bytes=DEFAULT_MAX_BYTES):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        conn = self._conn()
+        conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                trail TEXT,
+                model TEXT,
+                response TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created REAL NOT NULL,
+                accessed REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed);
+            CREATE INDEX IF NOT EXISTS responses_trail ON responses (trail);
+            """
+        )
+
+    def _conn(self):
+        # One connection per thread; Streamlit runs each session on its own thread.
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            if self.path != ":memory:":
+                conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        conn = self._conn()
+        row = conn.execute("SELECT response, created FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        response, created = row
+        now = time.time()
+        if self.ttl is not None and now - created > self.ttl:
+            conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            return None
+        conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+        return response
+
+    def set(self, key, response, trail=None, model=None):
+        now = time.time()
+        size = len(response.encode("utf-8"))
+        conn = self._conn()
+        with self._write_lock:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, trail, model, response, size, created, accessed) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, trail, model, response, size, now, now),
+            )
+            self._evict(conn)
+
+    def _evict(self, conn):
+        # Drop least recently used entries until the cache fits its byte budget.
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = conn.execute("SELECT key, size FROM responses ORDER BY accessed").fetchall()
+        doomed = []
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            doomed.append((key,))
+            total -= size
+        conn.executemany("DELETE FROM responses WHERE key = ?", doomed)
+
+    def entries(self, since=0.0):
+        """(key, trail, response, created) for live trail responses stored after `since`, oldest first."""
+        return self._conn().execute(
+            "SELECT key, trail, response, created FROM responses WHERE trail IS NOT NULL AND created > ? "
+            "ORDER BY created",
+            (max(since, self._expired_before()),),
+        ).fetchall()
+
+    def keys(self):
+        """Keys of every live trail response (evicted, invalidated and expired ones are gone)."""
+        return {key for key, in self._conn().execute(
+            "SELECT key FROM responses WHERE trail IS NOT NULL AND created > ?", (self._expired_before(),)
+        )}
+
+    def _expired_before(self):
+        return time.time() - self.ttl if self.ttl is not None else 0.0
+
+    def invalidate_trail(self, trail):
+        conn = self._conn()
+        with self._write_lock:
+            return conn.execute("DELETE FROM responses WHERE trail = ?", (trail,)).rowcount
+
+    def clear(self):
+        conn = self._conn()
+        with self._write_lock:
+            conn.execute("DELETE FROM responses")
+
@@ -0,0 +1,447 @@
+"""Load test the app with concurrent headless sessions against a real Streamlit server.
+
+Starts fake_model_server and `streamlit run` on a throwaway copy of the app (so load-test
+users never reach data/), then, for each concurrency level, runs that many virtual users.
+Each user drives the pages over Streamlit's websocket protocol the way a browser does
+(widget states in, deltas out) and loops through the scenarios: browse a trail, walk all
+its stops, submit a report, log eco actions. Reported per level: scenario throughput,
+p50/p95/p99 interaction latency, errors and server memory, plus the first level at which
+the server falls over (error rate or p95 past the limits).
+
+Written against the protocol of the installed Streamlit (1.65); widget state encodings
+change between releases. Needs the `websockets` package: pip install -r requirements-dev.txt
+
+Usage (from the repository root):
+    python "Trail App/loadtest.py" --users 1 2 4 8 16 --duration 60
+    python "Trail App/loadtest.py" --latency 1.5 --token-delay 0.03   # slower fake model
+    python "Trail App/loadtest.py" --output loadtest.json
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import random
+import re
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+import uuid
+
+import httpx
+import websockets
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+import fake_model_server
+from trail_catalog import get_catalog
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+COPY_IGNORE = shutil.ignore_patterns("data", ".cache", "__pycache__", ".streamlit")
+FINISHED = {ForwardMsg.FINISHED_SUCCESSFULLY, ForwardMsg.FINISHED_WITH_COMPILE_ERROR}
+RUN_TIMEOUT = 120  # seconds for one script run before the interaction counts as an error
+MAX_ERROR_RATE = 0.01
+MAX_P95 = 5.0  # seconds
+
+
+class ScenarioError(Exception):
+    pass
+
+
+class Session:
+    """One browser tab: a websocket session that reruns pages with widget values."""
+
+    def __init__(self, base_url, recorder):
+        self.base_url = base_url.rstrip("/")
+        self.recorder = recorder
+        self.session_id = None
+        self.page = ""
+        self.query_string = ""
+        self.elements = {}
+        self.states = {}
+        self._ws = None
+        self._pending = {}
+
+    async def __aenter__(self):
+        ws_url = "ws" + self.base_url[len("http"):] + "/_stcore/stream"
+        self._ws = await websockets.connect(ws_url, subprotocols=["streamlit"], max_size=None)
+        return self
+
+    async def __aexit__(self, *exc):
+        await self._ws.close()
+
+    # --- Protocol ---
+    async def _send(self, **fields):
+        msg = BackMsg(**fields)
+        await self._ws.send(msg.SerializeToString())
+
+    async def rerun(self, step, extra_states=()):
+        """Run the current page with the widget values set so far; returns once the script finishes."""
+        msg = BackMsg()
+        state = msg.rerun_script
+        state.query_string = self.query_string
+        state.page_name = self.page
+        state.widget_states.widgets.extend(list(self.states.values()) + list(extra_states))
+        start = time.perf_counter()
+        error = None
+        try:
+            await self._ws.send(msg.SerializeToString())
+            await asyncio.wait_for(self._read_run(), RUN_TIMEOUT)
+            exceptions = [e for e in self.elements.values() if e.WhichOneof("type") == "exception"]
+            if exceptions:
+                error = f"{exceptions[0].exception.type}: {exceptions[0].exception.message}"
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        self.recorder.interaction(step, time.perf_counter() - start, error)
+        if error:
+            raise ScenarioError(f"{step}: {error}")
+
+    async def _read_run(self):
+        elements = {}
+        while True:
+            msg = ForwardMsg()
+            msg.ParseFromString(await self._ws.recv())
+            kind = msg.WhichOneof("type")
+            if kind == "new_session":
+                self.session_id = msg.new_session.initialize.session_id or self.session_id
+                elements = {}
+            elif kind == "delta" and msg.delta.WhichOneof("type") == "new_element":
+                elements[tuple(msg.metadata.delta_path)] = msg.delta.new_element
+            elif kind == "file_urls_response":
+                self._pending.pop(msg.file_urls_response.response_id).set_result(msg.file_urls_response)
+            elif kind == "script_finished" and msg.script_finished in FINISHED:
+                self.elements = elements
+                # Forget the values of widgets that are no longer on the page
+                ids = {self._widget_id(e) for e in elements.values()}
+                self.states = {wid: s for wid, s in self.states.items() if wid in ids}
+                return
+
+    @staticmethod
+    def _widget_id(element):
+        return getattr(getattr(element, element.WhichOneof("type")), "id", None)
+
+    # --- Page actions ---
+    async def open(self, page, query_string=""):
+        self.page, self.query_string, self.states = page, query_string, {}
+        await self.rerun(f"open {page or 'Home'}")
+
+    def widget(self, kind, label):
+        for element in self.elements.values():
+            if element.WhichOneof("type") == kind and getattr(element, kind).label == label:
+                return getattr(element, kind)
+        raise ScenarioError(f"no {kind} {label!r} on {self.page or 'Home'}")
+
+    def has_widget(self, kind, label):
+        return any(e.WhichOneof("type") == kind and getattr(e, kind).label == label for e in self.elements.values())
+
+    def text(self):
+        parts = []
+        for element in self.elements.values():
+            kind = element.WhichOneof("type")
+            if kind in ("markdown", "alert"):
+                parts.append(getattr(element, kind).body)
+        return "\n".join(parts)
+
+    def _set(self, widget, **value):
+        self.states[widget.id] = WidgetState(id=widget.id, **value)
+
+    async def click(self, label, step=None):
+        widget = self.widget("button", label)
+        await self.rerun(step or f"click {label}", [WidgetState(id=widget.id, trigger_value=True)])
+
+    async def check(self, label, step=None):
+        self._set(self.widget("checkbox", label), bool_value=True)
+        await self.rerun(step or f"check {label}")
+
+    async def type(self, label, value, step=None):
+        self._set(self.widget("text_input", label), string_value=value)
+        await self.rerun(step or f"type {label}")
+
+    async def select(self, label, option, step=None):
+        self._set(self.widget("selectbox", label), string_value=option)
+        await self.rerun(step or f"select {label}")
+
+    async def upload(self, label, name, data, mime, step=None):
+        """Upload a file the way the browser does: ask for a URL, PUT the file, then rerun."""
+        widget = self.widget("file_uploader", label)
+        request_id = uuid.uuid4().hex
+        future = self._pending[request_id] = asyncio.get_running_loop().create_future()
+        await self._send(file_urls_request={"request_id": request_id, "file_names": [name],
+                                            "session_id": self.session_id})
+        # The response arrives on the websocket, which is only read during a run
+        while not future.done():
+            msg = ForwardMsg()
+            msg.ParseFromString(await asyncio.wait_for(self._ws.recv(), RUN_TIMEOUT))
+            if msg.WhichOneof("type") == "file_urls_response":
+                self._pending.pop(msg.file_urls_response.response_id).set_result(msg.file_urls_response)
+        urls = future.result().file_urls[0]
+        async with httpx.AsyncClient(base_url=self.base_url) as http:
+            response = await http.put(urls.upload_url, files={"file": (name, data, mime)})
+            response.raise_for_status()
+        state = WidgetState(id=widget.id)
+        info = state.file_uploader_state_value.uploaded_file_info.add()
+        info.name, info.size, info.file_id = name, len(data), urls.file_id
+        info.file_urls.CopyFrom(urls)
+        self.states[widget.id] = state
+        await self.rerun(step or f"upload {label}")
+
+
+# --- Scenarios ---
+async def browse_trail(session, user):
+    trail = random.choice(get_catalog().trails)
+    await session.open("")
+    await session.open("VirtualTrails")
+    await session.type("🔍 Search trails", trail.name[:random.randint(3, 8)], step="search trails")
+    await session.select("Select a trail:", trail.name, step="select trail")
+    await session.click("Generate Trail Overview", step="overview")
+    if "Length" not in session.text():
+        raise ScenarioError("overview missing from the page")
+
+
+async def walk_stops(session, user):
+    await session.click("Generate & Begin Virtual Walk", step="begin walk")
+    while True:
+        position = re.search(r"Stop (\d+) of (\d+)", session.text())
+        if position is None:
+            raise ScenarioError("no stop shown")
+        if position.group(1) == position.group(2):
+            return
+        await session.click("Next Stop ⏭", step="next stop")
+
+
+def trail_photo():
+    from PIL import Image, ImageDraw
+
+    image = Image.new("RGB", (1600, 1200), tuple(random.randrange(256) for _ in range(3)))
+    draw = ImageDraw.Draw(image)
+    for _ in range(30):
+        x, y = random.randrange(1600), random.randrange(1200)
+        draw.ellipse((x, y, x + 120, y + 80), fill=tuple(random.randrange(256) for _ in range(3)))
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=85)
+    return buffer.getvalue()
+
+
+async def submit_report(session, user):
+    await session.open("ReportSubmission")
+    await session.upload("Upload a trail issue photo (JPEG, PNG)", "issue.jpg", trail_photo(), "image/jpeg")
+    await session.select("Where was this photo taken?", random.choice(get_catalog().locations()))
+    await session.check("📄 Consent to Share")
+    await session.click("Submit Report", step="submit report")
+    # The page polls with a fragment; a headless client polls by rerunning
+    submitted = time.perf_counter()
+    while "Report generated successfully!" not in session.text():
+        if "Failed to generate report" in session.text() or time.perf_counter() - submitted > RUN_TIMEOUT:
+            raise ScenarioError("report did not complete")
+        await asyncio.sleep(1)
+        await session.rerun("poll report")
+    session.recorder.report_ready(time.perf_counter() - submitted)
+
+
+async def log_actions(session, user):
+    await session.open("EcoActionsTracker", query_string=f"user={user}")
+    for action in random.sample(["🗑️ Picked up trash", "🥾 Stayed on trail", "🚯 Carried reusable water bottle"], 2):
+        await session.check(action)
+    await session.select("🥾 Which trail were you on?", random.choice(get_catalog().trails).name)
+    await session.click("Submit Actions", step="log actions")
+    if "You earned" not in session.text():
+        raise ScenarioError("actions were not recorded")
+
+
+SCENARIOS = (("browse_trail", browse_trail), ("walk_stops", walk_stops),
+             ("submit_report", submit_report), ("log_actions", log_actions))
+
+
+class Recorder:
+    def __init__(self):
+        self.interactions = {}
+        self.errors = {}
+        self.scenarios = {}
+        self.reports = []
+
+    def interaction(self, step, seconds, error):
+        self.interactions.setdefault(step, []).append(seconds)
+        if error:
+            self.errors[step] = self.errors.get(step, 0) + 1
+
+    def report_ready(self, seconds):
+        # Submit-to-PDF time, kept out of the interaction percentiles (it spans many polls)
+        self.reports.append(seconds)
+
+    def scenario(self, name, seconds, ok):
+        self.scenarios.setdefault(name, [0, 0, []])
+        done = self.scenarios[name]
+        done[0 if ok else 1] += 1
+        done[2].append(seconds)
+
+
+async def virtual_user(base_url, recorder, stop_at):
+    user = uuid.uuid4().hex[:12]
+    while time.monotonic() < stop_at:
+        try:
+            async with Session(base_url, recorder) as session:
+                for name, scenario in SCENARIOS:
+                    if time.monotonic() >= stop_at:
+                        return
+                    start = time.perf_counter()
+                    try:
+                        await scenario(session, user)
+                        recorder.scenario(name, time.perf_counter() - start, True)
+                    except ScenarioError:
+                        recorder.scenario(name, time.perf_counter() - start, False)
+                        break  # start a fresh tab, as a user would after an error
+        except OSError:
+            recorder.interaction("connect", 0.0, "connection failed")
+            await asyncio.sleep(1)
+
+
+def rss_bytes(pid):
+    """Resident set size of a process, from /proc (Linux)."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        return None
+    return None
+
+
+def quantiles(samples):
+    if not samples:
+        return None, None, None
+    ordered = sorted(samples)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+    return pick(0.5), pick(0.95), pick(0.99)
+
+
+async def run_level(base_url, users, duration, server_pid):
+    recorder = Recorder()
+    stop_at = time.monotonic() + duration
+    peak_rss = rss_bytes(server_pid) if server_pid else None
+    tasks = [asyncio.create_task(virtual_user(base_url, recorder, stop_at)) for _ in range(users)]
+    start = time.perf_counter()
+    while not all(t.done() for t in tasks):
+        await asyncio.sleep(1)
+        if server_pid:
+            peak_rss = max(peak_rss or 0, rss_bytes(server_pid) or 0)
+    elapsed = time.perf_counter() - start
+
+    samples = [s for values in recorder.interactions.values() for s in values]
+    interactions, errors = len(samples), sum(recorder.errors.values())
+    p50, p95, p99 = quantiles(samples)
+    return {
+        "users": users,
+        "seconds": elapsed,
+        "scenarios_per_s": sum(ok for ok, _, _ in recorder.scenarios.values()) / elapsed,
+        "interactions_per_s": interactions / elapsed,
+        "p50": p50, "p95": p95, "p99": p99,
+        "error_rate": errors / interactions if interactions else 1.0,
+        "peak_rss_mb": peak_rss and peak_rss / 2 ** 20,
+        "report_ready": dict(zip(("p50", "p95", "p99"), quantiles(recorder.reports))),
+        "steps": {step: dict(zip(("p50", "p95", "p99"), quantiles(values)), count=len(values),
+                             errors=recorder.errors.get(step, 0))
+                  for step, values in recorder.interactions.items()},
+        "scenarios": {name: {"ok": ok, "failed": failed, "p50": statistics.median(times)}
+                      for name, (ok, failed, times) in recorder.scenarios.items()},
+    }
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_app(workdir, model_url, report_workers):
+    """Copy the app into `workdir`, point it at the fake model and start `streamlit run`."""
+    app_copy = os.path.join(workdir, os.path.basename(APP_DIR))
+    shutil.copytree(APP_DIR, app_copy, ignore=COPY_IGNORE)
+    os.makedirs(os.path.join(workdir, ".streamlit"))
+    with open(os.path.join(workdir, ".streamlit", "secrets.toml"), "w") as f:
+        f.write(f'openai_api_key = "loadtest"\nopenai_base_url = "{model_url}"\nreport_workers = {report_workers}\n')
+    port = free_port()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "streamlit", "run", os.path.join(app_copy, "Home.py"),
+         "--server.headless", "true", "--server.port", str(port), "--server.enableXsrfProtection", "false",
+         "--server.fileWatcherType", "none", "--browser.gatherUsageStats", "false"],
+        cwd=workdir, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 60
+    while True:
+        try:
+            with urllib.request.urlopen(base_url + "/_stcore/health", timeout=2):
+                return process, base_url
+        except OSError:
+            if process.poll() is not None or time.monotonic() > deadline:
+                process.kill()
+                raise RuntimeError("Streamlit server did not start")
+            time.sleep(0.5)
+
+
+def print_level(result):
+    ms = lambda s: "-" if s is None else f"{s * 1000:.0f}"
+    rss = "-" if result["peak_rss_mb"] is None else f"{result['peak_rss_mb']:.0f} MB"
+    print(f"{result['users']:>5} users  {result['scenarios_per_s']:6.2f} scenarios/s  "
+          f"{result['interactions_per_s']:6.1f} interactions/s  p50 {ms(result['p50'])} ms  "
+          f"p95 {ms(result['p95'])} ms  p99 {ms(result['p99'])} ms  errors {result['error_rate']:.1%}  rss {rss}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, nargs="+", default=[1, 2, 4, 8, 16], help="concurrency levels")
+    parser.add_argument("--duration", type=float, default=60, help="seconds per level")
+    parser.add_argument("--url", help="test an already running server instead of starting one")
+    parser.add_argument("--server-pid", type=int, help="with --url, the server process to sample memory from")
+    parser.add_argument("--report-workers", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.5, help="fake model: seconds before the first token")
+    parser.add_argument("--token-delay", type=float, default=0.01, help="fake model: seconds between tokens")
+    parser.add_argument("--image-latency", type=float, default=5.0, help="fake model: seconds per image")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fake model: fraction of 503s")
+    parser.add_argument("--max-p95", type=float, default=MAX_P95, help="p95 seconds that counts as falling over")
+    parser.add_argument("--output", help="write the results as JSON")
+    args = parser.parse_args()
+
+    process = None
+    with tempfile.TemporaryDirectory(prefix="trail-loadtest-") as workdir:
+        if args.url:
+            base_url, server_pid = args.url, args.server_pid
+        else:
+            model = fake_model_server.serve(0, fake_model_server.LatencyProfile(
+                args.latency, token_delay=args.token_delay, image_latency=args.image_latency,
+                error_rate=args.error_rate))
+            process, base_url = start_app(workdir, model.base_url, args.report_workers)
+            server_pid = process.pid
+            print(f"Streamlit on {base_url}, fake model on {model.base_url}")
+        try:
+            results, fell_over = [], None
+            for users in args.users:
+                result = asyncio.run(run_level(base_url, users, args.duration, server_pid))
+                results.append(result)
+                print_level(result)
+                if fell_over is None and (result["error_rate"] > MAX_ERROR_RATE or (result["p95"] or 0) > args.max_p95):
+                    fell_over = users
+        finally:
+            if process is not None:
+                process.terminate()
+                process.wait(10)
+
+    if fell_over is None:
+        print(f"✅ Held up to {args.users[-1]} users (p95 ≤ {args.max_p95}s, errors ≤ {MAX_ERROR_RATE:.0%})")
+    else:
+        print(f"✗ Fell over at {fell_over} users (p95 > {args.max_p95}s or errors > {MAX_ERROR_RATE:.0%})")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"levels": results, "fell_over_at": fell_over}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
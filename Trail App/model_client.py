@@ -0,0 +1,234 @@
+import json
+import random
+import sys
+import threading
+import time
+from types import SimpleNamespace
+
+import telemetry
+
+# Process-wide wrapper around the OpenAI client.
+# Exposes the same `chat.completions.create` / `images.generate` calls the pages already
+# use, adding a rate limit, retries with jittered backoff, per-call timeouts and
+# single-flight coalescing so identical concurrent requests cost one upstream call
+# (streamed ones included: one upstream stream is fanned out to every caller waiting on it).
+# openai/httpx are imported only when a real client is built (offline builds use the stub).
+# Token usage of each upstream call is added to the open telemetry span, if any.
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+DEFAULT_TIMEOUT = 60.0       # seconds per attempt
+DEFAULT_MAX_RETRIES = 4
+DEFAULT_RATE = 5.0           # requests per second, sustained
+DEFAULT_BURST = 20           # requests allowed in a burst
+
+
+class TokenBucket:
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available, then take it."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class _StreamFlight:
+    """One upstream stream shared by every caller that asked for it while it was running.
+
+    Chunks are kept as they arrive, so a caller who joins late replays them from the start.
+    There is no pump thread: whichever reader is first to need a chunk nobody has yet pulls
+    it upstream while the others wait on the lock, so an abandoned reader never stalls the rest.
+    """
+
+    def __init__(self, open_stream):
+        self.open_stream = open_stream
+        self.upstream = None
+        self.chunks = []
+        self.done = False
+        self.error = None
+        self.readers = 0
+        self.usage_claimed = False
+        self._pump_lock = threading.Lock()
+
+    def _pull(self, wanted):
+        with self._pump_lock:
+            if wanted < len(self.chunks) or self.done:
+                return  # another reader got there first
+            try:
+                if self.upstream is None:
+                    self.upstream = iter(self.open_stream())
+                self.chunks.append(next(self.upstream))
+            except StopIteration:
+                self.done = True
+            except Exception as e:
+                self.error, self.done = e, True
+
+    def _claim_usage(self):
+        with self._pump_lock:
+            claimed, self.usage_claimed = self.usage_claimed, True
+        return not claimed
+
+    def read(self):
+        """The chunks in order. The usage-only chunk goes to one reader, so tokens count once."""
+        i = 0
+        while True:
+            if i < len(self.chunks):
+                chunk = self.chunks[i]
+                i += 1
+                if getattr(chunk, "choices", True) or self._claim_usage():
+                    yield chunk
+            elif self.done:
+                if self.error is not None:
+                    raise self.error
+                return
+            else:
+                self._pull(i)
+
+    def close(self):
+        self.done = True
+        close = getattr(self.upstream, "close", None)
+        if close is not None:
+            close()
+
+
+def is_retryable(exc):
+    status = getattr(exc, "status_code", None)
+    if status is not None:
+        return status in RETRYABLE_STATUS
+    # An openai exception means openai is already imported; don't import it just to check
+    openai = sys.modules.get("openai")
+    if openai is not None and isinstance(exc, openai.APIConnectionError):
+        return True
+    return isinstance(exc, (ConnectionError, TimeoutError))
+
+
+def record_usage(kind, model, response):
+    span = telemetry.current_span()
+    if span is None:
+        return
+    if kind == "images":
+        span.add_usage(model, images=len(response.data))
+    else:
+        span.add_usage(model, getattr(response, "usage", None))
+
+
+class SharedClient:
+    def __init__(self, client, rate=DEFAULT_RATE, burst=DEFAULT_BURST, timeout=DEFAULT_TIMEOUT,
+                 max_retries=DEFAULT_MAX_RETRIES, backoff=0.5, max_backoff=20.0):
+        self.client = client
+        self.bucket = TokenBucket(rate, burst)
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.upstream_calls = 0
+        self.coalesced_calls = 0
+        self._flights = {}
+        self._flights_lock = threading.Lock()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(
+            create=lambda **kwargs: self.call(client.chat.completions.create, "chat", kwargs)
+        ))
+        self.images = SimpleNamespace(
+            generate=lambda **kwargs: self.call(client.images.generate, "images", kwargs)
+        )
+
+    def call(self, fn, kind, kwargs):
+        key = kind + ":" + json.dumps(kwargs, sort_keys=True, default=str)
+        if kwargs.get("stream"):
+            return self._call_stream(fn, key, kwargs)
+        with self._flights_lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                self.coalesced_calls += 1
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+        try:
+            flight.result = self._call_with_retries(fn, kwargs)
+            record_usage(kind, kwargs.get("model"), flight.result)
+            return flight.result
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._flights_lock:
+                del self._flights[key]
+            flight.done.set()
+
+    def _call_stream(self, fn, key, kwargs):
+        with self._flights_lock:
+            flight = self._flights.get(key)
+            if flight is None:
+                flight = self._flights[key] = _StreamFlight(lambda: self._call_with_retries(fn, kwargs))
+            else:
+                self.coalesced_calls += 1
+            flight.readers += 1
+        return self._read_stream(flight, key)
+
+    def _read_stream(self, flight, key):
+        try:
+            yield from flight.read()
+        finally:
+            with self._flights_lock:
+                flight.readers -= 1
+                if flight.done or flight.readers == 0:
+                    # Later callers start a fresh stream (or hit the response cache)
+                    if self._flights.get(key) is flight:
+                        del self._flights[key]
+                abandoned = flight.readers == 0 and not flight.done
+            if abandoned:  # every reader stopped early: drop the upstream connection
+                flight.close()
+
+    def _call_with_retries(self, fn, kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        attempt = 0
+        while True:
+            self.bucket.acquire()
+            self.upstream_calls += 1
+            try:
+                return fn(**kwargs)
+            except Exception as e:
+                if attempt >= self.max_retries or not is_retryable(e):
+                    raise
+                # Full jitter: sleep a random slice of the exponential backoff window
+                time.sleep(random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt)))
+                attempt += 1
+
+
+def make_openai_client(api_key, max_connections=50, max_keepalive=20, base_url=None):
+    """OpenAI client over a pooled keep-alive connection; retries are left to SharedClient.
+
+    `base_url` points it at a compatible server instead, e.g. fake_model_server for load tests.
+    """
+    import httpx
+    import openai
+
+    http_client = httpx.Client(
+        limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_keepalive),
+    )
+    return openai.OpenAI(api_key=api_key, base_url=base_url, http_client=http_client, max_retries=0)
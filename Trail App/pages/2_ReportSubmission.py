@@ -1,36 +1,103 @@
 import streamlit as st
 import datetime
-import pandas as pd
-import random
-import unicodedata
-from openai import OpenAI
-from fpdf import FPDF
-from PIL import Image
-import base64
-import io
-
-# Initialize OpenAI client
-api_key = st.secrets["openai_api_key"]
-client = OpenAI(api_key=api_key)
-
+import hashlib
+import time
+import bootstrap
+import batch_reports
+import report_pipeline
+from job_queue import DONE, FAILED
+from resources import (
+    get_client, get_report_index, get_report_queue, get_report_renderer, get_session_state,
+    get_trail_catalog,
+)
 
-# Function to clean text for PDF
-def clean_text(text):
-    return unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode("ascii")
 
-# Function to load trail locations from CSV
-@st.cache_data
-def load_locations():
-    df = pd.read_csv('Trail App/trail_info.csv')
-    return df['location'].tolist()
+bootstrap.start_warm_up()
 
-# Load location list
-locations = load_locations()
+# Trail locations from the shared catalog (trail_info.csv)
+locations = get_trail_catalog().locations()
+report_queue = get_report_queue()
+state = get_session_state()
 
 # Streamlit app setup
 st.title("🌿 EcoTrail AI – Report Submission for Santa Clara Valley Water")
 st.write("Learn about your trail, upload issue photos, and generate a formal report.")
 
+mode = st.radio("Reports to generate", ("One photo", "Batch of photos"), horizontal=True,
+                help="A batch turns many photos (or a zip of them) into one merged PDF or a zip of PDFs.")
+
+
+def batch_mode():
+    files = st.file_uploader(f"Upload trail issue photos or a zip of them (up to {batch_reports.MAX_PHOTOS})",
+                             type=["jpg", "jpeg", "png", "zip"], accept_multiple_files=True)
+    st.caption("⚠️ Please upload images related to trail issues only. Avoid uploading images with identifiable people or private property.")
+    location = st.selectbox("Where were these photos taken?", locations)
+    comments = st.text_input("Additional Comments (optional)", help="Added to every report in the batch.")
+    output = st.radio("Download as", ("One merged PDF", "Zip of PDFs"), horizontal=True)
+    consent = st.checkbox("📄 Consent to Share",
+                          help="By submitting, you agree to allow your reports and uploaded images to be shared with Santa Clara Valley Water officials.")
+
+    if st.button("Generate Batch Reports"):
+        if not files:
+            st.error("Please upload at least one image before submitting.")
+        elif not consent:
+            st.error("You must agree to the Consent to Share before submitting.")
+        else:
+            try:
+                items = batch_reports.collect([(f.name, f.getvalue()) for f in files])
+            except ValueError as e:
+                st.error(str(e))
+                return
+            if not items:
+                st.error("No JPEG or PNG photos found in the upload.")
+                return
+
+            # Photos are analyzed concurrently; show each one as it finishes
+            progress = st.progress(0.0, text=f"Analyzing {len(items)} photos…")
+            log = st.empty()
+            lines = []
+            start = time.perf_counter()
+            analyzed = batch_reports.analyze_batch(get_client(), get_report_index(), items, location, comments,
+                                                   st.secrets.get("batch_workers", batch_reports.DEFAULT_WORKERS))
+            for done, item in enumerate(analyzed, start=1):
+                status = f"❌ {item.error}" if item.error else ("♻️ matched an earlier report" if item.duplicate else "✅")
+                lines.append(f"- `{item.name}` {status} ({item.seconds:.1f} s)")
+                progress.progress(done / len(items), text=f"Analyzed {done} of {len(items)} photos")
+                log.markdown("\n".join(lines[-10:]))
+
+            failed = [item.name for item in items if item.error]
+            if len(failed) == len(items):
+                st.session_state.pop("batch_export", None)
+                st.error(f"None of the {len(items)} photos could be processed, so there is nothing to download. "
+                         "Please try again.")
+                return
+
+            renderer = get_report_renderer()
+            timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+            if output == "One merged PDF":
+                data = batch_reports.export_pdf(renderer, items, location, comments)
+                name, mime = f"Santa_Clara_Water_Reports_{timestamp}.pdf", "application/pdf"
+            else:
+                data = batch_reports.export_zip(renderer, items, location, comments)
+                name, mime = f"Santa_Clara_Water_Reports_{timestamp}.zip", "application/zip"
+            # The export is a one-off download, so it stays in this process's session
+            st.session_state["batch_export"] = {"data": data, "name": name, "mime": mime, "failed": failed,
+                                                "count": len(items) - len(failed),
+                                                "seconds": time.perf_counter() - start}
+
+    export = st.session_state.get("batch_export")
+    if export:
+        st.success(f"{export['count']} reports generated in {export['seconds']:.1f} s.")
+        if export["failed"]:
+            st.warning("These photos could not be processed: " + ", ".join(export["failed"]))
+        st.download_button(label="📄 Download Your Reports", data=export["data"], file_name=export["name"],
+                           mime=export["mime"])
+
+
+if mode == "Batch of photos":
+    batch_mode()
+    st.stop()
+
 # --- File Upload ---
 uploaded_file = st.file_uploader("Upload a trail issue photo (JPEG, PNG)", type=["jpg", "jpeg", "png"])
 
@@ -48,6 +115,10 @@ selected_location = st.selectbox("Where was this photo taken?", locations)
 user_input = st.text_input("Additional Comments (optional)", 
                             help="Provide more context if the AI might misunderstand your image.")
 
+# --- Duplicate handling ---
+analyze_anyway = st.checkbox("Analyze as a new issue",
+                             help="Skip matching against earlier reports of the same spot and run a fresh AI analysis.")
+
 # --- Consent Checkbox ---
 consent = st.checkbox("📄 Consent to Share", 
                       help="By submitting, you agree to allow your report and uploaded image to be shared with Santa Clara Valley Water officials.")
@@ -64,103 +135,69 @@ if st.button("Submit Report"):
     elif not consent:
         st.error("You must agree to the Consent to Share before submitting.")
     else:
-        with st.spinner('Generating your report...'):
-            try:
-                # Step 1: Process uploaded image into base64 URL-style
-                image = Image.open(uploaded_file)
-                buffered = io.BytesIO()
-                image.save(buffered, format="JPEG")
-                img_base64 = base64.b64encode(buffered.getvalue()).decode()
-
-                # Create a data URL
-                image_data_url = f"data:image/jpeg;base64,{img_base64}"
-
-                # Step 2: Send to OpenAI with detailed prompt
-                prompt = f"""
-                Describe the trail issue shown in the uploaded photo.
-                Location: {selected_location}
-                Include:
-                - What the problem is
-                - 2–3 possible solutions
-                - What potential dangers could occur if this issue is not addressed.
-                User Additional Comments: {user_input}.
-                """
-                response = client.chat.completions.create(
-                    model="gpt-4o",
-                    messages=[
-                        {
-                            "role": "user",
-                            "content": [
-                                {"type": "text", "text": prompt},
-                                {"type": "image_url", "image_url": {"url": image_data_url}}
-                            ]
-                        }
-                    ],
-                    max_tokens=500
-                )
-                description = response.choices[0].message.content
-
-                # Clean any Unicode characters not supported by latin-1
-                description = clean_text(description)
-                user_input = clean_text(user_input)
-
-                # Generate PDF Report
-                pdf = FPDF()
-                pdf.add_page()
-                pdf.set_font("Arial", size=12)
-
-                # Title
-                pdf.cell(0, 10, "Santa Clara Valley Water Report", ln=True, align="C")
-                pdf.ln(10)
-
-                # Date and Location
-                pdf.multi_cell(0, 10, f"Date: {datetime.datetime.now().strftime('%B %d, %Y')}")
-                pdf.multi_cell(0, 10, f"Location: {selected_location}")
-                pdf.ln(5)
-
-                # Description
-                pdf.multi_cell(0, 10, "Trail Issue, Solutions, and Potential Dangers:")
-                pdf.multi_cell(0, 10, description)
-
-                # Optional User Comment
-                if user_input:
-                    pdf.ln(5)
-                    pdf.multi_cell(0, 10, f"Additional User Comments: {user_input}")
-
-                # Footer divider line
-                pdf.set_y(-30)
-                pdf.set_draw_color(169, 169, 169)  # Light gray
-                pdf.line(10, pdf.get_y(), 200, pdf.get_y())
-
-                # Footer text
-                pdf.set_y(-20)
-                pdf.set_font("Arial", size=8)
-                pdf.cell(0, 10, "Generated by EcoTrail AI - Empowering Trail Preservation", align="C")
-
-                # Save PDF to bytes
-                pdf_output = io.BytesIO()
-                pdf_bytes = pdf.output(dest='S').encode('latin1')
-                pdf_output.write(pdf_bytes)
-                pdf_output.seek(0)
-
-                # Generate downloadable filename with timestamp
-                timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-                filename = f"Santa_Clara_Water_Report_{timestamp}.pdf"
-
-                # 📄 Offer download
-                st.success("Report generated successfully!")
-                st.download_button(
-                    label="📄 Download Your Report",
-                    data=pdf_output,
-                    file_name=filename,
-                    mime='application/pdf'
-                )
-
-                # 📄 Display PDF preview inside the app
-                base64_pdf = base64.b64encode(pdf_output.getvalue()).decode('utf-8')
-                pdf_display = f'<iframe src="data:application/pdf;base64,{base64_pdf}" width="700" height="1000" type="application/pdf"></iframe>'
-                st.markdown(pdf_display, unsafe_allow_html=True)
-
-            except Exception as e:
-                st.error(f"Failed to generate report. Error: {str(e)}")
-                st.stop()
+        # Queue the report; the same photo and answers map to the same job, so a double
+        # click does not generate it twice
+        photo = uploaded_file.getvalue()
+        idempotency_key = hashlib.sha256(
+            photo + "\0".join([selected_location, user_input, str(analyze_anyway)]).encode("utf-8")
+        ).hexdigest()
+        state["report_job_id"] = report_queue.submit(
+            report_pipeline.JOB_KIND,
+            {"location": selected_location, "comments": user_input,
+             "analyze_anyway": analyze_anyway, "submitted": time.time()},
+            attachment=photo,
+            idempotency_key=idempotency_key,
+        )
+
+
+def show_report(job):
+    result = job["result"]
+    duplicate = result["duplicate_of"]
+    if duplicate:
+        reported_on = datetime.datetime.fromtimestamp(duplicate["created"]).strftime('%B %d, %Y')
+        st.info(
+            f"This photo matches report #{duplicate['id']} at {job['payload']['location']} from {reported_on}, "
+            "so its AI description was reused. Tick 'Analyze as a new issue' to get a fresh one."
+        )
+    st.caption(
+        f"Photo prepared at {result['photo_size'][0]}×{result['photo_size'][1]}, {result['photo_bytes'] // 1024} KB ("
+        + ", ".join(f"{step} {seconds * 1000:.0f} ms" for step, seconds in result["timings"].items())
+        + ")"
+    )
+
+    # Generate downloadable filename with the submission timestamp
+    timestamp = datetime.datetime.fromtimestamp(job["payload"]["submitted"]).strftime("%Y%m%d_%H%M%S")
+    filename = f"Santa_Clara_Water_Report_{timestamp}.pdf"
+
+    # 📄 Offer download
+    st.success("Report generated successfully!")
+    st.download_button(
+        label="📄 Download Your Report",
+        data=job["artifact"],
+        file_name=filename,
+        mime='application/pdf'
+    )
+
+    # 📄 Display PDF preview inside the app, served as a media file rather than a data URI
+    st.pdf(job["artifact"], height=1000)
+
+
+# Poll the queue until the worker finishes, then rerun once to show the result
+@st.fragment(run_every=2)
+def poll_report(job_id):
+    job = report_queue.get(job_id)
+    if job is None or job["status"] in (DONE, FAILED):  # None: finished and already pruned
+        st.rerun()
+    retrying = f" (retrying, attempt {job['attempts'] + 1})" if job["error"] else ""
+    st.info(f"⏳ Your report is {job['status']}{retrying}. You can keep using the app; it will appear here.")
+
+
+# --- Report status ---
+job_id = state.get("report_job_id")
+job = report_queue.get(job_id) if job_id else None
+if job and job["status"] == DONE:
+    show_report(job)
+elif job and job["status"] == FAILED:
+    st.error(f"Failed to generate report. Error: {job['error']}")
+elif job:
+    poll_report(job_id)
@@ -1,20 +1,34 @@
-from openai import OpenAI
+import datetime
 import streamlit as st
-import pandas as pd
+import uuid
+import bootstrap
+from eco_ledger import BadgeLevels
+import eco_rollups
+import image_cache
+import telemetry
+from resources import (
+    get_client, get_eco_ledger, get_image_cache, get_report_index, get_session_state, get_trail_catalog,
+)
+from stewardship_tips import protection_tips
+
+bootstrap.start_warm_up()
 
 # Initialize OpenAI client
-api_key = st.secrets["openai_api_key"]
-client = OpenAI(api_key=api_key)
+client = get_client()
 
 
 # Set page config
 st.set_page_config(page_title="Eco Actions Tracker", page_icon="🌿", layout="centered")
 
-# Initialize session state
-if 'eco_points' not in st.session_state:
-    st.session_state.eco_points = 0
-if 'badges' not in st.session_state:
-    st.session_state.badges = []
+ledger = get_eco_ledger()
+
+# Identify the user by an id kept in the URL, so points survive a refresh or a bookmark,
+# and in the session store, so it is not lost when the visitor comes back from another page
+state = get_session_state()
+user_id = st.query_params.get("user") or state.get("eco_user") or uuid.uuid4().hex[:12]
+state["eco_user"] = user_id
+if st.query_params.get("user") != user_id:
+    st.query_params["user"] = user_id
 
 # Eco actions with points
 eco_actions = {
@@ -47,6 +61,7 @@ badge_levels = {
     "Trail Hero 🦸‍♂️": 50,
     "Green Guardian 🌳🌟": 100
 }
+badges = BadgeLevels(badge_levels)
 
 # Title
 st.title("🌍 Log Your Eco-Friendly Actions")
@@ -59,10 +74,18 @@ for action in eco_actions:
     if st.checkbox(action):
         selected_actions.append(action)
 
+trail_options = ["Not on a listed trail"] + [t.name for t in get_trail_catalog().trails]
+selected_trail = st.selectbox("🥾 Which trail were you on?", trail_options)
+action_trail = None if selected_trail == trail_options[0] else selected_trail
+
 # Submit button
 if st.button("Submit Actions"):
-    points_earned = sum(eco_actions[action]["points"] for action in selected_actions)
-    st.session_state.eco_points += points_earned
+    with telemetry.span("eco_actions", "log_actions"):
+        points_before = ledger.total(user_id)
+        points_earned = ledger.record(
+            user_id, [(action, eco_actions[action]["points"]) for action in selected_actions], trail=action_trail
+        )
+    eco_points = points_before + points_earned
     st.success(f"You earned {points_earned} EcoPoints! 🌟")
     
     # Show what user selected with descriptions
@@ -72,39 +95,104 @@ if st.button("Submit Actions"):
             st.markdown(f"**{action}** – {eco_actions[action]['description']}")
 
     # Badge check
-    for badge, threshold in badge_levels.items():
-        if st.session_state.eco_points >= threshold and badge not in st.session_state.badges:
-            st.session_state.badges.append(badge)
-            st.balloons()
-            st.toast(f"🎉 Congrats! You've earned the '{badge}' badge!")
-
-             # Let user know how many points to next badge
-    next_badge_points = None
-    for badge, threshold in sorted(badge_levels.items(), key=lambda x: x[1]):
-        if st.session_state.eco_points < threshold:
-            next_badge_points = threshold - st.session_state.eco_points
-            next_badge_name = badge
-            break
-
-    if next_badge_points is not None:
+    for badge in badges.earned(eco_points)[len(badges.earned(points_before)):]:
+        st.balloons()
+        st.toast(f"🎉 Congrats! You've earned the '{badge}' badge!")
+
+    # Let user know how many points to next badge
+    next_badge = badges.next(eco_points)
+    if next_badge is not None:
+        next_badge_name, next_badge_points = next_badge
         st.info(f"✨ Only **{next_badge_points} EcoPoints** more to reach **'{next_badge_name}'** badge! Keep going!")
     else:
         st.info("🏆 You've earned all available badges! Amazing work!")
 
 
 # Display current score and badges
+eco_points = ledger.total(user_id)
+earned_badges = badges.earned(eco_points)
 st.markdown("---")
 st.subheader("🎯 Your Progress:")
-st.write(f"**Total EcoPoints:** {st.session_state.eco_points}")
-st.progress(min(st.session_state.eco_points, 100))
+st.write(f"**Total EcoPoints:** {eco_points}")
+st.progress(min(eco_points, 100))
 
-if st.session_state.badges:
+if earned_badges:
     st.write("**🏅 Badges Earned:**")
-    for badge in st.session_state.badges:
+    for badge in earned_badges:
         st.markdown(f"- {badge}")
 else:
     st.write("No badges yet — keep logging actions!")
 
+recent = ledger.history(user_id, limit=10)
+if recent:
+    with st.expander("🗓️ Your recent actions"):
+        for action, points, created in recent:
+            when = datetime.datetime.fromtimestamp(created).strftime("%b %d, %H:%M")
+            st.markdown(f"{when} — {action} (+{points})")
+handle = ledger.handle(user_id)
+if handle:
+    st.caption(f"You appear on the community leaderboard as **{handle}**.")
+st.caption("Bookmark this page to come back to your EcoPoints later.")
+
+
+# ----------------------------------------------
+# 🏆 Community: served from rollups, refreshed every 30 seconds
+# ----------------------------------------------
+TREND_WEEKS = 8
+
+
+@st.cache_data(ttl=30)
+@telemetry.timed("eco_actions", "community_stats")
+def load_community_stats():
+    now = datetime.datetime.now(datetime.timezone.utc)
+    weeks = [eco_rollups.bucket("week", now - datetime.timedelta(weeks=n)) for n in range(TREND_WEEKS - 1, -1, -1)]
+    trends = {}
+    for action in eco_actions:
+        counts = dict(ledger.action_trend(action, period="week", since=weeks[0]))
+        trends[action] = [counts.get(week, 0) for week in weeks]
+    return {
+        "leaderboard": ledger.leaderboard(k=10),
+        "actions": ledger.action_totals(),
+        "weeks": weeks,
+        "trends": trends,
+        "trash_by_trail": ledger.trail_totals("🗑️ Picked up trash"),
+        "reports_by_location": get_report_index().counts_by_location(),
+    }
+
+
+stats = load_community_stats()
+st.markdown("---")
+st.subheader("🏆 Community This Week")
+col1, col2 = st.columns(2)
+with col1:
+    st.write("**Top EcoPoints earners**")
+    if stats["leaderboard"]:
+        for rank, (leader, handle, points) in enumerate(stats["leaderboard"], start=1):
+            you = " (you)" if leader == user_id else ""
+            st.markdown(f"{rank}. **{handle}**{you} — {points} pts")
+    else:
+        st.write("No actions logged yet this week.")
+with col2:
+    st.write("**Actions logged**")
+    for action, count, _ in stats["actions"]:
+        st.markdown(f"{action}: **{count}**")
+
+col1, col2 = st.columns(2)
+with col1:
+    st.write("**🗑️ Trash pickups by trail (all time)**")
+    for trail, count in stats["trash_by_trail"]:
+        st.markdown(f"{trail}: **{count}**")
+with col2:
+    st.write("**📷 Reports by location (all time)**")
+    for location, count in stats["reports_by_location"]:
+        st.markdown(f"{location}: **{count}**")
+
+if any(any(counts) for counts in stats["trends"].values()):
+    import pandas as pd
+
+    st.write(f"**📈 Actions logged per week (last {TREND_WEEKS} weeks)**")
+    st.line_chart(pd.DataFrame(stats["trends"], index=stats["weeks"]))
+
 # ----------------------------------------------
 # 🌱 Trail Stewardship Section: Why & How-to
 # ----------------------------------------------
@@ -120,44 +208,13 @@ st.write(
     """
 )
 
-# Trail tips and prompts
-protection_tips = [
-    {
-        "title": "Pack it out for the Creek",
-        "tip": "Trash left behind can wash into the creek — take yours and a little extra litter back with you to help keep the water clean.",
-        "prompt": "a hiker picking up trash with a reusable bag on a clean creekside forest trail"
-    },
-    {
-        "title": "Snap Smart",
-        "tip": "Snapping the perfect photo? Just zoom in from the trail — no need to wander off-path. Nature looks best when we leave it just as we found it.",
-        "prompt": "a hiker taking a photo of a wildflower while standing on a marked forest trail, respecting nature and staying off sensitive vegetation"
-    },
-    {
-        "title": "Bring a Reusable Bottle",
-        "tip": "A refillable bottle keeps you going — and keeps plastic out of the trail.",
-        "prompt": "a reusable water bottle placed on a rock beside a creek in a natural park"
-    },
-    {
-        "title": "Report Trail Damage",
-        "tip": "If you see flooding, erosion, or fallen trees, take a photo and share it with Santa Clara Valley Water District.",
-        "prompt": "a person taking a photo of a damaged trail next to a creek for reporting"
-    }
-]
-
 for i, tip in enumerate(protection_tips):
     with st.expander(f"📌 {tip['title']}"):
         st.write(tip["tip"])
         if st.button(f"Show example image for: {tip['title']}", key=f"img_{i}"):
             with st.spinner("Generating example image..."):
                 try:
-                    response = client.images.generate(
-                        model="dall-e-3",  
-                        prompt=tip["prompt"],
-                        size="1024x1024",  
-                        quality="standard",
-                        n=1
-                    )
-                    image_url = response.data[0].url
-                    st.image(image_url, caption=tip["title"], use_container_width=True)
+                    image_path = image_cache.cached_image(get_image_cache(), client, tip["prompt"], width=1024)
+                    st.image(image_path, caption=tip["title"], width="stretch")
                 except Exception as e:
-                    st.error(f"Couldn't generate image: {str(e)}")
\ No newline at end of file
+                    st.error(f"Couldn't generate image: {str(e)}")
@@ -0,0 +1,91 @@
+import streamlit as st
+import datetime
+import hmac
+import bootstrap
+import telemetry
+from resources import get_telemetry
+
+bootstrap.start_warm_up()
+
+st.set_page_config(page_title="Latency Dashboard", page_icon="📊", layout="wide")
+
+# Admin only: closed unless an admin_password secret is configured, then ask for it first
+admin_password = st.secrets.get("admin_password")
+if not admin_password:
+    st.error("The dashboard is disabled: set an `admin_password` secret to enable it.")
+    st.stop()
+if not hmac.compare_digest(st.session_state.get("admin_password", ""), admin_password):
+    entered = st.text_input("Admin password", type="password")
+    if not hmac.compare_digest(entered, admin_password):
+        if entered:
+            st.error("Wrong password.")
+        st.stop()
+    st.session_state["admin_password"] = entered
+
+store = get_telemetry()
+
+st.title("📊 Latency & Cost Dashboard")
+st.caption("Model calls and heavy steps across all pages and report workers. Days are UTC.")
+
+days = st.radio("Period", (1, 7, 30), index=1, horizontal=True, format_func=lambda d: "Today" if d == 1 else f"Last {d} days")
+since = (datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=days - 1)).strftime("%Y-%m-%d")
+
+
+def ms(seconds):
+    return None if seconds is None else round(seconds * 1000)
+
+
+@st.cache_data(ttl=15)
+def load(since):
+    return store.histograms(since), store.histograms(since, cached=False), store.usage(since), store.daily_cost(since)
+
+
+all_latency, uncached_latency, usage, daily_cost = load(since)
+if not usage:
+    st.info("Nothing recorded for this period yet.")
+    st.stop()
+
+# --- Cost and volume per feature ---
+by_feature = {}
+for feature, _, _, calls, errors, _, _, _, _, cost, _ in usage:
+    totals = by_feature.setdefault(feature, [0, 0, 0.0])
+    totals[0] += calls
+    totals[1] += errors
+    totals[2] += cost
+columns = st.columns(len(by_feature))
+for column, (feature, (calls, errors, cost)) in zip(columns, sorted(by_feature.items())):
+    column.metric(feature.replace("_", " ").title(), f"${cost:.2f}", f"{calls} calls · {errors} errors", delta_color="off")
+
+# --- Percentiles per step ---
+rows = []
+for feature, step, model, calls, errors, cache_hits, prompt_tokens, completion_tokens, images, cost, seconds in usage:
+    p50, p95, p99 = telemetry.percentiles(all_latency.get((feature, step), {}))
+    uncached_p95 = telemetry.percentiles(uncached_latency.get((feature, step), {}), (0.95,))[0]
+    rows.append({
+        "feature": feature,
+        "step": step,
+        "model": model,
+        "calls": calls,
+        "cache hit %": round(100 * cache_hits / calls),
+        "errors": errors,
+        "p50 ms": ms(p50),
+        "p95 ms": ms(p95),
+        "p99 ms": ms(p99),
+        "uncached p95 ms": ms(uncached_p95),
+        "prompt tokens": prompt_tokens,
+        "completion tokens": completion_tokens,
+        "images": images,
+        "cost $": round(cost, 4),
+        "cost per call $": round(cost / calls, 5),
+    })
+st.subheader("⏱️ Latency by step")
+st.caption("Percentiles are read from log-scale histograms, so they are accurate to within ~19%.")
+st.dataframe(rows, width="stretch", hide_index=True)
+
+# --- Daily cost ---
+st.subheader("💵 Daily cost by feature")
+chart = {}
+for day, feature, cost in daily_cost:
+    chart.setdefault(day, {})[feature] = cost
+st.bar_chart([{"day": day, **costs} for day, costs in chart.items()], x="day")
+st.caption(f"Prices used (USD): {telemetry.PRICES}")
@@ -0,0 +1,131 @@
+"""Pre-generate Virtual Trails content into the local content store.
+
+Usage (from the repository root):
+    python "Trail App/prebuild.py"            # real model, uses .streamlit/secrets.toml or OPENAI_API_KEY
+    python "Trail App/prebuild.py" --stub     # offline, deterministic stub model
+    python "Trail App/prebuild.py" --images   # also pre-generate the stewardship tip images
+"""
+import argparse
+import os
+import sys
+import time
+import tomllib
+from concurrent.futures import ThreadPoolExecutor
+
+import image_cache
+import trail_content
+from trail_catalog import get_catalog
+from content_store import ContentStore, DEFAULT_STORE_PATH
+from llm_cache import ResponseCache
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def load_api_key():
+    if os.environ.get("OPENAI_API_KEY"):
+        return os.environ["OPENAI_API_KEY"]
+    with open(os.path.join(APP_DIR, ".streamlit", "secrets.toml"), "rb") as f:
+        return tomllib.load(f)["openai_api_key"]
+
+
+def build_trail(client, cache, pool, trail):
+    """Generate and validate overview, stops and stop details for one trail."""
+    trail_name, location = trail.name, trail.full_location
+    overview, stops = trail_content.generate_overview(client, cache, trail_name, location)
+    errors = trail_content.validate_overview(overview) + trail_content.validate_stops(stops)
+    if errors:
+        return trail_name, overview, stops, {}, errors
+
+    futures = {
+        stop["name"]: pool.submit(
+            trail_content.generate_stop_detail, client, cache, trail_name, location, stop["name"], stop["description"]
+        )
+        for stop in stops
+    }
+    details = {name: future.result() for name, future in futures.items()}
+    for name, detail in details.items():
+        errors += [f"{name}: {e}" for e in trail_content.validate_stop_detail(detail)]
+    return trail_name, overview, stops, details, errors
+
+
+def try_build_trail(client, cache, pool, trail):
+    """build_trail(), with an exception (e.g. the API unreachable) reported as the trail's error."""
+    try:
+        return build_trail(client, cache, pool, trail)
+    except Exception as e:
+        return trail.name, None, None, {}, [f"{type(e).__name__}: {e}"]
+
+
+def prebuild(client, store, cache=None, workers=8, trails=None):
+    trails = trails if trails is not None else get_catalog().trails
+    version = store.begin_build(note=f"{len(trails)} trails")
+    # Trails and stop details share one pool; stop work is queued by the trail tasks,
+    # so give the pool room for both levels.
+    with ThreadPoolExecutor(max_workers=workers) as stop_pool, \
+            ThreadPoolExecutor(max_workers=max(1, min(workers, len(trails)))) as trail_pool:
+        results = list(trail_pool.map(lambda t: try_build_trail(client, cache, stop_pool, t), trails))
+
+    failures = {}
+    for trail_name, overview, stops, details, errors in results:
+        if errors:
+            failures[trail_name] = errors
+            continue
+        store.put(version, trail_name, "overview", overview)
+        store.put(version, trail_name, "stops", stops)
+        for name, detail in details.items():
+            store.put(version, trail_name, "stop", detail, item=name)
+
+    if failures:
+        store.fail(version, "; ".join(f"{t}: {', '.join(e)}" for t, e in failures.items()))
+    else:
+        store.publish(version)
+        store.prune()
+    return version, failures
+
+
+def prebuild_images(client, cache, workers=4):
+    """Generate any stewardship tip images missing from the image cache; returns how many were made."""
+    from stewardship_tips import protection_tips
+    missing = [
+        tip["prompt"] for tip in protection_tips
+        if cache.get(image_cache.make_key(image_cache.MODEL, tip["prompt"], image_cache.SIZE, image_cache.QUALITY)) is None
+    ]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(lambda prompt: image_cache.cached_image(cache, client, prompt), missing))
+    return len(missing)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stub", action="store_true", help="use the offline stub model client")
+    parser.add_argument("--workers", type=int, default=8, help="maximum concurrent model calls")
+    parser.add_argument("--store", default=DEFAULT_STORE_PATH, help="path of the content store")
+    parser.add_argument("--images", action="store_true", help="also pre-generate stewardship tip images")
+    args = parser.parse_args(argv)
+
+    if args.stub:
+        from stub_client import StubClient
+        client, cache = StubClient(), None
+    else:
+        from model_client import SharedClient, make_openai_client
+        client, cache = SharedClient(make_openai_client(load_api_key())), ResponseCache()
+
+    start = time.perf_counter()
+    version, failures = prebuild(client, ContentStore(args.store), cache=cache, workers=args.workers)
+    elapsed = time.perf_counter() - start
+    if failures:
+        for trail_name, errors in failures.items():
+            print(f"✗ {trail_name}: {'; '.join(errors)}")
+        print(f"Build {version} failed validation after {elapsed:.1f}s; previous content stays live.")
+        return 1
+    print(f"✅ Published content version {version} in {elapsed:.1f}s")
+
+    if args.images:
+        start = time.perf_counter()
+        made = prebuild_images(client, image_cache.ImageCache())
+        print(f"✅ Generated {made} tip images in {time.perf_counter() - start:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
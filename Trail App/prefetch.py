@@ -0,0 +1,94 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import trail_content
+
+# Background generation of the stops around the one being viewed, so Next/Previous
+# on the virtual walk usually finds its description already waiting.
+# Finished descriptions also land in the response cache, so other sessions benefit too.
+
+DEFAULT_DEPTH = 2          # stops ahead of the current one to generate
+DEFAULT_MAX_IN_FLIGHT = 2  # concurrent model calls allowed per session
+
+
+class StopPrefetcher:
+    """Per-session prefetcher; `pool` is a thread pool shared by all sessions."""
+
+    def __init__(self, pool, client, cache, store=None, depth=DEFAULT_DEPTH, max_in_flight=DEFAULT_MAX_IN_FLIGHT):
+        self.pool = pool
+        self.client = client
+        self.cache = cache
+        self.store = store
+        self.depth = depth
+        self.max_in_flight = max_in_flight
+        self.hits = 0
+        self.misses = 0
+        self._shown = None  # (trail, stop) last looked up, so reruns of one stop count once
+        self._trail = None
+        self._futures = {}
+        self._lock = threading.Lock()
+
+    def set_trail(self, trail_name):
+        """Drop all prefetched and queued work when the user switches trails."""
+        if trail_name != self._trail:
+            self.cancel()
+            self._trail = trail_name
+
+    def cancel(self):
+        with self._lock:
+            for future in self._futures.values():
+                future.cancel()
+            self._futures.clear()
+
+    def _in_flight(self):
+        return sum(not future.done() for future in self._futures.values())
+
+    def prefetch(self, trail_name, location, stops, index, use_store=True):
+        """Queue the next `depth` stops and the previous one, nearest first.
+
+        With `use_store` False, stops in the prebuilt content store are generated as well.
+        """
+        self.set_trail(trail_name)
+        wanted = [index + step for step in range(1, self.depth + 1)] + [index - 1]
+        with self._lock:
+            for idx in wanted:
+                if not 0 <= idx < len(stops) or self._in_flight() >= self.max_in_flight:
+                    continue
+                stop = stops[idx]
+                if stop["name"] in self._futures:
+                    continue
+                if use_store and self.store is not None and self.store.get_stop_detail(trail_name, stop["name"]) is not None:
+                    continue
+                self._futures[stop["name"]] = self.pool.submit(
+                    trail_content.generate_stop_detail,
+                    self.client, self.cache, trail_name, location, stop["name"], stop["description"]
+                )
+
+    def get(self, trail_name, stop_name):
+        """Return the prefetched description, or None (counted as a miss) if it is not ready.
+
+        A prefetch that is still running is waited for rather than duplicated. Hits and misses
+        are counted once per stop navigated to, not on every rerun that shows the same stop.
+        """
+        with self._lock:
+            future = self._futures.get(stop_name) if trail_name == self._trail else None
+            navigated = self._shown != (trail_name, stop_name)
+            self._shown = (trail_name, stop_name)
+        detail = None
+        if future is not None and not future.cancelled():
+            try:
+                detail = future.result()
+            except Exception:
+                # Let the page generate it live and surface any error there
+                with self._lock:
+                    self._futures.pop(stop_name, None)
+        if navigated:
+            if detail is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return detail
+
+
+def make_pool(max_workers=8):
+    return ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="stop-prefetch")
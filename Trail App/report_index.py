@@ -0,0 +1,113 @@
+import os
+import sqlite3
+import threading
+import time
+
+# Persistent index of submitted reports, keyed by the photo's perceptual hash and location.
+# Near-duplicate lookup uses multi-index hashing: the 64-bit hash is split into 8 bytes,
+# each stored in its own indexed column. Two hashes within Hamming distance 7 must agree
+# on at least one byte, so only rows sharing a byte are fetched and compared exactly.
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_INDEX_PATH = os.path.join(APP_DIR, "data", "reports.sqlite3")
+BANDS = 8
+DEFAULT_MAX_DISTANCE = 6  # must stay below BANDS for lookups to be exact
+
+
+def bands(phash):
+    return [(phash >> (8 * i)) & 0xFF for i in range(BANDS)]
+
+
+def hamming(a, b):
+    return bin(a ^ b).count("1")
+
+
+class ReportIndex:
+    def __init__(self, path=DEFAULT_INDEX_PATH, max_distance=DEFAULT_MAX_DISTANCE):
+        if max_distance >= BANDS:
+            raise ValueError(f"max_distance must be below {BANDS}")
+        self.path = path
+        self.max_distance = max_distance
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        band_columns = ", ".join(f"b{i} INTEGER NOT NULL" for i in range(BANDS))
+        band_indexes = "\n".join(
+            f"CREATE INDEX IF NOT EXISTS reports_b{i} ON reports (location, b{i});" for i in range(BANDS)
+        )
+        self._conn().executescript(
+            f"""
+            CREATE TABLE IF NOT EXISTS reports (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                phash TEXT NOT NULL,
+                location TEXT NOT NULL,
+                description TEXT NOT NULL,
+                created REAL NOT NULL,
+                {band_columns}
+            );
+            {band_indexes}
+            CREATE TABLE IF NOT EXISTS report_counts (
+                location TEXT PRIMARY KEY,
+                reports INTEGER NOT NULL
+            );
+            """
+        )
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def add(self, phash, location, description):
+        """Record a report and return its id."""
+        columns = ", ".join(f"b{i}" for i in range(BANDS))
+        marks = ", ".join("?" * (4 + BANDS))
+        conn = self._conn()
+        with self._write_lock:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                report_id = conn.execute(
+                    f"INSERT INTO reports (phash, location, description, created, {columns}) VALUES ({marks})",
+                    [f"{phash:016x}", location, description, time.time(), *bands(phash)],
+                ).lastrowid
+                conn.execute(
+                    "INSERT INTO report_counts (location, reports) VALUES (?, 1) "
+                    "ON CONFLICT (location) DO UPDATE SET reports = reports + 1",
+                    (location,),
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return report_id
+
+    def counts_by_location(self):
+        """(location, reports) pairs, most reported first; kept as a running count."""
+        return self._conn().execute("SELECT location, reports FROM report_counts ORDER BY reports DESC").fetchall()
+
+    def find_similar(self, phash, location):
+        """Return the closest earlier report at `location` within max_distance, or None.
+
+        The result is a dict with id, description, created and distance.
+        """
+        # One index lookup per band, unioned so a row matching several bands is compared once
+        query = " UNION ".join(
+            f"SELECT id, phash FROM reports WHERE location = ? AND b{i} = ?" for i in range(BANDS)
+        )
+        params = [value for band in bands(phash) for value in (location, band)]
+        conn = self._conn()
+        best_id, best_distance = None, None
+        for report_id, stored in conn.execute(query, params):
+            distance = hamming(phash, int(stored, 16))
+            if distance <= self.max_distance and (best_id is None or distance < best_distance):
+                best_id, best_distance = report_id, distance
+        if best_id is None:
+            return None
+        description, created = conn.execute(
+            "SELECT description, created FROM reports WHERE id = ?", (best_id,)
+        ).fetchone()
+        return {"id": best_id, "description": description, "created": created, "distance": best_distance}
@@ -0,0 +1,87 @@
+import datetime
+import io
+import time
+
+import telemetry
+
+# The report generation pipeline run by the background job workers:
+# photo ingestion, duplicate lookup, gpt-4o description and PDF rendering.
+
+MODEL = "gpt-4o"
+JOB_KIND = "report"
+FEATURE = "reports"  # telemetry feature name
+
+
+def report_prompt(location, comments):
+    return f"""
+                Describe the trail issue shown in the uploaded photo.
+                Location: {location}
+                Include:
+                - What the problem is
+                - 2–3 possible solutions
+                - What potential dangers could occur if this issue is not addressed.
+                User Additional Comments: {comments}.
+                """
+
+
+def describe_photo(client, image_data_url, location, comments):
+    response = client.chat.completions.create(
+        model=MODEL,
+        messages=[
+            {
+                "role": "user",
+                "content": [
+                    {"type": "text", "text": report_prompt(location, comments)},
+                    {"type": "image_url", "image_url": {"url": image_data_url}}
+                ]
+            }
+        ],
+        max_tokens=500
+    )
+    return response.choices[0].message.content
+
+
+def analyze(client, index, location, comments, photo, analyze_anyway=False):
+    """Ingest a photo and describe it, reusing the description of a near-identical earlier report.
+
+    Returns (ingested image, description, duplicate report or None).
+    """
+    import image_ingest  # Pillow is loaded only once there is a photo to process
+
+    with telemetry.span(FEATURE, "ingest"):
+        ingested = image_ingest.ingest(io.BytesIO(photo))
+
+    with telemetry.span(FEATURE, "duplicate_lookup"):
+        duplicate = None if analyze_anyway else index.find_similar(ingested.phash, location)
+    if duplicate:
+        telemetry.mark_cache_hit()
+        return ingested, duplicate["description"], duplicate
+    with telemetry.span(FEATURE, "vision", MODEL):
+        description = describe_photo(client, ingested.data_url, location, comments)
+    index.add(ingested.phash, location, description)
+    return ingested, description, None
+
+
+def generate_report(client, index, renderer, payload, photo):
+    """Build one report; returns (result, pdf_bytes) as expected by job_queue.WorkerPool."""
+    telemetry.get_telemetry().record(FEATURE, "queue_wait", max(0.0, time.time() - payload["submitted"]))
+    location, comments = payload["location"], payload.get("comments", "")
+    with telemetry.span(FEATURE, "job"):
+        ingested, description, duplicate = analyze(
+            client, index, location, comments, photo, payload.get("analyze_anyway", False)
+        )
+        submitted = datetime.datetime.fromtimestamp(payload["submitted"])
+        with telemetry.span(FEATURE, "pdf"):
+            pdf_bytes = renderer.render(location, description, comments=comments, photo=ingested.jpeg, date=submitted)
+    result = {
+        "description": description,
+        "duplicate_of": duplicate and {"id": duplicate["id"], "created": duplicate["created"]},
+        "photo_size": list(ingested.size),
+        "photo_bytes": len(ingested.jpeg),
+        "timings": ingested.timings,
+    }
+    return result, pdf_bytes
+
+
+def make_handler(client, index, renderer):
+    return lambda payload, photo: generate_report(client, index, renderer, payload, photo)
@@ -0,0 +1,128 @@
+"""PDF renderer for trail issue reports.
+
+A template document with the Unicode font already loaded is built once and copied for
+each report, so only the variable fields are laid out per render.
+
+Benchmark (from the repository root):
+    python "Trail App/report_renderer.py" --count 200
+"""
+import argparse
+import copy
+import datetime
+import io
+import os
+import time
+
+from fontTools.ttLib import TTFont
+from fpdf import FPDF
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+FONT_PATH = os.path.join(APP_DIR, "assets", "fonts", "Lato-Regular.ttf")
+FONT = "Lato"
+PHOTO_WIDTH = 120  # mm
+
+
+class ReportPDF(FPDF):
+    def header(self):
+        self.set_font(FONT, size=16)
+        self.cell(0, 10, "Santa Clara Valley Water Report", align="C", new_x="LMARGIN", new_y="NEXT")
+        self.ln(6)
+        self.set_font(FONT, size=12)
+
+    def footer(self):
+        # Divider line and footer text
+        self.set_y(-30)
+        self.set_draw_color(169, 169, 169)  # Light gray
+        self.line(10, self.get_y(), 200, self.get_y())
+        self.set_y(-20)
+        self.set_font(FONT, size=8)
+        self.cell(0, 10, "Generated by EcoTrail AI - Empowering Trail Preservation", align="C")
+
+
+class ReportRenderer:
+    def __init__(self, font_path=FONT_PATH):
+        template = ReportPDF()
+        template.add_font(FONT, "", font_path)
+        template.set_font(FONT, size=12)
+        self._template = template
+        with open(font_path, "rb") as f:
+            self._font_data = f.read()
+
+    def _document(self):
+        """A fresh copy of the template to lay one document out on.
+
+        fpdf shares the parsed font between copies and output() subsets it in place, which
+        would leave later documents without the glyphs earlier ones did not use, so each copy
+        gets its own font, parsed lazily from the bytes kept in memory.
+        """
+        pdf = copy.deepcopy(self._template)
+        for font in pdf.fonts.values():
+            if hasattr(font, "ttfont"):
+                font.ttfont = TTFont(io.BytesIO(self._font_data), recalcTimestamp=False, lazy=True)
+        return pdf
+
+    def render(self, location, description, comments="", photo=None, date=None):
+        """Return the report as PDF bytes; `photo` is encoded JPEG bytes (e.g. from image_ingest)."""
+        pdf = self._document()
+        self._add_report(pdf, location, description, comments, photo, date)
+        return bytes(pdf.output())
+
+    def render_many(self, reports):
+        """One PDF holding every report, each starting on a new page.
+
+        `reports` are dicts of render()'s arguments. The font is embedded once for the whole
+        document, so this is smaller than the separate PDFs put together.
+        """
+        pdf = self._document()
+        for report in reports:
+            self._add_report(pdf, **report)
+        return bytes(pdf.output())
+
+    def _add_report(self, pdf, location, description, comments="", photo=None, date=None):
+        date = date or datetime.datetime.now()
+        pdf.add_page()
+        pdf.multi_cell(0, 8, f"Date: {date.strftime('%B %d, %Y')}", new_x="LMARGIN", new_y="NEXT")
+        pdf.multi_cell(0, 8, f"Location: {location}", new_x="LMARGIN", new_y="NEXT")
+        pdf.ln(4)
+
+        if photo:
+            pdf.image(io.BytesIO(photo), x=(pdf.w - PHOTO_WIDTH) / 2, w=PHOTO_WIDTH)
+            pdf.ln(4)
+
+        pdf.multi_cell(0, 8, "Trail Issue, Solutions, and Potential Dangers:", new_x="LMARGIN", new_y="NEXT")
+        pdf.multi_cell(0, 8, description, new_x="LMARGIN", new_y="NEXT")
+
+        if comments:
+            pdf.ln(4)
+            pdf.multi_cell(0, 8, f"Additional User Comments: {comments}", new_x="LMARGIN", new_y="NEXT")
+
+
+def benchmark(count, photo=None):
+    renderer = ReportRenderer()
+    description = (
+        "A large valley oak has fallen across the path near the creek crossing – it blocks the trail "
+        "and has damaged the bank. Possible solutions: “cut and clear” the trunk, stabilize the bank, "
+        "and post a detour. Left as is, hikers may climb over it or walk onto the eroding edge. "
+    ) * 4
+    start = time.perf_counter()
+    for _ in range(count):
+        renderer.render("San José – Coyote Creek", description, "Seen on the way to the café", photo=photo)
+    return count / (time.perf_counter() - start)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=100, help="number of reports to render")
+    parser.add_argument("--photo", help="JPEG to embed in each report")
+    args = parser.parse_args(argv)
+
+    photo = None
+    if args.photo:
+        with open(args.photo, "rb") as f:
+            photo = f.read()
+    rate = benchmark(args.count, photo)
+    print(f"Rendered {args.count} reports at {rate:.1f} reports/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+import streamlit as st
+
+# Resources shared by every page and session in the Streamlit process.
+# Each module is imported inside its getter, so a page only pays for the libraries
+# (openai, Pillow, fpdf, ...) behind the resources it actually uses, and only once.
+
+
+@st.cache_resource(show_spinner=False)
+def get_client():
+    """The process-wide model client (pooled, rate-limited, retried, coalesced)."""
+    from model_client import SharedClient, make_openai_client
+
+    if st.secrets.get("stub_model", False):
+        # Offline runs and benchmarks: the deterministic stub used by prebuild --stub
+        from stub_client import StubClient
+        return SharedClient(StubClient())
+    return SharedClient(make_openai_client(st.secrets["openai_api_key"], base_url=st.secrets.get("openai_base_url")))
+
+
+# All trails, indexed by name and location (see trail_catalog.py)
+@st.cache_resource(show_spinner=False)
+def get_trail_catalog():
+    from trail_catalog import get_catalog
+    return get_catalog()
+
+
+# Shared response cache (one per process, backed by disk so it also survives restarts)
+@st.cache_resource(show_spinner=False)
+def get_response_cache():
+    from llm_cache import ResponseCache
+    return ResponseCache()
+
+
+# Semantic search over the catalog and all generated trail content (see trail_search.py)
+@st.cache_resource(show_spinner=False)
+def get_trail_search():
+    from trail_search import TrailSearch
+
+    search = TrailSearch(get_trail_catalog(), get_content_store(), get_response_cache())
+    search.sync()
+    return search
+
+
+# Prebuilt trail content (see prebuild.py); empty until a build has been published
+@st.cache_resource(show_spinner=False)
+def get_content_store():
+    from content_store import ContentStore
+    return ContentStore()
+
+
+# Worker threads for background stop generation, shared by every session
+@st.cache_resource
+def get_prefetch_pool():
+    from prefetch import make_pool
+    return make_pool()
+
+
+# Responsive hero image variants (see trail_assets.py), read from disk once per process
+@st.cache_resource(show_spinner=False)
+def get_trail_image_manifest():
+    import trail_assets
+    return trail_assets.load_manifest()
+
+
+# Index of earlier reports, used to spot several photos of the same issue
+@st.cache_resource(show_spinner=False)
+def get_report_index():
+    from report_index import ReportIndex
+    return ReportIndex()
+
+
+# PDF template with fonts loaded once per process
+@st.cache_resource(show_spinner=False)
+def get_report_renderer():
+    from report_renderer import ReportRenderer
+    return ReportRenderer()
+
+
+@st.cache_resource(show_spinner=False)
+def get_report_queue():
+    """The durable report job queue, with its worker threads started on first use."""
+    import report_pipeline
+    from job_queue import JobQueue, WorkerPool
+
+    queue = JobQueue()
+    handler = report_pipeline.make_handler(get_client(), get_report_index(), get_report_renderer())
+    WorkerPool(queue, {report_pipeline.JOB_KIND: handler}, workers=st.secrets.get("report_workers", 4))
+    return queue
+
+
+# EcoPoints ledger; its writer thread batches commits from every session
+@st.cache_resource(show_spinner=False)
+def get_eco_ledger():
+    from eco_ledger import EcoLedger
+    return EcoLedger()
+
+
+# Latency histograms and model usage recorded by every page and worker (see telemetry.py)
+@st.cache_resource(show_spinner=False)
+def get_telemetry():
+    import telemetry
+    return telemetry.get_telemetry()
+
+
+# Generated example images, stored on disk as WebP
+@st.cache_resource(show_spinner=False)
+def get_image_cache():
+    from image_cache import ImageCache
+    return ImageCache()
+
+
+# Visitor state shared by every process pointed at the same backend (see session_store.py)
+@st.cache_resource(show_spinner=False)
+def get_session_store():
+    import session_store
+    return session_store.make_store(
+        st.secrets.get("session_backend", "memory"),
+        st.secrets.get("session_db"),
+        st.secrets.get("session_ttl_hours", 24) * 3600,
+    )
+
+
+def get_session_state():
+    """This visitor's SessionState for the current run.
+
+    The session id is kept in the URL (?sid=...) so it survives reconnects, restarts and
+    landing on another replica, and in st.session_state so it follows page switches.
+    """
+    import session_store
+
+    sid = st.query_params.get("sid")
+    if not (sid and session_store.SESSION_ID.match(sid)):
+        sid = st.session_state.get("sid") or session_store.new_session_id()
+    st.session_state["sid"] = sid
+    if st.query_params.get("sid") != sid:
+        st.query_params["sid"] = sid
+    return get_session_store().open(st.secrets.get("tenant", "default"), sid)
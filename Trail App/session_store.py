@@ -0,0 +1,269 @@
+import json
+import os
+import re
+import secrets
+import sqlite3
+import threading
+import time
+import zlib
+
+# Per-visitor state that outlives one Streamlit process.
+# st.session_state lives in the memory of the process a browser tab is connected to, so a
+# restart loses it and every replica behind a load balancer sees a different one. The pages
+# keep their walk state here instead: a backend holds serialized values per (tenant,
+# session, key), the session id travels in the URL (?sid=...), and any process pointed at
+# the same backend can pick a visitor up where another left off.
+#
+# Backends: "memory" (the default; one process, like st.session_state but surviving
+# reconnects) and "sqlite" (a shared file for several local processes). Values must be
+# JSON-serializable and are re-assigned, not mutated in place, so only changed keys are
+# written back.
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_SESSIONS_PATH = os.path.join(APP_DIR, "data", "sessions.sqlite3")
+DEFAULT_TTL = 24 * 3600  # seconds a session may sit idle before it is dropped
+TOUCH_INTERVAL = 60  # seconds between idle-clock updates for a session that is only read
+SWEEP_INTERVAL = 300  # seconds between sweeps for expired sessions
+COMPRESS_MIN = 512  # bytes; smaller values are stored as plain JSON
+SESSION_ID = re.compile(r"^[A-Za-z0-9_-]{16,64}$")
+
+
+def dumps(value):
+    """Compact bytes for a JSON value: 'j' + JSON, or 'z' + zlib'd JSON when that is smaller."""
+    data = json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    if len(data) >= COMPRESS_MIN:
+        packed = zlib.compress(data, 6)
+        if len(packed) < len(data):
+            return b"z" + packed
+    return b"j" + data
+
+
+def loads(data):
+    data = bytes(data)
+    body = zlib.decompress(data[1:]) if data[:1] == b"z" else data[1:]
+    return json.loads(body)
+
+
+def new_session_id():
+    return secrets.token_urlsafe(16)
+
+
+class MemoryBackend:
+    """Sessions in this process only; the same interface as SQLiteBackend."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sessions = {}  # (tenant, session) -> [touched, {key: bytes}]
+
+    def load(self, tenant, session):
+        """Returns ({key: bytes}, last touched) for a session, or ({}, None) if unknown."""
+        with self._lock:
+            entry = self._sessions.get((tenant, session))
+            return (dict(entry[1]), entry[0]) if entry else ({}, None)
+
+    def save(self, tenant, session, values, deleted=()):
+        with self._lock:
+            entry = self._sessions.setdefault((tenant, session), [0.0, {}])
+            entry[0] = time.time()
+            entry[1].update(values)
+            for key in deleted:
+                entry[1].pop(key, None)
+
+    def touch(self, tenant, session):
+        with self._lock:
+            entry = self._sessions.get((tenant, session))
+            if entry:
+                entry[0] = time.time()
+
+    def drop(self, tenant, session):
+        with self._lock:
+            self._sessions.pop((tenant, session), None)
+
+    def expire(self, idle_seconds):
+        """Drop every session idle for longer than `idle_seconds`; returns how many."""
+        cutoff = time.time() - idle_seconds
+        with self._lock:
+            stale = [k for k, (touched, _) in self._sessions.items() if touched < cutoff]
+            for k in stale:
+                del self._sessions[k]
+        return len(stale)
+
+
+class SQLiteBackend:
+    """Sessions in a SQLite file shared by every process on the machine (WAL mode)."""
+
+    def __init__(self, path=DEFAULT_SESSIONS_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn().executescript(
+            """
+            CREATE TABLE IF NOT EXISTS sessions (
+                tenant TEXT NOT NULL,
+                session TEXT NOT NULL,
+                touched REAL NOT NULL,
+                PRIMARY KEY (tenant, session)
+            );
+            CREATE INDEX IF NOT EXISTS sessions_touched ON sessions (touched);
+            CREATE TABLE IF NOT EXISTS state (
+                tenant TEXT NOT NULL,
+                session TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value BLOB NOT NULL,
+                PRIMARY KEY (tenant, session, key)
+            ) WITHOUT ROWID;
+            """
+        )
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def load(self, tenant, session):
+        conn = self._conn()
+        row = conn.execute("SELECT touched FROM sessions WHERE tenant = ? AND session = ?", (tenant, session)).fetchone()
+        if row is None:
+            return {}, None
+        values = conn.execute("SELECT key, value FROM state WHERE tenant = ? AND session = ?", (tenant, session))
+        return {key: bytes(value) for key, value in values}, row[0]
+
+    def save(self, tenant, session, values, deleted=()):
+        with self._write_lock:
+            conn = self._conn()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(
+                    "INSERT INTO sessions (tenant, session, touched) VALUES (?, ?, ?) "
+                    "ON CONFLICT (tenant, session) DO UPDATE SET touched = excluded.touched",
+                    (tenant, session, time.time()),
+                )
+                conn.executemany(
+                    "INSERT OR REPLACE INTO state (tenant, session, key, value) VALUES (?, ?, ?, ?)",
+                    [(tenant, session, key, value) for key, value in values.items()],
+                )
+                conn.executemany(
+                    "DELETE FROM state WHERE tenant = ? AND session = ? AND key = ?",
+                    [(tenant, session, key) for key in deleted],
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+    def touch(self, tenant, session):
+        with self._write_lock:
+            self._conn().execute(
+                "UPDATE sessions SET touched = ? WHERE tenant = ? AND session = ?", (time.time(), tenant, session)
+            )
+
+    def drop(self, tenant, session):
+        with self._write_lock:
+            conn = self._conn()
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM state WHERE tenant = ? AND session = ?", (tenant, session))
+            conn.execute("DELETE FROM sessions WHERE tenant = ? AND session = ?", (tenant, session))
+            conn.execute("COMMIT")
+
+    def expire(self, idle_seconds):
+        cutoff = time.time() - idle_seconds
+        with self._write_lock:
+            conn = self._conn()
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "DELETE FROM state WHERE (tenant, session) IN "
+                "(SELECT tenant, session FROM sessions WHERE touched < ?)",
+                (cutoff,),
+            )
+            removed = conn.execute("DELETE FROM sessions WHERE touched < ?", (cutoff,)).rowcount
+            conn.execute("COMMIT")
+        return removed
+
+
+class SessionState:
+    """One visitor's state for one script run: a small dict-like view over the backend.
+
+    Values are loaded once when the view is opened and decoded on first access. Setting a
+    key writes it through at once (update() writes several in one transaction), and a value
+    that serializes to the same bytes as before is not written at all.
+    """
+
+    def __init__(self, store, tenant, session):
+        self.store = store
+        self.tenant = tenant
+        self.session = session
+        self._raw, _ = store.load(tenant, session)
+        self._values = {}
+
+    def __contains__(self, key):
+        return key in self._raw
+
+    def __getitem__(self, key):
+        if key not in self._values:
+            self._values[key] = loads(self._raw[key])
+        return self._values[key]
+
+    def get(self, key, default=None):
+        return self[key] if key in self._raw else default
+
+    def __setitem__(self, key, value):
+        self.update({key: value})
+
+    def __delitem__(self, key):
+        self.store.save(self.tenant, self.session, {}, deleted=(key,))
+        self._raw.pop(key, None)
+        self._values.pop(key, None)
+
+    def update(self, values):
+        dirty = {}
+        for key, value in values.items():
+            data = dumps(value)
+            if self._raw.get(key) != data:
+                dirty[key] = data
+            self._values[key] = value
+        if dirty:
+            self.store.save(self.tenant, self.session, dirty)
+            self._raw.update(dirty)
+
+
+class SessionStore:
+    """A backend plus the idle-expiry policy; open() gives the per-run SessionState."""
+
+    def __init__(self, backend, ttl=DEFAULT_TTL):
+        self.backend = backend
+        self.ttl = ttl
+        self._last_sweep = time.time()
+
+    def open(self, tenant, session):
+        return SessionState(self, tenant, session)
+
+    def load(self, tenant, session):
+        now = time.time()
+        if now - self._last_sweep > SWEEP_INTERVAL:
+            self._last_sweep = now
+            self.backend.expire(self.ttl)
+        values, touched = self.backend.load(tenant, session)
+        if touched is None:
+            return {}, None
+        if now - touched > self.ttl:  # expired but not swept yet: start over
+            self.backend.drop(tenant, session)
+            return {}, None
+        if now - touched > TOUCH_INTERVAL:
+            self.backend.touch(tenant, session)
+        return values, touched
+
+    def save(self, tenant, session, values, deleted=()):
+        self.backend.save(tenant, session, values, deleted)
+
+
+def make_store(backend="memory", path=None, ttl=DEFAULT_TTL):
+    if backend == "memory":
+        return SessionStore(MemoryBackend(), ttl)
+    if backend == "sqlite":
+        return SessionStore(SQLiteBackend(path or DEFAULT_SESSIONS_PATH), ttl)
+    raise ValueError(f"Unknown session backend {backend!r} (expected 'memory' or 'sqlite')")
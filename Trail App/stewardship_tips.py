@@ -0,0 +1,25 @@
+# Trail stewardship tips shown on the Eco Actions page, with the prompts for their
+# example images (pre-generated by `prebuild.py --images`).
+
+protection_tips = [
+    {
+        "title": "Pack it out for the Creek",
+        "tip": "Trash left behind can wash into the creek — take yours and a little extra litter back with you to help keep the water clean.",
+        "prompt": "a hiker picking up trash with a reusable bag on a clean creekside forest trail"
+    },
+    {
+        "title": "Snap Smart",
+        "tip": "Snapping the perfect photo? Just zoom in from the trail — no need to wander off-path. Nature looks best when we leave it just as we found it.",
+        "prompt": "a hiker taking a photo of a wildflower while standing on a marked forest trail, respecting nature and staying off sensitive vegetation"
+    },
+    {
+        "title": "Bring a Reusable Bottle",
+        "tip": "A refillable bottle keeps you going — and keeps plastic out of the trail.",
+        "prompt": "a reusable water bottle placed on a rock beside a creek in a natural park"
+    },
+    {
+        "title": "Report Trail Damage",
+        "tip": "If you see flooding, erosion, or fallen trees, take a photo and share it with Santa Clara Valley Water District.",
+        "prompt": "a person taking a photo of a damaged trail next to a creek for reporting"
+    }
+]
@@ -0,0 +1,162 @@
+import base64
+import hashlib
+import io
+import json
+import re
+import time
+from types import SimpleNamespace
+
+# Offline stand-in for the OpenAI client.
+# Returns deterministic, well-formed content shaped like the real responses so the
+# prebuild step (and anything else) can run without network access or an API key.
+
+STOP_THEMES = [
+    ("Creekside Overlook", "a shaded viewpoint above the water"),
+    ("Riparian Boardwalk", "a raised path through willows and reeds"),
+    ("Heron Pond", "a quiet pond popular with wading birds"),
+    ("Oak Meadow", "open grassland framed by valley oaks"),
+    ("Percolation Ponds", "ponds that recharge the groundwater basin"),
+    ("Footbridge Crossing", "a bridge with views up and down the creek"),
+]
+
+
+def _seed(text):
+    return int(hashlib.sha256(text.encode("utf-8")).hexdigest()[:8], 16)
+
+
+def _trail_name(prompt):
+    # The trail is the first quoted argument of every trail_content prompt
+    match = re.search(r'(?:for|describe) the "([^"\n]+)"', prompt, re.IGNORECASE)
+    return match.group(1) if match else "the trail"
+
+
+def _stops_for(prompt):
+    seed = _seed(_trail_name(prompt))
+    count = 4 + seed % 3
+    start = seed % len(STOP_THEMES)
+    return [STOP_THEMES[(start + i) % len(STOP_THEMES)] for i in range(count)]
+
+
+def _overview(prompt):
+    trail = _trail_name(prompt)
+    stops = "\n".join(f"- **{name}**: {desc}" for name, desc in _stops_for(prompt))
+    miles = 3 + _seed(trail) % 9
+    return f"""**Length:** About {miles} miles ({miles * 1.6:.1f} km) one-way.
+
+**Time to Complete:** Roughly {miles * 20} minutes one-way, {miles * 10} minutes to the midpoint and {miles * 40} minutes out-and-back at a moderate pace.
+
+**Difficulty:** Easy – the path is paved or packed gravel and mostly flat along the creek.
+
+**Interesting Facts:**
+- The creek corridor is part of Santa Clara Valley Water's stream stewardship program.
+- Native fish such as steelhead trout have been recorded in the watershed.
+
+**Safety Cautions:**
+- Watch for cyclists sharing the path.
+- Stay back from the banks after storms when the water rises quickly.
+
+**Trail Stops:**
+{stops}
+
+**Virtual Route:** Follow {trail} along the water from the trailhead to the last stop. See [San Jose Trail Maps](https://www.sanjoseca.gov/your-government/departments-offices/parks-recreation-neighborhood-services/planning-development/trail-network/trail-maps).
+"""
+
+
+def _overview_json(prompt):
+    trail = _trail_name(prompt)
+    miles = 3 + _seed(trail) % 9
+    return json.dumps({
+        "length": f"About {miles} miles ({miles * 1.6:.1f} km) one-way.",
+        "time_to_complete": f"Roughly {miles * 20} minutes one-way, {miles * 10} minutes to the midpoint and "
+                            f"{miles * 40} minutes out-and-back at a moderate pace.",
+        "difficulty": {"level": "Easy", "reason": "the path is paved or packed gravel and mostly flat along the creek."},
+        "facts": [
+            "The creek corridor is part of Santa Clara Valley Water's stream stewardship program.",
+            "Native fish such as steelhead trout have been recorded in the watershed.",
+        ],
+        "safety": [
+            "Watch for cyclists sharing the path.",
+            "Stay back from the banks after storms when the water rises quickly.",
+        ],
+        "stops": [{"name": name, "description": desc} for name, desc in _stops_for(prompt)],
+        "route": f"Follow {trail} along the water from the trailhead to the last stop.",
+    })
+
+
+def _stop_detail(prompt):
+    match = re.search(r'for the stop "([^"]+)"', prompt)
+    stop = match.group(1) if match else "this stop"
+    return (
+        f"{stop} sits right beside the creek, where dense native plants filter runoff before it reaches the water "
+        "and shade keeps it cool for fish. Look for western fence lizards sunning on the rocks and California "
+        "buckeye along the banks.\n\n"
+        "- Stay on the marked path so roots that hold the bank together are not trampled.\n"
+        "- Pack out everything you bring in.\n\n"
+        "**Caution:** the bank can be slippery after rain.\n\n"
+        "**Did you know?** A single mature willow can take up hundreds of liters of water on a hot day!"
+    )
+
+
+def respond(prompt, response_format=None):
+    if response_format and response_format.get("type") == "json_object":
+        return _overview_json(prompt)
+    if "for the stop" in prompt:
+        return _stop_detail(prompt)
+    return _overview(prompt)
+
+
+def _usage(prompt, text):
+    usage = SimpleNamespace(prompt_tokens=len(prompt.split()), completion_tokens=len(text.split()))
+    usage.total_tokens = usage.prompt_tokens + usage.completion_tokens
+    return usage
+
+
+def _stream(model, text, delay, usage=None):
+    # Word-sized deltas, shaped like the chunks of a streamed chat completion.
+    for token in re.findall(r"\S+\s*|\s+", text):
+        if delay:
+            time.sleep(delay)
+        delta = SimpleNamespace(role="assistant", content=token)
+        yield SimpleNamespace(model=model, choices=[SimpleNamespace(delta=delta, finish_reason=None)], usage=None)
+    yield SimpleNamespace(model=model, choices=[SimpleNamespace(delta=SimpleNamespace(content=None), finish_reason="stop")],
+                          usage=None)
+    if usage is not None:
+        yield SimpleNamespace(model=model, choices=[], usage=usage)
+
+
+class _Completions:
+    def __init__(self, delay):
+        self.delay = delay
+
+    def create(self, model, messages, stream=False, response_format=None, stream_options=None, **kwargs):
+        prompt = messages[-1]["content"]
+        if not isinstance(prompt, str):
+            prompt = " ".join(part.get("text", "") for part in prompt if part.get("type") == "text")
+        text = respond(prompt, response_format)
+        if stream:
+            include_usage = (stream_options or {}).get("include_usage")
+            return _stream(model, text, self.delay, _usage(prompt, text) if include_usage else None)
+        message = SimpleNamespace(role="assistant", content=text)
+        return SimpleNamespace(model=model, choices=[SimpleNamespace(message=message, finish_reason="stop")],
+                               usage=_usage(prompt, text))
+
+
+class _Images:
+    def generate(self, model, prompt, size="1024x1024", n=1, response_format="url", **kwargs):
+        # A flat colour picked from the prompt, returned inline (the stub has no URLs to serve)
+        from PIL import Image
+        width, height = (int(v) for v in size.split("x"))
+        seed = _seed(prompt)
+        image = Image.new("RGB", (width, height), (seed % 256, (seed >> 8) % 256, (seed >> 16) % 256))
+        buffer = io.BytesIO()
+        image.save(buffer, format="PNG")
+        item = SimpleNamespace(b64_json=base64.b64encode(buffer.getvalue()).decode("ascii"), url=None)
+        return SimpleNamespace(data=[item] * n)
+
+
+class StubClient:
+    # `delay` is the pause before each streamed token, to mimic a slow model.
+    def __init__(self, *args, delay=0.0, **kwargs):
+        self.chat = SimpleNamespace(completions=_Completions(delay))
+        self.images = _Images()
+
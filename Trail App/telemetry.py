@@ -0,0 +1,361 @@
+import contextvars
+import functools
+import logging
+import math
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+# Per-request instrumentation for model calls and heavy steps.
+# A span times one step of a feature ("virtual_trails"/"overview", "reports"/"pdf", ...);
+# the model client adds token counts and cost to whichever span is open around the call.
+# Finished spans are queued to a writer thread that folds them into daily log-scale
+# latency histograms and usage totals, so percentiles are read without keeping every sample.
+# Spans are also exported over OTLP when OTEL_EXPORTER_OTLP_ENDPOINT is set and the
+# OpenTelemetry SDK is installed.
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_TELEMETRY_PATH = os.path.join(APP_DIR, "data", "telemetry.sqlite3")
+BATCH_SIZE = 500
+RETENTION_DAYS = 90
+
+# Histogram buckets grow by 2^(1/4) (~19%) from 1 ms; bucket i holds latencies up to upper_bound(i)
+MIN_LATENCY = 0.001
+GROWTH = 2 ** 0.25
+MAX_BUCKET = 127
+
+# USD per 1K prompt/completion tokens, or per image; update when pricing changes
+PRICES = {
+    "gpt-3.5-turbo": {"prompt": 0.0005, "completion": 0.0015},
+    "gpt-4o": {"prompt": 0.0025, "completion": 0.01},
+    "dall-e-3": {"image": 0.04},
+}
+
+log = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS latency (
+    day TEXT NOT NULL,
+    feature TEXT NOT NULL,
+    step TEXT NOT NULL,
+    cached INTEGER NOT NULL,
+    bucket INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (day, feature, step, cached, bucket)
+);
+CREATE TABLE IF NOT EXISTS usage (
+    day TEXT NOT NULL,
+    feature TEXT NOT NULL,
+    step TEXT NOT NULL,
+    model TEXT NOT NULL,
+    calls INTEGER NOT NULL,
+    errors INTEGER NOT NULL,
+    cache_hits INTEGER NOT NULL,
+    prompt_tokens INTEGER NOT NULL,
+    completion_tokens INTEGER NOT NULL,
+    images INTEGER NOT NULL,
+    cost REAL NOT NULL,
+    seconds REAL NOT NULL,
+    PRIMARY KEY (day, feature, step, model)
+);
+"""
+
+UPSERT_LATENCY = (
+    "INSERT INTO latency (day, feature, step, cached, bucket, count) VALUES (?, ?, ?, ?, ?, ?) "
+    "ON CONFLICT (day, feature, step, cached, bucket) DO UPDATE SET count = count + excluded.count"
+)
+UPSERT_USAGE = (
+    "INSERT INTO usage (day, feature, step, model, calls, errors, cache_hits, prompt_tokens, completion_tokens, "
+    "images, cost, seconds) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+    "ON CONFLICT (day, feature, step, model) DO UPDATE SET calls = calls + excluded.calls, "
+    "errors = errors + excluded.errors, cache_hits = cache_hits + excluded.cache_hits, "
+    "prompt_tokens = prompt_tokens + excluded.prompt_tokens, "
+    "completion_tokens = completion_tokens + excluded.completion_tokens, images = images + excluded.images, "
+    "cost = cost + excluded.cost, seconds = seconds + excluded.seconds"
+)
+
+
+def bucket_for(seconds):
+    if seconds <= MIN_LATENCY:
+        return 0
+    return min(MAX_BUCKET, math.ceil(math.log(seconds / MIN_LATENCY, GROWTH)))
+
+
+def upper_bound(bucket):
+    return MIN_LATENCY * GROWTH ** bucket
+
+
+def cost_of(model, prompt_tokens=0, completion_tokens=0, images=0):
+    price = PRICES.get(model, {})
+    return (prompt_tokens * price.get("prompt", 0) + completion_tokens * price.get("completion", 0)) / 1000 \
+        + images * price.get("image", 0)
+
+
+def percentiles(histogram, quantiles=(0.5, 0.95, 0.99)):
+    """Latency (upper bucket bound) at each quantile of a {bucket: count} histogram."""
+    total = sum(histogram.values())
+    if not total:
+        return [None] * len(quantiles)
+    result = []
+    for q in quantiles:
+        rank, seen = q * total, 0
+        for b in sorted(histogram):
+            seen += histogram[b]
+            if seen >= rank:
+                result.append(upper_bound(b))
+                break
+    return result
+
+
+class Span:
+    __slots__ = ("feature", "step", "model", "started", "clock", "seconds", "cache_hit", "error",
+                 "prompt_tokens", "completion_tokens", "images")
+
+    def __init__(self, feature, step, model=""):
+        self.feature = feature
+        self.step = step
+        self.model = model
+        self.started = time.time()
+        self.clock = time.perf_counter()
+        self.seconds = None
+        self.cache_hit = False
+        self.error = None
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.images = 0
+
+    def add_usage(self, model, usage=None, images=0):
+        """Count tokens from a response's `usage` (and generated images) against this span."""
+        self.model = self.model or model or ""
+        if usage is not None:
+            self.prompt_tokens += getattr(usage, "prompt_tokens", 0) or 0
+            self.completion_tokens += getattr(usage, "completion_tokens", 0) or 0
+        self.images += images
+
+    @property
+    def cost(self):
+        return cost_of(self.model, self.prompt_tokens, self.completion_tokens, self.images)
+
+
+_current = contextvars.ContextVar("telemetry_span", default=None)
+
+
+def current_span():
+    """The innermost open span on this thread, or None."""
+    return _current.get()
+
+
+class Telemetry:
+    def __init__(self, path=DEFAULT_TELEMETRY_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._spans = queue.Queue()
+        self._tracer = _otel_tracer()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn().executescript(SCHEMA)
+        threading.Thread(target=self._writer, name="telemetry-writer", daemon=True).start()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    # --- Recording ---
+    def start(self, feature, step, model=""):
+        """Open a span without binding it to the thread (for generators); call finish() on it."""
+        return Span(feature, step, model)
+
+    def finish(self, span, error=None):
+        if span.seconds is None:
+            span.seconds = time.perf_counter() - span.clock
+        span.error = span.error or error
+        self._spans.put(span)
+        if self._tracer is not None:
+            _export(self._tracer, span)
+
+    def span(self, feature, step, model=""):
+        """Context manager timing the enclosed block; model calls inside it add their usage."""
+        return _SpanContext(self, feature, step, model)
+
+    def record(self, feature, step, seconds, model="", error=None):
+        """Record a duration measured elsewhere (e.g. time a job spent queued)."""
+        span = Span(feature, step, model)
+        span.started -= seconds
+        span.seconds = seconds
+        self.finish(span, error)
+
+    def flush(self):
+        """Block until every span recorded so far is committed."""
+        done = threading.Event()
+        self._spans.put(done)
+        done.wait()
+
+    def _writer(self):
+        conn = self._conn()
+        last_prune = 0.0
+        while True:
+            batch = [self._spans.get()]
+            while len(batch) < BATCH_SIZE:
+                try:
+                    batch.append(self._spans.get_nowait())
+                except queue.Empty:
+                    break
+            spans = [item for item in batch if isinstance(item, Span)]
+            try:
+                if spans:
+                    self._commit(conn, spans)
+                if time.time() - last_prune > 3600:
+                    self._prune(conn)
+                    last_prune = time.time()
+            except Exception:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                log.exception("Dropped %d telemetry spans", len(spans))
+            for item in batch:
+                if isinstance(item, threading.Event):
+                    item.set()
+
+    def _commit(self, conn, spans):
+        latency, usage = {}, {}
+        for s in spans:
+            day = time.strftime("%Y-%m-%d", time.gmtime(s.started))
+            key = (day, s.feature, s.step, int(s.cache_hit), bucket_for(s.seconds))
+            latency[key] = latency.get(key, 0) + 1
+            key = (day, s.feature, s.step, s.model or "")
+            totals = usage.get(key, [0] * 8)
+            for i, value in enumerate((1, s.error is not None, s.cache_hit, s.prompt_tokens, s.completion_tokens,
+                                       s.images, s.cost, s.seconds)):
+                totals[i] += value
+            usage[key] = totals
+        conn.execute("BEGIN IMMEDIATE")
+        conn.executemany(UPSERT_LATENCY, [(*key, count) for key, count in latency.items()])
+        conn.executemany(UPSERT_USAGE, [(*key, *totals) for key, totals in usage.items()])
+        conn.execute("COMMIT")
+
+    def _prune(self, conn):
+        cutoff = time.strftime("%Y-%m-%d", time.gmtime(time.time() - RETENTION_DAYS * 86400))
+        conn.execute("DELETE FROM latency WHERE day < ?", (cutoff,))
+        conn.execute("DELETE FROM usage WHERE day < ?", (cutoff,))
+
+    # --- Reading (for the dashboard) ---
+    def histograms(self, since_day, cached=None):
+        """{(feature, step): {bucket: count}} from `since_day` (YYYY-MM-DD, UTC) onwards."""
+        sql = "SELECT feature, step, bucket, SUM(count) FROM latency WHERE day >= ?"
+        params = [since_day]
+        if cached is not None:
+            sql += " AND cached = ?"
+            params.append(int(cached))
+        result = {}
+        for feature, step, b, count in self._conn().execute(sql + " GROUP BY feature, step, bucket", params):
+            result.setdefault((feature, step), {})[b] = count
+        return result
+
+    def usage(self, since_day):
+        """Rows of (feature, step, model, calls, errors, cache_hits, prompt_tokens, completion_tokens, images,
+        cost, seconds) summed from `since_day` onwards."""
+        return self._conn().execute(
+            "SELECT feature, step, model, SUM(calls), SUM(errors), SUM(cache_hits), SUM(prompt_tokens), "
+            "SUM(completion_tokens), SUM(images), SUM(cost), SUM(seconds) FROM usage WHERE day >= ? "
+            "GROUP BY feature, step, model ORDER BY feature, step, model",
+            (since_day,),
+        ).fetchall()
+
+    def daily_cost(self, since_day):
+        """(day, feature, cost) rows, oldest first."""
+        return self._conn().execute(
+            "SELECT day, feature, SUM(cost) FROM usage WHERE day >= ? GROUP BY day, feature ORDER BY day",
+            (since_day,),
+        ).fetchall()
+
+
+class _SpanContext:
+    def __init__(self, telemetry, feature, step, model):
+        self.telemetry = telemetry
+        self.span = Span(feature, step, model)
+        self._token = None
+
+    def __enter__(self):
+        self._token = _current.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb):
+        _current.reset(self._token)
+        self.telemetry.finish(self.span, error=exc_type and exc_type.__name__)
+        return False
+
+
+def _otel_tracer():
+    if not os.environ.get("OTEL_EXPORTER_OTLP_ENDPOINT"):
+        return None
+    try:
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+    except ImportError:
+        log.warning("OTEL_EXPORTER_OTLP_ENDPOINT is set but the OpenTelemetry SDK is not installed")
+        return None
+    provider = TracerProvider(resource=Resource.create({"service.name": "trail-app"}))
+    provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+    return provider.get_tracer(__name__)
+
+
+def _export(tracer, span):
+    otel_span = tracer.start_span(
+        f"{span.feature}.{span.step}",
+        start_time=int(span.started * 1e9),
+        attributes={
+            "trail_app.feature": span.feature,
+            "trail_app.step": span.step,
+            "trail_app.model": span.model,
+            "trail_app.cache_hit": span.cache_hit,
+            "trail_app.error": span.error or "",
+            "gen_ai.usage.input_tokens": span.prompt_tokens,
+            "gen_ai.usage.output_tokens": span.completion_tokens,
+            "trail_app.cost_usd": span.cost,
+        },
+    )
+    otel_span.end(end_time=int((span.started + span.seconds) * 1e9))
+
+
+_telemetry = None
+_telemetry_lock = threading.Lock()
+
+
+def get_telemetry():
+    """The process-wide telemetry store, created on first use."""
+    global _telemetry
+    if _telemetry is None:
+        with _telemetry_lock:
+            if _telemetry is None:
+                _telemetry = Telemetry()
+    return _telemetry
+
+
+def span(feature, step, model=""):
+    """Time a block against the process-wide store: `with telemetry.span("reports", "pdf"): ...`"""
+    return get_telemetry().span(feature, step, model)
+
+
+def timed(feature, step):
+    """Decorator form of span(): `@telemetry.timed("reports", "pdf")`."""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(feature, step):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def mark_cache_hit():
+    """Flag the open span as served from a cache."""
+    current = _current.get()
+    if current is not None:
+        current.cache_hit = True
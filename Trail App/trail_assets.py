@@ -0,0 +1,144 @@
+"""Build responsive variants of the trail hero images.
+
+Each original in assets/ is resized to a few widths and encoded as WebP, AVIF and
+progressive JPEG under build/assets, with a manifest keyed by trail name. Pages pick the
+smallest variant that fills the layout instead of shipping the full-size original.
+
+Usage (from the repository root):
+    python "Trail App/trail_assets.py"
+"""
+import json
+import logging
+import os
+import sys
+import time
+
+from trail_catalog import get_catalog
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+SOURCE_DIR = os.path.join(APP_DIR, "assets")
+BUILD_DIR = os.path.join(APP_DIR, "build", "assets")
+MANIFEST_PATH = os.path.join(BUILD_DIR, "manifest.json")
+
+WIDTHS = (480, 960, 1440)
+CENTERED_LAYOUT_WIDTH = 960  # Streamlit's centered column is ~700 css px; leave room for 1.5x screens
+ENCODERS = {
+    "avif": {"format": "AVIF", "quality": 55},
+    "webp": {"format": "WEBP", "quality": 78, "method": 6},
+    "jpg": {"format": "JPEG", "quality": 80, "optimize": True, "progressive": True},
+}
+# Served in this order of preference. AVIF is built for consumers that can negotiate it, but
+# st.image cannot send a <picture> fallback, so the page serves WebP.
+PREFERRED_FORMATS = ("webp", "jpg")
+
+log = logging.getLogger(__name__)
+
+
+def build_variants(trail_name, source, out_dir=BUILD_DIR):
+    """Encode every width/format of one source image; returns its manifest entry."""
+    from PIL import Image, ImageOps, features  # only needed when (re)building, not to serve
+
+    image = ImageOps.exif_transpose(Image.open(source)).convert("RGB")
+    slug = os.path.splitext(os.path.basename(source))[0].lower().replace(" ", "-")
+    variants = []
+    for width in WIDTHS:
+        if width > image.width and width != WIDTHS[0]:
+            break
+        resized = image if width >= image.width else image.resize(
+            (width, round(image.height * width / image.width)), Image.Resampling.LANCZOS
+        )
+        for ext, options in ENCODERS.items():
+            if ext == "avif" and not features.check("avif"):
+                continue
+            name = f"{slug}-{resized.width}.{ext}"
+            path = os.path.join(out_dir, name)
+            resized.save(path, **options)
+            variants.append({"file": name, "width": resized.width, "format": ext, "bytes": os.path.getsize(path)})
+    return {
+        "source": os.path.basename(source),
+        "source_mtime": os.path.getmtime(source),
+        "caption": trail_name,
+        "variants": variants,
+    }
+
+
+def available_sources():
+    """{trail: source file} for catalog images present in assets/; a missing one means no image."""
+    sources = {}
+    for trail in get_catalog().trails:
+        if not trail.image:
+            continue
+        if os.path.isfile(os.path.join(SOURCE_DIR, trail.image)):
+            sources[trail.name] = trail.image
+        else:
+            log.warning("Image %r for %s is missing from %s; the trail is shown without one",
+                        trail.image, trail.name, SOURCE_DIR)
+    return sources
+
+
+def build_manifest(out_dir=BUILD_DIR):
+    os.makedirs(out_dir, exist_ok=True)
+    manifest = {
+        trail_name: build_variants(trail_name, os.path.join(SOURCE_DIR, image), out_dir)
+        for trail_name, image in available_sources().items()
+    }
+    with open(os.path.join(out_dir, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def is_stale(manifest):
+    sources = available_sources()
+    if set(sources) != set(manifest):
+        return True
+    for trail_name, entry in manifest.items():
+        source = os.path.join(SOURCE_DIR, sources[trail_name])
+        try:
+            changed = os.path.getmtime(source) != entry["source_mtime"]
+        except OSError:  # removed since available_sources() looked
+            changed = True
+        if entry["source"] != sources[trail_name] or changed:
+            return True
+    return False
+
+
+def load_manifest():
+    """Read the manifest, rebuilding the variants first if they are missing or out of date."""
+    try:
+        with open(MANIFEST_PATH) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        manifest = None
+    if manifest is None or is_stale(manifest):
+        manifest = build_manifest()
+    return manifest
+
+
+def pick_variant(entry, target_width=CENTERED_LAYOUT_WIDTH):
+    """The smallest variant at least `target_width` wide (or the widest there is), in the best format."""
+    for ext in PREFERRED_FORMATS:
+        candidates = sorted((v for v in entry["variants"] if v["format"] == ext), key=lambda v: v["width"])
+        if candidates:
+            fitting = [v for v in candidates if v["width"] >= target_width]
+            return fitting[0] if fitting else candidates[-1]
+    return None
+
+
+def variant_path(variant):
+    return os.path.join(BUILD_DIR, variant["file"])
+
+
+def main():
+    start = time.perf_counter()
+    manifest = build_manifest()
+    for trail_name, entry in manifest.items():
+        source_bytes = os.path.getsize(os.path.join(SOURCE_DIR, entry["source"]))
+        served = pick_variant(entry)
+        print(f"{trail_name}: {source_bytes // 1024} KB original -> {served['bytes'] // 1024} KB "
+              f"{served['format']} at {served['width']} px ({len(entry['variants'])} variants)")
+    print(f"✅ Built trail image variants in {time.perf_counter() - start:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,133 @@
+import bisect
+import csv
+import difflib
+import os
+import threading
+import time
+
+# Trail catalog: every trail the app knows about, loaded from trail_info.csv.
+# Records are __slots__ objects indexed by name and location, with a sorted name list for
+# prefix search. The file is re-read when it changes, checked at most every few seconds.
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CATALOG_PATH = os.path.join(APP_DIR, "trail_info.csv")
+STATE = "CA"
+RELOAD_CHECK_INTERVAL = 5  # seconds
+FUZZY_CUTOFF = 0.75
+
+
+class Trail:
+    __slots__ = ("name", "location", "flower", "animal", "eco_tips", "image")
+
+    def __init__(self, name, location, flower="", animal="", eco_tips="", image=""):
+        self.name = name
+        self.location = location
+        self.flower = flower
+        self.animal = animal
+        self.eco_tips = eco_tips
+        self.image = image
+
+    @property
+    def full_location(self):
+        return f"{self.location}, {STATE}"
+
+    def __repr__(self):
+        return f"Trail({self.name!r}, {self.location!r})"
+
+
+class TrailCatalog:
+    def __init__(self, path=DEFAULT_CATALOG_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._checked = 0.0
+        self._load()
+
+    def _load(self):
+        mtime = os.path.getmtime(self.path)
+        with open(self.path, newline="", encoding="utf-8") as f:
+            trails = [
+                Trail(row["trail_name"].strip(), row["location"].strip(), row.get("flower") or "",
+                      row.get("animal") or "", row.get("eco_tips") or "", row.get("image") or "")
+                for row in csv.DictReader(f)
+                if row.get("trail_name")
+            ]
+        by_name = {trail.name.casefold(): trail for trail in trails}
+        by_location = {}
+        for trail in trails:
+            by_location.setdefault(trail.location.casefold(), []).append(trail)
+        sorted_keys = sorted(by_name)
+        # Swap everything in at once so readers never see a half-built catalog
+        self._trails, self._by_name, self._by_location, self._sorted_keys = trails, by_name, by_location, sorted_keys
+        self._mtime = mtime
+
+    def _maybe_reload(self):
+        now = time.monotonic()
+        if now - self._checked < RELOAD_CHECK_INTERVAL:
+            return
+        with self._lock:
+            self._checked = now
+            try:
+                changed = os.path.getmtime(self.path) != self._mtime
+            except OSError:
+                return
+            if changed:
+                self._load()
+
+    @property
+    def trails(self):
+        """All trails, in file order."""
+        self._maybe_reload()
+        return self._trails
+
+    def get(self, name):
+        self._maybe_reload()
+        return self._by_name.get(name.casefold())
+
+    def at_location(self, location):
+        self._maybe_reload()
+        return self._by_location.get(location.casefold(), [])
+
+    def locations(self):
+        """Distinct locations, in file order."""
+        self._maybe_reload()
+        return list(dict.fromkeys(trail.location for trail in self._trails))
+
+    def search(self, query, limit=20):
+        """Trails whose name starts with `query`, then ones containing it, then close misspellings."""
+        self._maybe_reload()
+        query = query.strip().casefold()
+        if not query:
+            return self._trails[:limit]
+        keys = self._sorted_keys
+        matches = []
+        i = bisect.bisect_left(keys, query)
+        while i < len(keys) and keys[i].startswith(query) and len(matches) < limit:
+            matches.append(keys[i])
+            i += 1
+        if len(matches) < limit:
+            seen = set(matches)
+            matches += [key for key in keys if query in key and key not in seen][:limit - len(matches)]
+        if len(matches) < limit:
+            seen = set(matches)
+            # Compare against the start of each name, so a partly typed, misspelled name still matches
+            scored = sorted(
+                ((difflib.SequenceMatcher(None, query, key[:len(query)]).ratio(), key) for key in keys if key not in seen),
+                reverse=True,
+            )
+            matches += [key for score, key in scored[:limit - len(matches)] if score >= FUZZY_CUTOFF]
+        return [self._by_name[key] for key in matches]
+
+
+_catalog = None
+_catalog_lock = threading.Lock()
+
+
+def get_catalog():
+    """The process-wide catalog, loaded on first use."""
+    global _catalog
+    if _catalog is None:
+        with _catalog_lock:
+            if _catalog is None:
+                _catalog = TrailCatalog()
+    return _catalog
@@ -0,0 +1,451 @@
+import json
+import re
+
+import telemetry
+from llm_cache import make_key
+
+# Prompts and generation helpers shared by the Virtual Trails page and the prebuild step.
+
+MODEL = "gpt-3.5-turbo"
+FEATURE = "virtual_trails"  # telemetry feature name
+
+TRAIL_MAPS_LINK = "[San Jose Trail Maps](https://www.sanjoseca.gov/your-government/departments-offices/parks-recreation-neighborhood-services/planning-development/trail-network/trail-maps)"
+
+DIFFICULTIES = ("Easy", "Moderate", "Hard")
+
+# Shape of the structured overview. gpt-3.5-turbo only supports JSON mode, not
+# strict schemas, so the schema goes into the prompt and validate_overview_data
+# enforces it locally.
+OVERVIEW_SCHEMA = {
+    "type": "object",
+    "required": ["length", "time_to_complete", "difficulty", "facts", "safety", "stops", "route"],
+    "properties": {
+        "length": {"type": "string"},
+        "time_to_complete": {"type": "string"},
+        "difficulty": {
+            "type": "object",
+            "required": ["level", "reason"],
+            "properties": {"level": {"enum": list(DIFFICULTIES)}, "reason": {"type": "string"}},
+        },
+        "facts": {"type": "array", "items": {"type": "string"}},
+        "safety": {"type": "array", "items": {"type": "string"}},
+        "stops": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "required": ["name", "description"],
+                "properties": {"name": {"type": "string"}, "description": {"type": "string"}},
+            },
+        },
+        "route": {"type": "string"},
+    },
+}
+
+
+def overview_prompt(trail_name, location):
+    return f"""
+You are an expert naturalist and urban trail guide.
+
+Generate the following information (4-6 sentences each) for the "{trail_name}" located in {location}:
+1. Total length in miles and kilometers. Give a reasonable estimate for a trail of this name in San Jose.
+2. Approximate times to complete the whole trail (one-way), from start to midpoint, and out-and-back (round trip), assuming moderate-walking pace.
+3. Overall difficulty (Easy/Moderate/Hard) with a brief reason.
+4. 2 interesting facts about the trail or area.
+5. 2-3 safety cautions or environmental hazards to watch for.
+6. Under a bold **Trail Stops:** heading, list 4–6 plausible stop names along the trail, one bullet each, formatted as `- **Stop Name**: short description`.
+7. A 1-2 sentence general description of the virtual route. Add a link to {TRAIL_MAPS_LINK}.
+
+Format with Markdown, using clear bullet points or bold section titles.
+"""
+
+
+def overview_json_prompt(trail_name, location):
+    return f"""
+You are an expert naturalist and urban trail guide.
+
+Describe the "{trail_name}" located in {location}. Respond with a single JSON object matching this JSON schema:
+{json.dumps(OVERVIEW_SCHEMA)}
+
+- length: total length in miles and kilometers (a reasonable estimate for a trail of this name in San Jose).
+- time_to_complete: approximate times one-way, from start to midpoint, and out-and-back, at a moderate walking pace.
+- difficulty: level (Easy/Moderate/Hard) and a brief reason.
+- facts: 2 interesting facts about the trail or area.
+- safety: 2-3 safety cautions or environmental hazards to watch for.
+- stops: 4–6 plausible stops along the trail, each with a short description.
+- route: a 1-2 sentence general description of the virtual route.
+"""
+
+
+def stop_prompt(trail_name, location, stop_name, stop_short_desc):
+    return f"""
+For the "{trail_name}" in {location}, generate a detailed description for the stop "{stop_name}" ({stop_short_desc.strip()}).
+
+Include:
+- How this stop/area supports clean water (ecosystem, habitat, management)
+- At least one notable plant or animal present
+- 1–2 responsible hiking or stewardship tips
+- A trail safety caution if relevant
+- A short fun 'Did you know?' fact
+Write in a friendly, educational tone (100–150 words max).
+"""
+
+
+def validate_overview_data(data):
+    """Check a structured overview against OVERVIEW_SCHEMA; returns a list of problems."""
+    if not isinstance(data, dict):
+        return ["overview is not a JSON object"]
+    errors = []
+    for field in ("length", "time_to_complete", "route"):
+        if not isinstance(data.get(field), str) or not data[field].strip():
+            errors.append(f"{field} is missing or not a string")
+    difficulty = data.get("difficulty")
+    if not isinstance(difficulty, dict) or difficulty.get("level") not in DIFFICULTIES:
+        errors.append(f"difficulty level must be one of {', '.join(DIFFICULTIES)}")
+    elif not isinstance(difficulty.get("reason"), str):
+        errors.append("difficulty reason is not a string")
+    for field in ("facts", "safety"):
+        items = data.get(field)
+        if not isinstance(items, list) or not items or not all(isinstance(i, str) and i.strip() for i in items):
+            errors.append(f"{field} must be a non-empty list of strings")
+    return errors + validate_stops(data.get("stops"))
+
+
+def render_overview(data):
+    """Render a structured overview as the Markdown shown on the page.
+
+    Also renders an overview that is still streaming in: sections not received yet are left out.
+    """
+    def text(value):
+        return value if isinstance(value, str) else None
+
+    def items(value):
+        return [item for item in value if isinstance(item, str)] if isinstance(value, list) else []
+
+    sections = []
+    if text(data.get("length")) is not None:
+        sections.append(f"**Length:** {data['length']}")
+    if text(data.get("time_to_complete")) is not None:
+        sections.append(f"**Time to Complete:** {data['time_to_complete']}")
+    difficulty = data.get("difficulty")
+    if isinstance(difficulty, dict) and text(difficulty.get("level")):
+        sections.append(f"**Difficulty:** {difficulty['level']} – {text(difficulty.get('reason')) or ''}")
+    for field, title in (("facts", "Interesting Facts"), ("safety", "Safety Cautions")):
+        if items(data.get(field)):
+            sections.append(f"**{title}:**\n" + "\n".join(f"- {item}" for item in items(data[field])))
+    stops = [stop for stop in data.get("stops") or [] if isinstance(stop, dict) and text(stop.get("name"))]
+    if stops:
+        sections.append("**Trail Stops:**\n" + "\n".join(
+            f"- **{stop['name']}**: {text(stop.get('description')) or ''}" for stop in stops
+        ))
+    if text(data.get("route")) is not None:
+        sections.append(f"**Virtual Route:** {data['route']} See {TRAIL_MAPS_LINK}.")
+    return "\n\n".join(sections) + "\n"
+
+
+class PartialJSON:
+    """Incremental parser for a JSON document that arrives in pieces (a streamed reply).
+
+    value() returns everything received so far as a Python object, closing the strings and
+    containers that are still open and dropping a key or value that is only half there.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self._closers = []  # what closes each open container, innermost last
+        self._in_string = False
+        self._escaped = False
+        self._safe = None  # (length, closers): a prefix that parses once closed
+
+    def feed(self, chunk):
+        start = len(self.text)
+        self.text += chunk
+        for i in range(start, len(self.text)):
+            char = self.text[i]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char in "{[":
+                self._closers.append("}" if char == "{" else "]")
+                self._safe = (i + 1, "".join(reversed(self._closers)))
+            elif char in "}]":
+                if self._closers:
+                    self._closers.pop()
+                self._safe = (i + 1, "".join(reversed(self._closers)))
+            elif char == ",":
+                self._safe = (i, "".join(reversed(self._closers)))
+
+    def value(self):
+        closers = "".join(reversed(self._closers))
+        # Everything so far, with an open string closed (e.g. a description mid-sentence)
+        attempts = [self.text + ('"' if self._in_string and not self._escaped else "") + closers]
+        if self._safe:
+            attempts.append(self.text[:self._safe[0]] + self._safe[1])
+        for attempt in attempts:
+            try:
+                return json.loads(attempt)
+            except ValueError:
+                continue
+        return None
+
+
+_BULLET = re.compile(r"^\s*(?:[-*•]|\d+[.)])\s+(.*\S)")
+# "**Trail Stops:**", "**Trail Stops**:", "### Trail Stops", "6. **Trail Stops:**"; the
+# heading must be bold or a Markdown heading, so prose that mentions stops does not count
+_STOPS_HEADING = re.compile(
+    r"^\s*(?:\d+[.)]\s+)?(?:#{1,6}\s*(?:\*\*|__)?|\*\*|__)\s*(?:Trail\s+)?Stops\s*:?\s*(?:\*\*|__)?\s*:?\s*$",
+    re.IGNORECASE,
+)
+_BOLD_NAME = re.compile(r"^(?:\*\*|__)(.+?)(?:\*\*|__)\s*(?:[:\-–—]\s*)?(.*)$")
+_SEPARATOR = re.compile(r"\s*:\s*|\s+[-–—]\s+")
+
+
+def _split_stop(text):
+    bold = _BOLD_NAME.match(text)
+    if bold:
+        name, description = bold.group(1).strip().rstrip(":"), bold.group(2)
+    else:
+        parts = _SEPARATOR.split(text, maxsplit=1)
+        name, description = parts if len(parts) == 2 else (text, "")
+    return {"name": name.replace("**", "").replace("__", "").strip(),
+            "description": description.replace("**", "").replace("__", "").strip()}
+
+
+def parse_markdown_stops(markdown):
+    """Pull the stop list out of a Markdown overview.
+
+    Reads the bullets under a bold or `#` "Trail Stops:" heading, e.g. "**Trail Stops:**"
+    followed by "- **Stop Name**: short description" (":", "-", "–" and "—" all separate the
+    name from the description). Returns [] when there is no such heading.
+    """
+    stops = []
+    in_section = False
+    indent = None
+    for line in markdown.splitlines():
+        if not in_section:
+            in_section = _STOPS_HEADING.match(line) is not None
+            continue
+        bullet = _BULLET.match(line)
+        if bullet:
+            depth = len(line) - len(line.lstrip())
+            if indent is None:
+                indent = depth
+            if depth == indent:
+                stops.append(_split_stop(bullet.group(1)))
+            elif depth < indent:
+                break
+            # deeper bullets are notes under a stop, not stops
+        elif line.strip() and stops:
+            break
+    return stops
+
+
+def complete(client, cache, prompt, temperature, max_tokens, trail=None, step="completion", validate=None,
+             **kwargs):
+    """Run a chat completion, going through the response cache when one is given.
+
+    Extra keyword arguments (e.g. response_format) go straight to the API; they must
+    be reflected in the prompt, since the cache key does not include them. The call is
+    timed as telemetry step `step`. With `validate` (text -> list of problems), a reply
+    with problems is returned but not cached, so the next load asks again.
+    """
+    key = make_key(MODEL, prompt, temperature, max_tokens)
+    with telemetry.span(FEATURE, step, MODEL):
+        if cache is not None:
+            cached = cache.get(key)
+            if cached is not None:
+                telemetry.mark_cache_hit()
+                return cached
+        text = client.chat.completions.create(
+            model=MODEL,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=temperature,
+            max_tokens=max_tokens,
+            **kwargs
+        ).choices[0].message.content
+    if cache is not None and not (validate and validate(text)):
+        cache.set(key, text, trail=trail, model=MODEL)
+    return text
+
+
+def stream(client, cache, prompt, temperature, max_tokens, trail=None, step="completion", validate=None,
+           **kwargs):
+    """Yield the completion text as it streams in; the full text is cached once the stream ends.
+
+    A cache hit is yielded as a single chunk. The whole stream is timed as telemetry step `step`.
+    `validate` and extra keyword arguments are as in complete().
+    """
+    key = make_key(MODEL, prompt, temperature, max_tokens)
+    recorder = telemetry.get_telemetry()
+    span, error = recorder.start(FEATURE, step, MODEL), None
+    try:
+        if cache is not None:
+            cached = cache.get(key)
+            if cached is not None:
+                span.cache_hit = True
+                yield cached
+                return
+        parts = []
+        for chunk in client.chat.completions.create(
+            model=MODEL,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=temperature,
+            max_tokens=max_tokens,
+            stream=True,
+            stream_options={"include_usage": True},
+            **kwargs
+        ):
+            # With include_usage the last chunk has no choices, only the token counts
+            if getattr(chunk, "usage", None):
+                span.add_usage(MODEL, chunk.usage)
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if delta:
+                parts.append(delta)
+                yield delta
+        text = "".join(parts)
+        if cache is not None and not (validate and validate(text)):
+            cache.set(key, text, trail=trail, model=MODEL)
+    except GeneratorExit:
+        raise  # the page stopped reading (e.g. a rerun); not an error
+    except Exception as e:
+        error = type(e).__name__
+        raise
+    finally:
+        recorder.finish(span, error)
+
+
+def generate_overview(client, cache, trail_name, location):
+    """Return (overview Markdown, stops) for a trail from one structured model call.
+
+    A reply that does not validate is not cached. It is repaired locally if it can be (see
+    _overview_from_reply); only if that fails is a Markdown overview asked for instead.
+    """
+    raw = complete(
+        client, cache, overview_json_prompt(trail_name, location), 0.7, 900, trail=trail_name, step="overview",
+        validate=_overview_errors, response_format={"type": "json_object"}
+    )
+    return _overview_from_reply(raw) or _markdown_overview(client, cache, trail_name, location)
+
+
+def _load_overview(raw):
+    """The JSON object in a reply, tolerating code fences, surrounding prose and truncation."""
+    start = raw.find("{")
+    if start < 0:
+        return None
+    parser = PartialJSON()
+    parser.feed(raw[start:])
+    return parser.value()
+
+
+def _overview_errors(raw):
+    try:
+        data = json.loads(raw)
+    except ValueError:
+        return ["reply is not JSON"]
+    return validate_overview_data(data)
+
+
+def _overview_from_reply(raw):
+    """(overview Markdown, stops) from a structured reply, or None if it cannot be used.
+
+    A reply that does not validate is still used when its stops do: the sections that are
+    missing or malformed are left out. A Markdown reply (the JSON format was ignored) is
+    used when it has a stop list.
+    """
+    data = _load_overview(raw)
+    if isinstance(data, dict) and not validate_stops(data.get("stops")):
+        return render_overview(data), data["stops"]
+    stops = parse_markdown_stops(raw)
+    if not validate_stops(stops):
+        return raw, stops
+    return None
+
+
+def _markdown_stop_errors(markdown):
+    return validate_stops(parse_markdown_stops(markdown))
+
+
+def _markdown_overview(client, cache, trail_name, location):
+    markdown = complete(client, cache, overview_prompt(trail_name, location), 0.7, 900, trail=trail_name,
+                        step="overview", validate=_markdown_stop_errors)
+    return markdown, parse_markdown_stops(markdown)
+
+
+class OverviewStream:
+    """The structured overview, streamed: iterate for Markdown snapshots, then call result().
+
+    Each snapshot is the whole overview rendered from the JSON received so far, so it replaces
+    the previous one on the page. The reply is cached, if it validates, under the same key
+    generate_overview() uses.
+    """
+
+    def __init__(self, client, cache, trail_name, location):
+        self.client = client
+        self.cache = cache
+        self.trail_name = trail_name
+        self.location = location
+        self._json = PartialJSON()
+
+    def __iter__(self):
+        for chunk in stream(
+            self.client, self.cache, overview_json_prompt(self.trail_name, self.location), 0.7, 900,
+            trail=self.trail_name, step="overview", validate=_overview_errors,
+            response_format={"type": "json_object"}
+        ):
+            self._json.feed(chunk)
+            data = self._json.value()
+            if isinstance(data, dict):
+                yield render_overview(data)
+
+    def result(self):
+        """(overview Markdown, stops) once the stream is done, repaired or replaced as in generate_overview()."""
+        return (_overview_from_reply(self._json.text)
+                or _markdown_overview(self.client, self.cache, self.trail_name, self.location))
+
+
+def generate_stop_detail(client, cache, trail_name, location, stop_name, stop_short_desc):
+    prompt = stop_prompt(trail_name, location, stop_name, stop_short_desc)
+    return complete(client, cache, prompt, 0.7, 300, trail=trail_name, step="stop_detail")
+
+
+def stream_overview(client, cache, trail_name, location):
+    return OverviewStream(client, cache, trail_name, location)
+
+
+def stream_stop_detail(client, cache, trail_name, location, stop_name, stop_short_desc):
+    prompt = stop_prompt(trail_name, location, stop_name, stop_short_desc)
+    return stream(client, cache, prompt, 0.7, 300, trail=trail_name, step="stop_detail")
+
+
+# --- Validation (used by the prebuild step before content is published) ---
+def validate_overview(text):
+    errors = []
+    if not text or len(text.strip()) < 200:
+        errors.append("overview is empty or too short")
+    return errors
+
+
+def validate_stops(stops):
+    if not isinstance(stops, list) or not stops:
+        return ["no stops found"]
+    errors = []
+    for stop in stops:
+        if not isinstance(stop, dict) or not isinstance(stop.get("description"), str):
+            errors.append(f"stop is not a name/description pair: {stop!r}")
+        elif not isinstance(stop.get("name"), str) or not stop["name"].strip():
+            errors.append(f"stop without a name: {stop!r}")
+    if not errors and len({stop["name"] for stop in stops}) != len(stops):
+        errors.append("duplicate stop names")
+    return errors
+
+
+def validate_stop_detail(text):
+    errors = []
+    if not text or len(text.strip()) < 50:
+        errors.append("stop description is empty or too short")
+    return errors
@@ -0,0 +1,455 @@
+"""Semantic search over the trail catalog and the generated trail content.
+
+Answers questions like "which trail has turtles?" or "shade near water" from a local vector
+index, without a model call per query. Documents are the catalog rows (flower, animal,
+eco tips), the published overviews and stop descriptions from the prebuild, and every
+overview and stop description in the response cache.
+
+Embeddings are computed locally by feature hashing: stemmed words and their character
+trigrams are hashed into a fixed-size signed vector and L2-normalized, and query words are
+expanded with a small trail vocabulary (shade -> trees, oaks, canopy; water -> creek, lake
+...). Vectors are appended to a float32 file that is memory-mapped, so loading the index
+costs nothing; a query is one matrix product over it. The index is synced incrementally:
+only documents that are new or whose text changed are embedded, documents whose source is
+gone are dropped, and the vector file is compacted once most of it is unused.
+
+Usage (from the repository root):
+    python "Trail App/trail_search.py" "which trail has turtles?" "shade near water"
+    python "Trail App/trail_search.py" --rebuild
+"""
+import argparse
+import hashlib
+import json
+import math
+import os
+import re
+import shutil
+import sqlite3
+import sys
+import threading
+import time
+import zlib
+
+import numpy as np
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_INDEX_DIR = os.path.join(APP_DIR, ".cache", "search")
+DIM = 1024
+ROW_BYTES = DIM * 4  # float32
+TRIGRAM_WEIGHT = 0.3
+CONCEPT_WEIGHT = 0.5
+MIN_SCORE = 0.12
+CANDIDATES_PER_HIT = 20
+RELATIVE_CUTOFF = 0.5  # hits scoring under this fraction of the best one are noise
+COMPACT_MIN_ORPHANS = 256  # compact once this many (and more than the live) vector rows are unused
+SYNC_INTERVAL = 10  # seconds between incremental syncs triggered by queries
+REFRESH_INTERVAL = 2  # seconds between checks for documents added by other processes
+
+_WORD = re.compile(r"[a-z0-9]+")
+_SENTENCE = re.compile(r"(?<=[.!?])\s+|\n+")
+_LINK = re.compile(r"\[([^\]]*)\]\([^)]*\)|https?://\S+")
+STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from has have how i in is it its me near of on or "
+    "some that the there this to trail trails was what where which who with you your".split()
+)
+
+# What trail content tends to say for words visitors search with (query side only)
+CONCEPTS = {
+    "shade": "shaded shady trees canopy oak oaks sycamore sycamores willow woodland redwood redwoods cool",
+    "water": "creek river lake reservoir pond stream riparian marsh wetland bay",
+    "wildlife": "birds animals deer herons egrets fish turtles habitat",
+    "bird": "birds herons egrets hawks ducks owls birdwatching",
+    "flower": "wildflowers bloom blooms poppies lupine spring",
+    "family": "easy flat paved kids stroller playground",
+    "kid": "easy flat paved family playground",
+    "dog": "dogs leashed leash pets",
+    "bike": "bikes biking cycling bicycle paved",
+    "view": "views vista overlook scenic summit hill",
+    "fish": "trout salmon steelhead spawning",
+    "quiet": "peaceful secluded calm",
+}
+
+
+def stem(word):
+    """A light plural/-ing stemmer; enough to match 'turtles' with 'turtle'."""
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 4 and word.endswith("ing"):
+        return word[:-3]
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+def terms(text):
+    text = _LINK.sub(r"\1", text)  # keep link text, drop URLs
+    return [stem(word) for word in _WORD.findall(text.lower()) if word not in STOPWORDS]
+
+
+def _features(text, expand):
+    weights = {}
+    words = [(word, 1.0) for word in terms(text)]
+    if expand:
+        words += [(stem(extra), CONCEPT_WEIGHT) for word, _ in words for extra in CONCEPTS.get(word, "").split()]
+    for word, weight in words:
+        weights["w:" + word] = weights.get("w:" + word, 0.0) + weight
+        padded = f"^{word}$"
+        for i in range(len(padded) - 2):
+            gram = "g:" + padded[i:i + 3]
+            weights[gram] = weights.get(gram, 0.0) + weight * TRIGRAM_WEIGHT
+    return weights
+
+
+def embed(texts, expand=False):
+    """L2-normalized (len(texts), DIM) float32 embeddings; `expand` adds CONCEPTS (for queries)."""
+    vectors = np.zeros((len(texts), DIM), dtype=np.float32)
+    for row, text in enumerate(texts):
+        for feature, weight in _features(text, expand).items():
+            h = zlib.crc32(feature.encode("utf-8"))  # stable across processes, unlike hash()
+            vectors[row, h % DIM] += math.sqrt(weight) if h & 0x80000000 else -math.sqrt(weight)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    np.divide(vectors, norms, out=vectors, where=norms > 0)
+    return vectors
+
+
+def snippet(text, query_terms, limit=220):
+    """The sentence of `text` sharing the most terms with the query."""
+    sentences = [s.strip(" -*#") for s in _SENTENCE.split(text) if s.strip(" -*#")]
+    if not sentences:
+        return ""
+    best = max(sentences, key=lambda s: len(query_terms.intersection(terms(s))))
+    best = best.replace("**", "")
+    return best if len(best) <= limit else best[:limit - 1].rstrip() + "…"
+
+
+class Hit:
+    __slots__ = ("trail", "kind", "item", "score", "snippet")
+
+    def __init__(self, trail, kind, item, score, snippet):
+        self.trail = trail
+        self.kind = kind
+        self.item = item
+        self.score = score
+        self.snippet = snippet
+
+    def __repr__(self):
+        return f"Hit({self.trail!r}, {self.kind!r}, {self.score:.3f})"
+
+
+# --- Documents from each source: (slot, trail, kind, item, text) ---
+def catalog_docs(catalog):
+    for t in catalog.trails:
+        # No field labels: "Flowers:" in every row would match every trail
+        text = f"{t.name}, {t.full_location}. {t.flower}. {t.animal}. {t.eco_tips}."
+        yield f"catalog:{t.name}", t.name, "catalog", "", text
+
+
+def content_docs(store):
+    for trail, kind, item, body in store.items():
+        yield f"build:{kind}:{trail}:{item}", trail, kind, item, body
+
+
+def cache_docs(entries):
+    """Overviews and stop descriptions from response cache rows (key, trail, response, created)."""
+    import trail_content
+
+    for key, trail, response, _ in entries:
+        kind, text = "stop", response
+        try:
+            data = json.loads(response)
+        except ValueError:
+            data = None
+        if data is not None:
+            if trail_content.validate_overview_data(data):
+                continue  # not an overview we could show
+            kind, text = "overview", trail_content.render_overview(data)
+        elif trail_content.parse_markdown_stops(response):
+            kind = "overview"
+        yield f"cache:{key}", trail, kind, "", text
+
+
+class SearchIndex:
+    """Documents in SQLite, their vectors in a memory-mapped float32 file (row = doc.vec).
+
+    Changed and removed documents leave unused rows in the vector file until compact()
+    rewrites it as a new generation; readers switch files when they see the new generation.
+    """
+
+    def __init__(self, path=DEFAULT_INDEX_DIR):
+        self.path = path
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self._lock = threading.Lock()
+        os.makedirs(path, exist_ok=True)
+        self._conn().executescript(
+            """
+            CREATE TABLE IF NOT EXISTS docs (
+                vec INTEGER PRIMARY KEY,
+                slot TEXT NOT NULL UNIQUE,
+                digest TEXT NOT NULL,
+                trail TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                item TEXT NOT NULL,
+                text TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS meta (
+                id INTEGER PRIMARY KEY CHECK (id = 0),
+                generation INTEGER NOT NULL
+            );
+            INSERT OR IGNORE INTO meta (id, generation) VALUES (0, 0);
+            """
+        )
+        self._signature = None
+        self._checked = 0.0
+        self._view = None
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(os.path.join(self.path, "docs.sqlite3"), timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def vectors_path(self, generation):
+        return os.path.join(self.path, "vectors.f32" if generation == 0 else f"vectors.{generation}.f32")
+
+    def _generation(self, conn):
+        return conn.execute("SELECT generation FROM meta").fetchone()[0]
+
+    def add(self, docs):
+        """Embed and store every doc whose slot is new or whose text changed; returns how many."""
+        docs = {doc[0]: doc for doc in docs}  # the last version of a slot wins
+        digests = {slot: hashlib.sha1(doc[4].encode("utf-8")).hexdigest() for slot, doc in docs.items()}
+        known = dict(self._conn().execute("SELECT slot, digest FROM docs"))
+        changed = [slot for slot in docs if known.get(slot) != digests[slot]]
+        if not changed:
+            return 0
+        vectors = embed([docs[slot][4] for slot in changed])
+        with self._write_lock:
+            conn = self._conn()
+            conn.execute("BEGIN IMMEDIATE")  # also serializes appends from other processes
+            try:
+                with open(self.vectors_path(self._generation(conn)), "ab") as f:
+                    start = f.tell() // ROW_BYTES
+                    f.truncate(start * ROW_BYTES)  # drop a partial row left by a crash
+                    f.write(vectors.tobytes())
+                conn.executemany("DELETE FROM docs WHERE slot = ?", [(slot,) for slot in changed])
+                conn.executemany(
+                    "INSERT INTO docs (vec, slot, digest, trail, kind, item, text) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    [(start + i, slot, digests[slot], *docs[slot][1:]) for i, slot in enumerate(changed)],
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        self._checked = 0.0
+        return len(changed)
+
+    def retain(self, slots):
+        """Delete every document whose slot is not in `slots`; returns how many."""
+        conn = self._conn()
+        doomed = [(slot,) for slot, in conn.execute("SELECT slot FROM docs") if slot not in slots]
+        if doomed:
+            with self._write_lock:
+                conn.executemany("DELETE FROM docs WHERE slot = ?", doomed)
+            self._checked = 0.0
+        return len(doomed)
+
+    def orphans(self):
+        """Rows of the vector file no document points at any more."""
+        conn = self._conn()
+        path = self.vectors_path(self._generation(conn))
+        rows = os.path.getsize(path) // ROW_BYTES if os.path.exists(path) else 0
+        return rows - conn.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+
+    def compact(self):
+        """Rewrite the live vectors into a new generation of the file, renumbering the docs."""
+        with self._write_lock:
+            conn = self._conn()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                generation = self._generation(conn)
+                vecs = [vec for vec, in conn.execute("SELECT vec FROM docs ORDER BY vec")]
+                old = np.memmap(self.vectors_path(generation), dtype=np.float32, mode="r",
+                                shape=(os.path.getsize(self.vectors_path(generation)) // ROW_BYTES, DIM))
+                with open(self.vectors_path(generation + 1), "wb") as f:
+                    f.write(np.ascontiguousarray(old[vecs]).tobytes())
+                del old
+                # Ascending order: each new id is <= its old one and no row still holds it
+                conn.executemany("UPDATE docs SET vec = ? WHERE vec = ?", [(i, vec) for i, vec in enumerate(vecs)])
+                conn.execute("UPDATE meta SET generation = ?", (generation + 1,))
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        # Processes still mapping the old file keep it readable until they switch
+        os.remove(self.vectors_path(generation))
+        self._checked = 0.0
+        return len(vecs)
+
+    def _current_view(self):
+        # Re-read the document list when this or another process has changed it. Only the
+        # vector ids and trail names are kept in memory; text is fetched for hits only.
+        now = time.time()
+        if self._view is not None and now - self._checked < REFRESH_INTERVAL:
+            return self._view
+        with self._lock:
+            conn = self._conn()
+            conn.execute("BEGIN")  # the document list and the generation from one snapshot
+            try:
+                signature = conn.execute(
+                    "SELECT COUNT(*), MAX(vec), (SELECT generation FROM meta) FROM docs"
+                ).fetchone()
+                rows = None
+                if signature != self._signature or self._view is None:
+                    rows = conn.execute("SELECT vec, trail FROM docs ORDER BY vec").fetchall()
+            finally:
+                conn.execute("COMMIT")
+            self._checked = now
+            if rows is not None:
+                path = self.vectors_path(signature[2])
+                try:
+                    rows_on_disk = os.path.getsize(path) // ROW_BYTES if rows else 0
+                    vectors = (np.memmap(path, dtype=np.float32, mode="r", shape=(rows_on_disk, DIM))
+                               if rows_on_disk else np.zeros((0, DIM), dtype=np.float32))
+                except FileNotFoundError:
+                    # Compacted again since the snapshot; keep the current view until the next check
+                    self._checked = 0.0
+                    if self._view is None:
+                        return np.zeros((0, DIM), dtype=np.float32), np.zeros(0, dtype=np.int64), []
+                    return self._view
+                vecs = np.fromiter((vec for vec, _ in rows), dtype=np.int64, count=len(rows))
+                self._view = (vectors, vecs, [trail for _, trail in rows])
+                self._signature = signature
+        return self._view
+
+    def __len__(self):
+        return len(self._current_view()[2])
+
+    def search_many(self, queries, k=5, per_trail=1):
+        """Best hits for each query: up to `k` trails, `per_trail` documents each, best first."""
+        vectors, vecs, trails = self._current_view()
+        if not trails:
+            return [[] for _ in queries]
+        # One matrix product scores every query against every document; rows left behind
+        # by documents whose text changed are scored too, then dropped by the vecs lookup
+        scores = (embed(queries, expand=True) @ vectors.T)[:, vecs]
+        # Several documents per trail compete for the top spots, so look further than k
+        candidates = min(len(trails), k * per_trail * CANDIDATES_PER_HIT)
+        results = []
+        for query, doc_scores in zip(queries, scores):
+            top = np.argpartition(-doc_scores, candidates - 1)[:candidates]
+            top = top[np.argsort(-doc_scores[top])]
+            floor = max(MIN_SCORE, float(doc_scores[top[0]]) * RELATIVE_CUTOFF)
+            picked, per = [], {}
+            for i in top:
+                if doc_scores[i] < floor:
+                    break
+                seen = per.get(trails[i], 0)
+                if seen >= per_trail or (not seen and len(per) == k):
+                    continue
+                per[trails[i]] = seen + 1
+                picked.append(i)
+                if len(picked) == k * per_trail:
+                    break
+            results.append(self._hits(query, [(int(vecs[i]), float(doc_scores[i])) for i in picked]))
+        return results
+
+    def _hits(self, query, scored):
+        query_terms = set(terms(query))
+        marks = ",".join("?" * len(scored))
+        docs = {vec: rest for vec, *rest in self._conn().execute(
+            f"SELECT vec, trail, kind, item, text FROM docs WHERE vec IN ({marks})", [vec for vec, _ in scored]
+        )}
+        return [
+            Hit(trail, kind, item, score, snippet(text, query_terms))
+            for (trail, kind, item, text), score in ((docs[vec], score) for vec, score in scored if vec in docs)
+        ]
+
+    def search(self, query, k=5, per_trail=1):
+        return self.search_many([query], k, per_trail)[0]
+
+
+class TrailSearch:
+    """The search index kept in sync with the catalog, the prebuild and the response cache."""
+
+    def __init__(self, catalog, content_store, cache, index=None):
+        self.catalog = catalog
+        self.content_store = content_store
+        self.cache = cache
+        self.index = index if index is not None else SearchIndex()
+        self._sync_lock = threading.Lock()
+        self._content_version = None
+        self._content_slots = set()
+        self._cache_since = 0.0
+        self._synced = 0.0
+
+    def sync(self):
+        """Index whatever is new since the last sync and drop documents whose source is gone.
+
+        Returns the number of documents embedded.
+        """
+        if not self._sync_lock.acquire(blocking=False):
+            return 0  # another thread is already syncing
+        try:
+            docs = list(catalog_docs(self.catalog))
+            version = self.content_store.active_version()
+            if version != self._content_version:
+                content = list(content_docs(self.content_store))
+                docs += content
+                self._content_slots = {doc[0] for doc in content}
+            entries = self.cache.entries(self._cache_since)
+            docs += cache_docs(entries)
+            added = self.index.add(docs)
+            self._content_version = version
+            if entries:
+                self._cache_since = entries[-1][3]
+
+            # Removed trails, older builds, and invalidated, evicted or expired cache entries
+            live = {doc[0] for doc in catalog_docs(self.catalog)} | self._content_slots
+            live |= {f"cache:{key}" for key in self.cache.keys()}
+            self.index.retain(live)
+            orphans = self.index.orphans()
+            if orphans >= COMPACT_MIN_ORPHANS and orphans > len(live):
+                self.index.compact()
+            self._synced = time.time()
+            return added
+        finally:
+            self._sync_lock.release()
+
+    def search(self, query, k=5, per_trail=1):
+        if time.time() - self._synced > SYNC_INTERVAL:
+            self.sync()
+        return self.index.search(query, k, per_trail)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("queries", nargs="*", help="questions to answer")
+    parser.add_argument("-k", type=int, default=5, help="trails per query")
+    parser.add_argument("--rebuild", action="store_true", help="drop the index and embed everything again")
+    args = parser.parse_args()
+
+    from content_store import ContentStore
+    from llm_cache import ResponseCache
+    from trail_catalog import get_catalog
+
+    if args.rebuild:
+        shutil.rmtree(DEFAULT_INDEX_DIR, ignore_errors=True)
+    search = TrailSearch(get_catalog(), ContentStore(), ResponseCache())
+    start = time.perf_counter()
+    added = search.sync()
+    print(f"Index: {len(search.index)} documents ({added} embedded in {time.perf_counter() - start:.2f}s)")
+    for query in args.queries:
+        start = time.perf_counter()
+        hits = search.index.search(query, args.k)
+        print(f"\n{query!r} ({(time.perf_counter() - start) * 1000:.1f} ms)")
+        for hit in hits:
+            print(f"  {hit.score:.2f}  {hit.trail} [{hit.kind}] {hit.snippet}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
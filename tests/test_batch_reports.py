@@ -0,0 +1,109 @@
+import io
+import random
+import zipfile
+
+import pytest
+from PIL import Image
+
+import batch_reports
+import telemetry
+from batch_reports import BatchItem
+from model_client import SharedClient
+from report_index import ReportIndex
+from stub_client import StubClient
+
+
+@pytest.fixture(autouse=True)
+def spans(tmp_path, monkeypatch):
+    monkeypatch.setattr(telemetry, "_telemetry", telemetry.Telemetry(str(tmp_path / "telemetry.sqlite3")))
+
+
+def photo(seed):
+    rng = random.Random(seed)
+    image = Image.new("RGB", (16, 12))
+    image.putdata([tuple(rng.randrange(256) for _ in range(3)) for _ in range(16 * 12)])
+    buffer = io.BytesIO()
+    image.resize((320, 240), Image.Resampling.BICUBIC).save(buffer, format="JPEG")
+    return buffer.getvalue()
+
+
+def zipped(files):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for name, data in files:
+            archive.writestr(name, data)
+    return buffer.getvalue()
+
+
+def test_collect_unpacks_zips_and_skips_non_photos(monkeypatch):
+    monkeypatch.setattr(batch_reports, "MAX_PHOTO_BYTES", 100)
+    archive = zipped([
+        ("patrol/IMG_1.JPG", b"x" * 10),
+        ("patrol/.IMG_2.jpg", b"x"),
+        ("__MACOSX/patrol/._IMG_1.JPG", b"x"),
+        ("patrol/notes.txt", b"x"),
+        ("patrol/huge.jpg", b"x" * 101),
+    ])
+    items = batch_reports.collect([("loose.png", b"y" * 5), ("patrol.zip", archive), ("readme.md", b"z")])
+    assert [item.name for item in items] == ["loose.png", "patrol/IMG_1.JPG"]
+    assert items[1].photo == b"x" * 10
+
+
+@pytest.mark.parametrize("limit, value", [("MAX_PHOTOS", 2), ("MAX_BATCH_BYTES", 25)])
+def test_zip_limits_are_checked_before_decompressing(monkeypatch, limit, value):
+    monkeypatch.setattr(batch_reports, limit, value)
+    archive = zipped([(f"IMG_{i}.jpg", b"x" * 10) for i in range(2)])
+
+    def read(*args, **kwargs):
+        raise AssertionError("a member was decompressed")
+
+    monkeypatch.setattr(zipfile.ZipFile, "read", read)
+    with pytest.raises(ValueError, match="at most"):
+        # One loose photo is already in the batch, so the zip tips it over either limit
+        batch_reports.collect([("first.jpg", b"x" * 10), ("patrol.zip", archive)])
+
+
+def test_analyze_batch_yields_every_item(tmp_path):
+    items = [BatchItem(f"IMG_{i}.jpg", photo(i)) for i in range(3)] + [BatchItem("broken.jpg", b"not a jpeg")]
+    client = SharedClient(StubClient())
+    done = list(batch_reports.analyze_batch(client, ReportIndex(str(tmp_path / "reports.sqlite3")), items,
+                                            "San Jose", workers=4))
+
+    assert sorted(item.name for item in done) == sorted(item.name for item in items)
+    assert all(item.photo is None and item.seconds is not None for item in done)
+    broken = items[-1]
+    assert broken.error.startswith("UnidentifiedImageError") and broken.jpeg is None
+    assert all(item.description and item.jpeg and not item.error for item in items[:-1])
+
+
+class RecordingRenderer:
+    def __init__(self):
+        self.reports = []
+
+    def render(self, **report):
+        self.reports.append(report)
+        return b"%PDF-" + report["description"].encode()
+
+    def render_many(self, reports):
+        self.reports += reports
+        return b"%PDF-merged"
+
+
+def analyzed(name, description, error=None):
+    item = BatchItem(name, None)
+    item.description, item.jpeg, item.error = description, b"jpeg", error
+    return item
+
+
+def test_exports_skip_failed_photos_and_dedupe_names():
+    items = [analyzed("a/IMG_1.jpg", "one"), analyzed("b/IMG_1.jpg", "two"),
+             analyzed("IMG_2.jpg", None, error="ValueError: bad"), analyzed("c/IMG_1.jpeg", "three")]
+    renderer = RecordingRenderer()
+    with zipfile.ZipFile(io.BytesIO(batch_reports.export_zip(renderer, items, "San Jose"))) as archive:
+        assert archive.namelist() == ["IMG_1.pdf", "IMG_1_2.pdf", "IMG_1_3.pdf"]
+        assert archive.read("IMG_1_2.pdf") == b"%PDF-two"
+
+    renderer = RecordingRenderer()
+    batch_reports.export_pdf(renderer, items, "San Jose", comments="Seen at noon")
+    assert [r["description"] for r in renderer.reports] == ["one", "two", "three"]
+    assert {r["comments"] for r in renderer.reports} == {"Seen at noon"}
@@ -0,0 +1,25 @@
+import logging
+
+import bootstrap
+
+
+def test_warm_up_times_every_step_and_logs_failures(caplog):
+    built = []
+
+    def broken():
+        raise KeyError("openai_api_key")
+
+    steps = (
+        ("catalog", lambda: built.append("catalog")),
+        ("model client", broken),
+        ("ledger", lambda: built.append("ledger")),
+    )
+    with caplog.at_level(logging.INFO, logger="bootstrap"):
+        timings = bootstrap.warm_up(steps)
+
+    assert built == ["catalog", "ledger"]
+    assert list(timings) == ["catalog", "model client", "ledger"]
+    assert all(seconds >= 0 for seconds in timings.values())
+    assert "'model client' failed" in caplog.text
+    assert "Warm-up finished" in caplog.text
+
@@ -0,0 +1,33 @@
+import pytest
+
+from eco_ledger import BadgeLevels, EcoLedger
+
+LEVELS = {"Trail Hero": 50, "Eco Starter": 20, "Green Guardian": 100}
+
+
+@pytest.mark.parametrize("points, earned", [
+    (0, []),
+    (19, []),
+    (20, ["Eco Starter"]),
+    (99, ["Eco Starter", "Trail Hero"]),
+    (100, ["Eco Starter", "Trail Hero", "Green Guardian"]),
+])
+def test_badges_earned(points, earned):
+    assert BadgeLevels(LEVELS).earned(points) == earned
+
+
+def test_next_badge():
+    badges = BadgeLevels(LEVELS)
+    assert badges.next(0) == ("Eco Starter", 20)
+    assert badges.next(45) == ("Trail Hero", 5)
+    assert badges.next(100) is None
+
+
+def test_leaderboard_shows_handles(tmp_path):
+    ledger = EcoLedger(str(tmp_path / "ledger.sqlite3"))
+    ledger.record("secret-user-a", [("🗑️ Picked up trash", 10)])
+    ledger.record("secret-user-b", [("🥾 Stayed on trail", 5)])
+    board = ledger.leaderboard()
+    assert [(user, points) for user, _, points in board] == [("secret-user-a", 10), ("secret-user-b", 5)]
+    assert board[0][1] == ledger.handle("secret-user-a")
+    assert all("secret" not in handle for _, handle, _ in board)
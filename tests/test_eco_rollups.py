@@ -0,0 +1,77 @@
+import datetime
+import sqlite3
+
+import pytest
+
+import eco_rollups
+
+UTC = datetime.timezone.utc
+
+
+def ts(*args):
+    return datetime.datetime(*args, tzinfo=UTC).timestamp()
+
+
+EVENTS = [
+    ("ana", "🗑️ Picked up trash", 10, ts(2026, 10, 12, 23, 30), "Alum Rock"),
+    ("ana", "🥾 Stayed on trail", 5, ts(2026, 10, 13, 8), None),
+    ("ben", "🗑️ Picked up trash", 10, ts(2026, 10, 13, 9), "Coyote Creek"),
+    ("ben", "🗑️ Picked up trash", 10, ts(2026, 10, 19, 9), "Alum Rock"),
+    ("cy", "🌱 Planted", 25, ts(2027, 1, 1, 12), "Alum Rock"),
+]
+
+
+def ledger_db():
+    conn = sqlite3.connect(":memory:", isolation_level=None)
+    conn.executescript(
+        "CREATE TABLE events (user TEXT, action TEXT, points INTEGER, created REAL, trail TEXT);"
+        + eco_rollups.SCHEMA
+    )
+    return conn
+
+
+def rollups(conn):
+    return (
+        sorted(conn.execute("SELECT * FROM rollup_actions").fetchall()),
+        sorted(conn.execute("SELECT * FROM rollup_users").fetchall()),
+    )
+
+
+@pytest.mark.parametrize("period, when, label", [
+    ("day", ts(2026, 10, 12, 23, 30), "2026-10-12"),
+    ("week", ts(2026, 10, 12), "2026-W42"),
+    ("week", ts(2027, 1, 1), "2026-W53"),  # ISO year, not calendar year
+    ("all", ts(2026, 10, 12), ""),
+])
+def test_bucket_labels(period, when, label):
+    assert eco_rollups.bucket(period, when) == label
+
+
+def test_backfill_matches_incremental_apply():
+    incremental = ledger_db()
+    incremental.execute("BEGIN")
+    eco_rollups.apply(incremental, EVENTS[:2])
+    eco_rollups.apply(incremental, EVENTS[2:])
+    incremental.execute("COMMIT")
+
+    rebuilt = ledger_db()
+    rebuilt.executemany("INSERT INTO events VALUES (?, ?, ?, ?, ?)", EVENTS)
+    rebuilt.execute("INSERT INTO rollup_users VALUES ('all', '', 'stale', 999)")
+    eco_rollups.backfill(rebuilt)
+
+    assert rollups(rebuilt) == rollups(incremental)
+
+
+def test_queries():
+    conn = ledger_db()
+    eco_rollups.apply(conn, EVENTS)
+
+    assert eco_rollups.top_users(conn, "all", label="") == [("cy", 25), ("ben", 20), ("ana", 15)]
+    assert eco_rollups.top_users(conn, "week", label="2026-W42", k=1) == [("ana", 15)]
+    assert eco_rollups.action_totals(conn, "week", label="2026-W42") == [
+        ("🗑️ Picked up trash", 2, 20), ("🥾 Stayed on trail", 1, 5),
+    ]
+    assert eco_rollups.action_trend(conn, "🗑️ Picked up trash", since="2026-10-13") == [
+        ("2026-10-13", 1), ("2026-10-19", 1),
+    ]
+    assert eco_rollups.trail_totals(conn, "🗑️ Picked up trash") == [("Alum Rock", 2), ("Coyote Creek", 1)]
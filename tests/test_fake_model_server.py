@@ -0,0 +1,59 @@
+import openai
+import pytest
+
+import fake_model_server
+from fake_model_server import LatencyProfile
+from model_client import make_openai_client
+from stub_client import respond
+
+PROMPT = "Describe the Alum Rock Trail in San Jose for a first-time visitor."
+
+
+@pytest.fixture
+def serve():
+    servers = []
+
+    def start(**profile):
+        server = fake_model_server.serve(port=0, profile=LatencyProfile(
+            latency=0, jitter=0, token_delay=0, image_latency=0, **profile))
+        servers.append(server)
+        return server, make_openai_client("test-key", base_url=server.base_url)
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def test_plain_completion(serve):
+    server, client = serve()
+    response = client.chat.completions.create(model="gpt-4o", messages=[{"role": "user", "content": PROMPT}])
+    assert response.choices[0].message.content == respond(PROMPT)
+    assert response.usage.prompt_tokens == len(PROMPT.split())
+    assert server.requests == 1
+
+
+def test_streamed_completions_back_to_back(serve):
+    server, client = serve()
+    for _ in range(2):
+        chunks = list(client.chat.completions.create(
+            model="gpt-4o", messages=[{"role": "user", "content": PROMPT}], stream=True,
+            stream_options={"include_usage": True},
+        ))
+        text = "".join(c.choices[0].delta.content or "" for c in chunks if c.choices)
+        assert text == respond(PROMPT)
+        assert chunks[-1].usage.completion_tokens == len(text.split())
+    assert server.requests == 2
+
+
+def test_images(serve):
+    _, client = serve()
+    result = client.images.generate(model="dall-e-3", prompt="Alum Rock Trail", n=1, response_format="b64_json")
+    assert result.data[0].b64_json
+
+
+def test_errors(serve):
+    _, client = serve(error_rate=1.0)
+    with pytest.raises(openai.InternalServerError) as raised:
+        client.chat.completions.create(model="gpt-4o", messages=[{"role": "user", "content": PROMPT}])
+    assert raised.value.status_code == 503
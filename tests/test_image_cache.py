@@ -0,0 +1,58 @@
+import base64
+import io
+from types import SimpleNamespace
+
+import pytest
+from PIL import Image
+
+import image_cache
+from image_cache import ImageCache
+
+
+def png(color, size=64):
+    buffer = io.BytesIO()
+    Image.new("RGB", (size, size), color).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+class FakeImages:
+    def __init__(self):
+        self.calls = 0
+        self.images = SimpleNamespace(generate=self.generate)
+
+    def generate(self, prompt, **kwargs):
+        self.calls += 1
+        color = sum(map(ord, prompt)) % 256
+        return SimpleNamespace(data=[SimpleNamespace(b64_json=base64.b64encode(png((color, 90, 160))).decode())])
+
+
+def key(name):
+    return image_cache.make_key(image_cache.MODEL, name, image_cache.SIZE, image_cache.QUALITY)
+
+
+def test_repeat_request_is_served_from_disk(tmp_path):
+    cache, client = ImageCache(str(tmp_path)), FakeImages()
+    first = image_cache.cached_image(cache, client, "a creek", width=300)
+    assert image_cache.cached_image(cache, client, "a creek", width=300) == first
+    assert client.calls == 1 and first.endswith("512.webp")  # the smallest variant at least 300 px wide
+
+
+def test_least_recently_used_image_is_evicted(tmp_path):
+    cache = ImageCache(str(tmp_path))
+    cache.put(key("a"), "a", png("red"))
+    size = cache._conn().execute("SELECT size FROM images").fetchone()[0]
+    cache.max_bytes = int(size * 2.5)
+    cache.put(key("b"), "b", png("green"))
+    cache.get(key("a"))  # a is now more recent than b
+    cache.put(key("c"), "c", png("blue"))
+    assert cache.get(key("b")) is None
+    assert cache.get(key("a")) is not None and cache.get(key("c")) is not None
+
+
+@pytest.mark.parametrize("max_bytes", [0, 1])
+def test_image_over_budget_is_still_returned(tmp_path, max_bytes):
+    cache, client = ImageCache(str(tmp_path), max_bytes=max_bytes), FakeImages()
+    first = image_cache.cached_image(cache, client, "first")
+    assert first is not None
+    second = image_cache.cached_image(cache, client, "second")
+    assert second is not None and cache.get(key("first")) is None
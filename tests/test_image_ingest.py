@@ -0,0 +1,69 @@
+import io
+import os
+import random
+
+from PIL import Image
+
+import image_ingest
+from report_index import hamming
+
+
+def encoded(image, fmt, **options):
+    buffer = io.BytesIO()
+    image.save(buffer, format=fmt, **options)
+    buffer.seek(0)
+    return buffer
+
+
+def noise(size):
+    return Image.frombytes("RGB", size, os.urandom(size[0] * size[1] * 3))
+
+
+def test_transparent_png_is_flattened_onto_white():
+    image = Image.new("RGBA", (40, 20), (0, 0, 0, 0))
+    image.paste((200, 30, 30, 255), (0, 0, 20, 20))
+    result = image_ingest.ingest(encoded(image, "PNG")).image()
+    assert result.format == "JPEG" and result.mode == "RGB"
+    assert all(channel > 240 for channel in result.getpixel((30, 10)))   # was transparent
+    assert result.getpixel((5, 10))[0] > 150                              # was opaque red
+
+
+def test_palette_and_greyscale_inputs_become_rgb():
+    for image in (Image.new("P", (16, 16)), Image.new("L", (16, 16), 128), Image.new("CMYK", (16, 16))):
+        assert image_ingest.to_rgb(image).mode == "RGB"
+
+
+def test_large_photo_is_downscaled_to_max_edge():
+    result = image_ingest.ingest(encoded(Image.new("RGB", (4000, 3000), (30, 120, 60)), "JPEG"), max_edge=1000)
+    assert max(result.size) == 1000 and result.size == result.image().size
+
+
+def test_exif_orientation_is_applied_and_metadata_dropped():
+    exif = Image.Exif()
+    exif[0x0112] = 6  # rotate 90° clockwise to display
+    result = image_ingest.ingest(encoded(Image.new("RGB", (60, 20), (10, 10, 10)), "JPEG", exif=exif.tobytes()))
+    assert result.size == (20, 60)
+    assert not result.image().getexif()
+
+
+def test_quality_steps_down_until_the_budget_fits():
+    image = noise((300, 300))
+    sizes = [len(image_ingest.encode_within_budget(image, 0, qualities=(q,))) for q in (88, 40)]
+    budget = (sizes[0] + sizes[1]) // 2
+    data = image_ingest.encode_within_budget(image, budget)
+    assert len(data) <= budget < sizes[0]
+
+
+def test_budget_too_small_falls_back_to_the_lowest_quality():
+    image = noise((200, 200))
+    lowest = image_ingest.encode_within_budget(image, 0, qualities=image_ingest.QUALITY_STEPS[-1:])
+    assert image_ingest.encode_within_budget(image, 1) == lowest
+
+
+def test_dhash_is_stable_under_recompression_and_resizing():
+    image = Image.frombytes("RGB", (16, 12), random.Random(3).randbytes(16 * 12 * 3)).resize(
+        (400, 300), Image.Resampling.BICUBIC)  # smooth, random-looking scenery
+    original = image_ingest.dhash(image)
+    recompressed = Image.open(encoded(image.resize((200, 150)), "JPEG", quality=40))
+    assert hamming(original, image_ingest.dhash(recompressed)) <= 4
+    assert hamming(original, image_ingest.dhash(image.transpose(Image.Transpose.FLIP_LEFT_RIGHT))) > 10
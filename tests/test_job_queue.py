@@ -0,0 +1,87 @@
+import time
+
+import pytest
+
+from job_queue import DONE, FAILED, QUEUED, RUNNING, JobQueue
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return JobQueue(str(tmp_path / "jobs.sqlite3"), max_attempts=2, lease=0.05)
+
+
+def test_idempotency_key_returns_existing_job(queue):
+    first = queue.submit("report", {"n": 1}, idempotency_key="photo-1")
+    assert queue.submit("report", {"n": 1}, idempotency_key="photo-1") == first
+    assert queue.submit("report", {"n": 1}) != first
+
+
+def test_retry_then_fail(queue):
+    job_id = queue.submit("report", {})
+    job = queue.claim()
+    assert job["id"] == job_id and job["attempts"] == 1
+    assert queue.retry_or_fail(job_id, job["attempts"], "boom") == QUEUED
+    assert queue.claim() is None  # backing off
+    queue._conn().execute("UPDATE jobs SET run_after = 0")
+    job = queue.claim()
+    assert job["attempts"] == 2
+    assert queue.retry_or_fail(job_id, job["attempts"], "boom again") == FAILED
+    assert queue.get(job_id)["status"] == FAILED
+
+
+def test_resubmitting_failed_work_starts_over(queue):
+    job_id = queue.submit("report", {}, idempotency_key="photo-1")
+    for _ in range(2):
+        queue.retry_or_fail(job_id, queue.claim()["attempts"], "boom")
+        queue._conn().execute("UPDATE jobs SET run_after = 0")
+    assert queue.submit("report", {}, idempotency_key="photo-1") == job_id
+    job = queue.get(job_id)
+    assert (job["status"], job["attempts"], job["error"]) == (QUEUED, 0, None)
+
+
+def test_expired_lease_is_reclaimed_until_max_attempts(queue):
+    job_id = queue.submit("report", {})
+    assert queue.claim()["attempts"] == 1
+    assert queue.claim() is None  # still leased
+    time.sleep(0.1)
+    assert queue.claim()["attempts"] == 2
+    assert queue.get(job_id)["status"] == RUNNING
+    time.sleep(0.1)
+    assert queue.claim() is None
+    job = queue.get(job_id)
+    assert job["status"] == FAILED and "Lease expired" in job["error"]
+
+
+def test_prune_removes_only_finished_jobs(queue):
+    done = queue.submit("report", {})
+    job = queue.claim()
+    queue.complete(job["id"], job["attempts"], {"ok": True})
+    waiting = queue.submit("report", {})
+    assert queue.get(done)["status"] == DONE
+    assert queue.prune(older_than=60) == 0
+    assert queue.prune(older_than=0) == 1
+    assert queue.get(done) is None and queue.get(waiting)["status"] == QUEUED
+
+
+def test_resubmitting_after_lease_expiry_stores_the_new_attachment(queue):
+    job_id = queue.submit("report", {"n": 1}, attachment=b"photo", idempotency_key="photo-1")
+    for _ in range(2):
+        queue.claim()
+        time.sleep(0.1)
+    assert queue.claim() is None and queue.get(job_id)["status"] == FAILED
+    assert queue.submit("report", {"n": 2}, attachment=b"photo again", idempotency_key="photo-1") == job_id
+    job = queue.claim()
+    assert (job["id"], job["attachment"], job["payload"]) == (job_id, b"photo again", {"n": 2})
+
+
+def test_stale_worker_cannot_overwrite_a_reclaimed_job(queue):
+    job_id = queue.submit("report", {})
+    stale = queue.claim()
+    time.sleep(0.1)
+    current = queue.claim()
+    assert current["attempts"] == stale["attempts"] + 1
+    assert queue.retry_or_fail(job_id, stale["attempts"], "late failure") is None
+    assert queue.complete(job_id, stale["attempts"], {"stale": True}) is False
+    assert queue.get(job_id)["status"] == RUNNING
+    assert queue.complete(job_id, current["attempts"], {"ok": True}) is True
+    assert queue.get(job_id)["result"] == {"ok": True}
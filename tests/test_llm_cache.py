@@ -0,0 +1,57 @@
+import pytest
+
+import llm_cache
+from llm_cache import ResponseCache, make_key
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(llm_cache.time, "time", lambda: now[0])
+    return now
+
+
+def test_key_covers_every_generation_parameter():
+    base = make_key("gpt-4o", "prompt", 0.7, 300)
+    assert base == make_key("gpt-4o", "prompt", 0.7, 300)
+    assert len({base, make_key("gpt-4o-mini", "prompt", 0.7, 300), make_key("gpt-4o", "prompt!", 0.7, 300),
+                make_key("gpt-4o", "prompt", 0.2, 300), make_key("gpt-4o", "prompt", 0.7, 900)}) == 5
+
+
+def test_entries_expire_after_ttl(tmp_path, clock):
+    cache = ResponseCache(str(tmp_path / "cache.sqlite3"), ttl=60)
+    cache.set("k", "response", trail="Oak Loop")
+    clock[0] += 59
+    assert cache.get("k") == "response"
+    clock[0] += 2
+    assert cache.get("k") is None and cache.keys() == set()
+
+
+def test_least_recently_used_entries_go_past_the_byte_budget(tmp_path, clock):
+    cache = ResponseCache(str(tmp_path / "cache.sqlite3"), max_bytes=25)
+    for key in "abc":
+        clock[0] += 1
+        cache.set(key, key * 10)
+    assert cache.get("a") is None  # 30 bytes stored; the oldest went
+    clock[0] += 1
+    cache.get("b")
+    clock[0] += 1
+    cache.set("d", "d" * 10)
+    assert cache.get("c") is None
+    assert cache.get("b") == "b" * 10 and cache.get("d") == "d" * 10
+
+
+def test_invalidate_trail_drops_only_that_trail(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.sqlite3"))
+    cache.set("overview", "o", trail="Oak Loop")
+    cache.set("stop", "s", trail="Oak Loop")
+    cache.set("other", "x", trail="Guadalupe River Trail")
+    assert cache.invalidate_trail("Oak Loop") == 2
+    assert cache.get("overview") is None and cache.get("stop") is None
+    assert cache.get("other") == "x"
+
+
+def test_cache_is_shared_across_instances(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    ResponseCache(path).set("k", "persisted")
+    assert ResponseCache(path).get("k") == "persisted"
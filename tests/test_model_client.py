@@ -0,0 +1,44 @@
+import threading
+
+from model_client import SharedClient
+from stub_client import StubClient
+
+REQUEST = dict(model="gpt-4o", messages=[{"role": "user", "content": 'Describe the "Oak Loop" located in San Jose'}],
+               stream=True, stream_options={"include_usage": True})
+
+
+def text_and_usage(chunks):
+    chunks = list(chunks)
+    text = "".join(chunk.choices[0].delta.content or "" for chunk in chunks if chunk.choices)
+    return text, sum(1 for chunk in chunks if not chunk.choices)
+
+
+def test_identical_streams_share_one_upstream_call():
+    client = SharedClient(StubClient(delay=0.002))
+    results = []
+    first = client.chat.completions.create(**REQUEST)
+    head = next(first)  # the leader is mid-stream when the others join
+    threads = [threading.Thread(target=lambda: results.append(text_and_usage(client.chat.completions.create(**REQUEST))))
+               for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    leader_text, leader_usage = text_and_usage(first)
+    for thread in threads:
+        thread.join()
+    texts = {head.choices[0].delta.content + leader_text} | {text for text, _ in results}
+    assert len(texts) == 1
+    assert client.upstream_calls == 1 and client.coalesced_calls == 3
+    assert leader_usage + sum(usage for _, usage in results) == 1  # tokens are counted once
+
+
+def test_abandoned_stream_does_not_stall_followers():
+    client = SharedClient(StubClient(delay=0.001))
+    leader = client.chat.completions.create(**REQUEST)
+    next(leader)
+    follower = client.chat.completions.create(**REQUEST)
+    leader.close()
+    assert text_and_usage(follower)[0]
+    assert client.upstream_calls == 1
+    # Once it has finished, the same request starts a fresh stream
+    text_and_usage(client.chat.completions.create(**REQUEST))
+    assert client.upstream_calls == 2
@@ -0,0 +1,70 @@
+from types import SimpleNamespace
+
+import pytest
+
+import stub_client
+import trail_content
+from content_store import ContentStore
+from prebuild import prebuild
+from stub_client import StubClient
+
+TRAILS = [SimpleNamespace(name="Oak Loop", full_location="San Jose, CA"),
+          SimpleNamespace(name="Guadalupe River Trail", full_location="San Jose, CA")]
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ContentStore(str(tmp_path / "content.sqlite3"))
+
+
+def build_status(store, version):
+    return store._conn().execute("SELECT status, note FROM builds WHERE version = ?", (version,)).fetchone()
+
+
+class FailingFor(StubClient):
+    """The stub, except that calls about one trail raise like an unreachable API."""
+
+    def __init__(self, trail):
+        super().__init__()
+        self.trail = trail
+        stub_create = self.chat.completions.create
+
+        def create(**kwargs):
+            if f'"{self.trail}"' in kwargs["messages"][0]["content"]:
+                raise ConnectionError("API unreachable")
+            return stub_create(**kwargs)
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=create))
+
+
+def test_prebuild_publishes_every_trail(store):
+    version, failures = prebuild(StubClient(), store, trails=TRAILS, workers=2)
+    assert failures == {} and store.active_version() == version
+    for trail in TRAILS:
+        stops = store.get_stops(trail.name)
+        assert trail.name in store.get_overview(trail.name)
+        assert trail_content.validate_stops(stops) == []
+        assert all(store.get_stop_detail(trail.name, stop["name"]) for stop in stops)
+
+
+def test_exception_fails_the_build_and_keeps_the_previous_one_live(store):
+    live, _ = prebuild(StubClient(), store, trails=TRAILS, workers=2)
+    version, failures = prebuild(FailingFor("Oak Loop"), store, trails=TRAILS, workers=2)
+    assert list(failures) == ["Oak Loop"] and "ConnectionError" in failures["Oak Loop"][0]
+    status, note = build_status(store, version)
+    assert status == "failed" and "Oak Loop" in note
+    store._active = None
+    assert store.active_version() == live
+
+
+def test_prune_keeps_the_newest_published_builds(store):
+    versions = [prebuild(StubClient(), store, trails=TRAILS[:1])[0] for _ in range(5)]
+    kept = [row[0] for row in store._conn().execute("SELECT DISTINCT version FROM content ORDER BY version")]
+    assert kept == versions[-3:]
+
+
+@pytest.mark.parametrize("name", ["Oak Loop", "Alum Rock Park", "Guadalupe River Trail"])
+def test_stub_reads_the_quoted_trail_name(name):
+    for prompt in (trail_content.overview_prompt(name, "San Jose"),
+                   trail_content.overview_json_prompt(name, "San Jose"),
+                   trail_content.stop_prompt(name, "San Jose", "Heron Pond", "a pond")):
+        assert stub_client._trail_name(prompt) == name
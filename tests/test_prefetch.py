@@ -0,0 +1,79 @@
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from prefetch import StopPrefetcher, make_pool
+
+STOPS = [{"name": f"Stop {i}", "description": f"stop number {i}"} for i in range(6)]
+
+
+class GatedClient:
+    """Answers stop prompts only once `gate` is set, recording which stops were asked for."""
+
+    def __init__(self):
+        self.gate = threading.Event()
+        self.asked = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, messages, **kwargs):
+        prompt = messages[0]["content"]
+        self.asked.append(prompt.split('for the stop "')[1].split('"')[0])
+        self.gate.wait(5)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=f"About {self.asked[-1]}"))])
+
+
+class Store:
+    def __init__(self, prebuilt):
+        self.prebuilt = prebuilt
+
+    def get_stop_detail(self, trail, stop_name):
+        return self.prebuilt.get(stop_name)
+
+
+@pytest.fixture
+def pool():
+    pool = make_pool(4)
+    yield pool
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def test_queues_the_next_stops_and_the_previous_one(pool):
+    client = GatedClient()
+    client.gate.set()
+    prefetcher = StopPrefetcher(pool, client, None, depth=2, max_in_flight=3)
+    prefetcher.prefetch("Oak Loop", "San Jose", STOPS, 2)
+    assert set(prefetcher._futures) == {"Stop 3", "Stop 4", "Stop 1"}
+
+
+def test_respects_max_in_flight_and_skips_prebuilt_stops(pool):
+    client = GatedClient()
+    prefetcher = StopPrefetcher(pool, client, None, Store({"Stop 1": "prebuilt"}), depth=3, max_in_flight=2)
+    prefetcher.prefetch("Oak Loop", "San Jose", STOPS, 0)
+    assert set(prefetcher._futures) == {"Stop 2", "Stop 3"}
+    client.gate.set()
+
+
+def test_hits_and_misses_count_once_per_stop_shown(pool):
+    client = GatedClient()
+    client.gate.set()
+    prefetcher = StopPrefetcher(pool, client, None, depth=1, max_in_flight=2)
+    prefetcher.prefetch("Oak Loop", "San Jose", STOPS, 0)
+    for _ in range(3):  # reruns of the same stop
+        assert prefetcher.get("Oak Loop", "Stop 0") is None
+    for _ in range(3):
+        assert prefetcher.get("Oak Loop", "Stop 1") == "About Stop 1"
+    assert (prefetcher.hits, prefetcher.misses) == (1, 1)
+    prefetcher.get("Oak Loop", "Stop 0")  # navigating back counts again
+    assert (prefetcher.hits, prefetcher.misses) == (1, 2)
+
+
+def test_switching_trails_cancels_queued_work():
+    client = GatedClient()
+    prefetcher = StopPrefetcher(make_pool(1), client, None, depth=2, max_in_flight=2)  # one runs, one queues
+    prefetcher.prefetch("Oak Loop", "San Jose", STOPS, 0)
+    queued = prefetcher._futures["Stop 2"]
+    prefetcher.set_trail("Guadalupe River Trail")
+    client.gate.set()
+    assert queued.cancelled() and prefetcher._futures == {}
+    assert prefetcher.get("Oak Loop", "Stop 1") is None  # results for the old trail are not served
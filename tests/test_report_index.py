@@ -0,0 +1,47 @@
+import random
+
+import pytest
+
+from report_index import DEFAULT_MAX_DISTANCE, ReportIndex
+
+
+@pytest.fixture
+def index(tmp_path):
+    return ReportIndex(str(tmp_path / "reports.sqlite3"))
+
+
+def flip(phash, bits):
+    for bit in bits:
+        phash ^= 1 << bit
+    return phash
+
+
+def test_multi_index_lookup_is_exact(index):
+    rng = random.Random(7)
+    base = rng.getrandbits(64)
+    index.add(base, "San Jose", "Fallen tree")
+    for distance in range(0, 12):
+        for _ in range(20):
+            probe = flip(base, rng.sample(range(64), distance))
+            found = index.find_similar(probe, "San Jose")
+            if distance <= DEFAULT_MAX_DISTANCE:
+                assert found is not None and found["distance"] == distance
+            else:
+                assert found is None
+
+
+def test_lookup_is_per_location(index):
+    index.add(0x0123456789ABCDEF, "San Jose", "Trash")
+    assert index.find_similar(0x0123456789ABCDEF, "Los Gatos") is None
+
+
+def test_closest_report_wins(index):
+    far = index.add(flip(0, range(5)), "San Jose", "far")
+    near = index.add(flip(0, range(2)), "San Jose", "near")
+    assert index.find_similar(0, "San Jose")["id"] == near != far
+    assert index.counts_by_location() == [("San Jose", 2)]
+
+
+def test_max_distance_must_stay_below_bands(tmp_path):
+    with pytest.raises(ValueError):
+        ReportIndex(str(tmp_path / "reports.sqlite3"), max_distance=8)
@@ -0,0 +1,48 @@
+import datetime
+import io
+import re
+
+import pytest
+from PIL import Image
+
+from report_renderer import ReportRenderer
+
+DESCRIPTION = "A fallen oak blocks the path near the café – “cut and clear” it and post a detour. " * 3
+
+
+def pages(pdf):
+    return len(re.findall(rb"/Type\s*/Page\b", pdf))
+
+
+def jpeg():
+    buffer = io.BytesIO()
+    Image.new("RGB", (320, 240), (40, 110, 70)).save(buffer, format="JPEG")
+    return buffer.getvalue()
+
+
+@pytest.fixture(scope="module")
+def renderer():
+    return ReportRenderer()
+
+
+def test_render_handles_unicode_text_and_a_photo(renderer):
+    pdf = renderer.render("San José – Coyote Creek", DESCRIPTION, "Seen on the way to the café", photo=jpeg(),
+                          date=datetime.datetime(2026, 10, 17))
+    assert pdf.startswith(b"%PDF") and pages(pdf) == 1
+    assert b"/Subtype /Image" in pdf
+
+
+def test_renders_do_not_leak_into_the_template(renderer):
+    first = renderer.render("Los Gatos", DESCRIPTION, date=datetime.datetime(2026, 10, 17))
+    renderer.render("San Jose", DESCRIPTION * 20, "long", photo=jpeg())
+    again = renderer.render("Los Gatos", DESCRIPTION, date=datetime.datetime(2026, 10, 17))
+    assert pages(again) == pages(first) == 1
+    assert len(again) == len(first)
+
+
+def test_render_many_puts_each_report_on_its_own_page(renderer):
+    reports = [{"location": f"Stop {i}", "description": DESCRIPTION, "photo": jpeg()} for i in range(4)]
+    merged = renderer.render_many(reports)
+    separate = [renderer.render(**report) for report in reports]
+    assert pages(merged) == 4
+    assert len(merged) < sum(len(pdf) for pdf in separate)  # the font is embedded once
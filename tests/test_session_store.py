@@ -0,0 +1,85 @@
+import pytest
+
+import session_store
+from session_store import MemoryBackend, SessionStore, SQLiteBackend
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_800_000_000.0]
+    monkeypatch.setattr(session_store.time, "time", lambda: now[0])
+    return now
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request, tmp_path):
+    return MemoryBackend() if request.param == "memory" else SQLiteBackend(str(tmp_path / "sessions.sqlite3"))
+
+
+class CountingBackend:
+    def __init__(self, backend):
+        self.backend = backend
+        self.saves = []
+
+    def save(self, tenant, session, values, deleted=()):
+        self.saves.append((set(values), set(deleted)))
+        self.backend.save(tenant, session, values, deleted)
+
+    def __getattr__(self, name):
+        return getattr(self.backend, name)
+
+
+@pytest.mark.parametrize("value", [{"stop": 2, "visited": ["Bridge", "Oak"]}, "ü" * 2000])
+def test_values_round_trip(value):
+    data = session_store.dumps(value)
+    assert session_store.loads(data) == value
+    assert data[:1] == (b"z" if isinstance(value, str) else b"j")
+
+
+def test_only_changed_keys_are_written(backend):
+    counting = CountingBackend(backend)
+    state = SessionStore(counting).open("trails", "sid-1")
+    state.update({"trail": "Alum Rock Trail", "stop": 0})
+    state["stop"] = 0
+    state.update({"trail": "Alum Rock Trail", "stop": 1})
+    del state["trail"]
+
+    assert counting.saves == [({"trail", "stop"}, set()), ({"stop"}, set()), (set(), {"trail"})]
+    reopened = SessionStore(backend).open("trails", "sid-1")
+    assert "trail" not in reopened and reopened["stop"] == 1
+    assert reopened.get("trail", "none") == "none"
+
+
+def test_sessions_are_per_tenant(backend):
+    store = SessionStore(backend)
+    store.open("trails", "sid-1")["stop"] = 3
+    assert "stop" not in store.open("eco", "sid-1")
+    assert "stop" not in store.open("trails", "sid-2")
+
+
+def test_idle_sessions_expire(backend, clock):
+    store = SessionStore(backend, ttl=600)
+    store.open("trails", "idle")["stop"] = 1
+    store.open("trails", "active")["stop"] = 1
+    for _ in range(4):
+        clock[0] += 200
+        assert store.open("trails", "active")["stop"] == 1  # reads keep the session alive
+
+    assert "stop" not in store.open("trails", "idle")
+    assert backend.load("trails", "idle") == ({}, None)
+
+    store.open("trails", "forgotten")["stop"] = 1
+    clock[0] += session_store.SWEEP_INTERVAL + 601
+    store.open("trails", "someone-else")
+    assert backend.load("trails", "forgotten") == ({}, None)
+
+
+def test_sqlite_sessions_are_shared_between_processes(tmp_path):
+    path = str(tmp_path / "sessions.sqlite3")
+    first = session_store.make_store("sqlite", path)
+    second = session_store.make_store("sqlite", path)
+    first.open("trails", "sid-1")["walk"] = {"trail": "Coyote Creek Trail", "stop": 4}
+    assert second.open("trails", "sid-1")["walk"] == {"trail": "Coyote Creek Trail", "stop": 4}
+
+    with pytest.raises(ValueError):
+        session_store.make_store("redis")
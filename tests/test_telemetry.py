@@ -0,0 +1,61 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import telemetry
+from telemetry import Telemetry
+
+
+@pytest.fixture
+def store(tmp_path):
+    return Telemetry(str(tmp_path / "telemetry.sqlite3"))
+
+
+@pytest.mark.parametrize("seconds", [0.0005, 0.0123, 0.8, 4.2, 61.0])
+def test_bucket_upper_bound_is_within_one_step(seconds):
+    b = telemetry.bucket_for(seconds)
+    assert seconds <= telemetry.upper_bound(b) * (1 + 1e-9)
+    assert b == 0 or seconds > telemetry.upper_bound(b - 1)
+
+
+def test_percentiles():
+    histogram = {telemetry.bucket_for(0.1): 90, telemetry.bucket_for(2.0): 9, telemetry.bucket_for(10.0): 1}
+    p50, p95, p99 = telemetry.percentiles(histogram)
+    assert p50 == pytest.approx(0.1, rel=0.2)
+    assert p95 == pytest.approx(2.0, rel=0.2)
+    assert p99 == pytest.approx(2.0, rel=0.2)
+    assert telemetry.percentiles({}) == [None, None, None]
+
+
+def test_spans_record_usage_cost_and_errors(store):
+    with store.span("virtual_trails", "overview") as span:
+        assert telemetry.current_span() is span
+        telemetry.current_span().add_usage("gpt-4o", SimpleNamespace(prompt_tokens=1000, completion_tokens=500))
+    assert telemetry.current_span() is None
+
+    with pytest.raises(TimeoutError):
+        with store.span("virtual_trails", "overview", model="gpt-4o"):
+            raise TimeoutError
+
+    with store.span("virtual_trails", "overview", model="gpt-4o") as span:
+        span.cache_hit = True
+    store.record("reports", "queued", 3.0)
+    store.flush()
+
+    today = time.strftime("%Y-%m-%d", time.gmtime())
+    rows = {row[:3]: row[3:] for row in store.usage(today)}
+    calls, errors, hits, prompt, completion, images, cost, _ = rows["virtual_trails", "overview", "gpt-4o"]
+    assert (calls, errors, hits, prompt, completion, images) == (3, 1, 1, 1000, 500, 0)
+    assert cost == pytest.approx(0.0025 + 0.005)
+    assert rows["reports", "queued", ""][-1] == pytest.approx(3.0)
+
+    assert sum(store.histograms(today)[("virtual_trails", "overview")].values()) == 3
+    assert sum(store.histograms(today, cached=True)[("virtual_trails", "overview")].values()) == 1
+    assert store.histograms(today, cached=True).get(("reports", "queued")) is None
+    assert sorted(store.daily_cost(today)) == [(today, "reports", 0.0), (today, "virtual_trails", pytest.approx(0.0075))]
+
+
+def test_image_cost():
+    assert telemetry.cost_of("dall-e-3", images=2) == pytest.approx(0.08)
+    assert telemetry.cost_of("unknown-model", prompt_tokens=1000) == 0
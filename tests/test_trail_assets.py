@@ -0,0 +1,61 @@
+import os
+
+import pytest
+from PIL import Image
+
+import trail_assets
+from trail_catalog import TrailCatalog
+
+
+@pytest.fixture
+def assets(tmp_path, monkeypatch):
+    source_dir = tmp_path / "assets"
+    source_dir.mkdir()
+    Image.new("RGB", (1200, 800), (40, 120, 60)).save(source_dir / "Alum Rock.jpg")
+    catalog_path = tmp_path / "trail_info.csv"
+    catalog_path.write_text(
+        "trail_name,location,image\n"
+        "Alum Rock Trail,San Jose,Alum Rock.jpg\n"
+        "Penitencia Creek Trail,San Jose,Penitencia.jpg\n"
+        "Guadalupe River Trail,San Jose,\n",
+        encoding="utf-8",
+    )
+    catalog = TrailCatalog(str(catalog_path))
+    monkeypatch.setattr(trail_assets, "get_catalog", lambda: catalog)
+    monkeypatch.setattr(trail_assets, "SOURCE_DIR", str(source_dir))
+    return source_dir
+
+
+def test_missing_images_are_skipped(assets, caplog):
+    assert trail_assets.available_sources() == {"Alum Rock Trail": "Alum Rock.jpg"}
+    assert "Penitencia.jpg" in caplog.text
+
+
+def test_manifest_goes_stale_when_a_source_changes(assets, tmp_path):
+    manifest = trail_assets.build_manifest(str(tmp_path / "build"))
+    entry = manifest["Alum Rock Trail"]
+    # Never upscaled: 1440 is wider than the 1200 px original
+    assert sorted({v["width"] for v in entry["variants"]}) == [480, 960]
+    assert all(os.path.isfile(tmp_path / "build" / v["file"]) for v in entry["variants"])
+    assert not trail_assets.is_stale(manifest)
+
+    source = assets / "Alum Rock.jpg"
+    os.utime(source, (entry["source_mtime"] + 10, entry["source_mtime"] + 10))
+    assert trail_assets.is_stale(manifest)
+
+    manifest = trail_assets.build_manifest(str(tmp_path / "build"))
+    assert not trail_assets.is_stale(manifest)
+    source.unlink()
+    assert trail_assets.is_stale(manifest)
+
+
+def test_pick_variant():
+    entry = {"variants": [
+        {"file": f"a-{width}.{ext}", "width": width, "format": ext}
+        for width in (480, 960, 1440) for ext in ("avif", "webp", "jpg")
+    ]}
+    assert trail_assets.pick_variant(entry)["file"] == "a-960.webp"
+    assert trail_assets.pick_variant(entry, target_width=2000)["file"] == "a-1440.webp"
+    jpeg_only = {"variants": [v for v in entry["variants"] if v["format"] == "jpg"]}
+    assert trail_assets.pick_variant(jpeg_only, target_width=400)["file"] == "a-480.jpg"
+    assert trail_assets.pick_variant({"variants": []}) is None
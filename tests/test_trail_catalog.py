@@ -0,0 +1,65 @@
+import os
+
+import pytest
+
+import trail_catalog
+from trail_catalog import TrailCatalog
+
+CSV = """trail_name,location,flower,animal,eco_tips,image
+Coyote Creek Trail,San Jose,California poppies,Great blue herons,Keep dogs leashed,Coyote Creek.jpeg
+Los Gatos Creek Trail,San Jose,Western sycamores,Steelhead trout,Stay out of the creek,
+Alum Rock Trail,San Jose,,,,
+Rancho San Antonio,Cupertino,,,,
+"""
+
+
+@pytest.fixture
+def catalog_path(tmp_path):
+    path = tmp_path / "trail_info.csv"
+    path.write_text(CSV, encoding="utf-8")
+    return path
+
+
+def names(trails):
+    return [trail.name for trail in trails]
+
+
+def test_lookups(catalog_path):
+    catalog = TrailCatalog(str(catalog_path))
+    assert catalog.get("coyote creek TRAIL").animal == "Great blue herons"
+    assert catalog.get("Nowhere") is None
+    assert names(catalog.at_location("san jose")) == ["Coyote Creek Trail", "Los Gatos Creek Trail", "Alum Rock Trail"]
+    assert catalog.locations() == ["San Jose", "Cupertino"]
+    assert catalog.get("Rancho San Antonio").full_location == "Cupertino, CA"
+
+
+def test_search_ranks_prefix_then_substring_then_fuzzy(catalog_path):
+    catalog = TrailCatalog(str(catalog_path))
+    assert names(catalog.search("  ")) == names(catalog.trails)
+    assert names(catalog.search("al")) == ["Alum Rock Trail"]
+    assert names(catalog.search("creek")) == ["Coyote Creek Trail", "Los Gatos Creek Trail"]
+    assert names(catalog.search("c", limit=1)) == ["Coyote Creek Trail"]
+    assert names(catalog.search("Coyotee Cr"))[0] == "Coyote Creek Trail"
+    assert catalog.search("zzzz") == []
+
+
+def test_reloads_when_the_file_changes(catalog_path, monkeypatch):
+    monkeypatch.setattr(trail_catalog, "RELOAD_CHECK_INTERVAL", 0)
+    catalog = TrailCatalog(str(catalog_path))
+    catalog_path.write_text(CSV + "Almaden Quicksilver,San Jose,,,,\n", encoding="utf-8")
+    mtime = os.path.getmtime(catalog_path) + 10
+    os.utime(catalog_path, (mtime, mtime))
+
+    assert catalog.get("Almaden Quicksilver").location == "San Jose"
+    assert names(catalog.search("al")) == ["Almaden Quicksilver", "Alum Rock Trail"]
+
+
+def test_reload_is_rate_limited(catalog_path, monkeypatch):
+    monkeypatch.setattr(trail_catalog, "RELOAD_CHECK_INTERVAL", 3600)
+    catalog = TrailCatalog(str(catalog_path))
+    catalog.get("Alum Rock Trail")
+    catalog_path.write_text("trail_name,location\n", encoding="utf-8")
+    mtime = os.path.getmtime(catalog_path) + 10
+    os.utime(catalog_path, (mtime, mtime))
+
+    assert catalog.get("Alum Rock Trail") is not None
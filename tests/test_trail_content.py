@@ -0,0 +1,196 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+import trail_content
+
+OVERVIEW = {
+    "length": "About 5 miles (8 km) one-way.",
+    "time_to_complete": "One-way 2 hours; to the midpoint 1 hour; out-and-back 4 hours.",
+    "difficulty": {"level": "Easy", "reason": "Flat and paved."},
+    "facts": ["The creek feeds the percolation ponds.", "Herons nest here."],
+    "safety": ["Watch for cyclists.", "Stay back from the bank."],
+    "stops": [
+        {"name": "Heron Pond", "description": "A quiet pond."},
+        {"name": "Oak Meadow", "description": "Open grassland."},
+    ],
+    "route": "Follows the creek north.",
+}
+
+
+def test_parse_markdown_stops_bold_heading():
+    markdown = (
+        "**Length:** 5 miles\n\n"
+        "**Trail Stops:**\n"
+        "- **Heron Pond**: a quiet pond\n"
+        "- **Oak Meadow**: open grassland\n\n"
+        "**Virtual Route:** north along the creek\n"
+    )
+    assert trail_content.parse_markdown_stops(markdown) == [
+        {"name": "Heron Pond", "description": "a quiet pond"},
+        {"name": "Oak Meadow", "description": "open grassland"},
+    ]
+
+
+@pytest.mark.parametrize("heading", ["### Trail Stops", "## **Stops:**", "6. **Trail Stops:**", "__Trail Stops__:"])
+def test_parse_markdown_stops_heading_forms(heading):
+    stops = trail_content.parse_markdown_stops(f"{heading}\n- **Heron Pond**: a quiet pond\n")
+    assert stops == [{"name": "Heron Pond", "description": "a quiet pond"}]
+
+
+@pytest.mark.parametrize("separator", [":", " -", " –", " —"])
+def test_parse_markdown_stops_separators(separator):
+    markdown = f"**Trail Stops:**\n- Heron Pond{separator} a quiet pond\n- **Oak Meadow**{separator} open grassland\n"
+    assert trail_content.parse_markdown_stops(markdown) == [
+        {"name": "Heron Pond", "description": "a quiet pond"},
+        {"name": "Oak Meadow", "description": "open grassland"},
+    ]
+
+
+def test_parse_markdown_stops_keeps_hyphenated_names():
+    stops = trail_content.parse_markdown_stops("**Trail Stops:**\n- Lake-View Bench - benches by the water\n")
+    assert stops == [{"name": "Lake-View Bench", "description": "benches by the water"}]
+
+
+def test_parse_markdown_stops_ignores_unanchored_mentions():
+    markdown = "The trail stops: near the lake for repairs.\n- **Heron Pond**: a quiet pond\n"
+    assert trail_content.parse_markdown_stops(markdown) == []
+
+
+def test_parse_markdown_stops_ends_at_next_section():
+    markdown = (
+        "**Trail Stops:**\n"
+        "- **Heron Pond**: a quiet pond\n"
+        "  - a nested note\n"
+        "**Safety Cautions:**\n"
+        "- Watch for cyclists\n"
+    )
+    assert [stop["name"] for stop in trail_content.parse_markdown_stops(markdown)] == ["Heron Pond"]
+
+
+def test_parse_markdown_stops_round_trips_rendered_overview():
+    stops = trail_content.parse_markdown_stops(trail_content.render_overview(OVERVIEW))
+    assert stops == OVERVIEW["stops"]
+    assert trail_content.validate_stops(stops) == []
+
+
+def test_validate_overview_data_accepts_complete_overview():
+    assert trail_content.validate_overview_data(OVERVIEW) == []
+
+
+def test_validate_overview_data_rejects_non_object():
+    assert trail_content.validate_overview_data(["not", "an", "object"]) == ["overview is not a JSON object"]
+
+
+@pytest.mark.parametrize("field, value, problem", [
+    ("length", "", "length is missing"),
+    ("route", None, "route is missing"),
+    ("difficulty", {"level": "Extreme", "reason": "x"}, "difficulty level must be one of"),
+    ("difficulty", {"level": "Easy", "reason": 3}, "difficulty reason is not a string"),
+    ("facts", [], "facts must be a non-empty list"),
+    ("safety", ["ok", 1], "safety must be a non-empty list"),
+    ("stops", [], "no stops found"),
+    ("stops", [{"name": "A", "description": "x"}, {"name": "A", "description": "y"}], "duplicate stop names"),
+    ("stops", [{"name": " ", "description": "x"}], "stop without a name"),
+])
+def test_validate_overview_data_reports_problems(field, value, problem):
+    errors = trail_content.validate_overview_data({**OVERVIEW, field: value})
+    assert len(errors) == 1 and errors[0].startswith(problem)
+
+
+def test_partial_json_renders_while_streaming():
+    text = json.dumps(OVERVIEW)
+    parser = trail_content.PartialJSON()
+    seen = []
+    for i in range(0, len(text), 7):
+        parser.feed(text[i:i + 7])
+        seen.append(trail_content.render_overview(parser.value() or {}))
+    assert parser.value() == OVERVIEW
+    assert seen[-1] == trail_content.render_overview(OVERVIEW)
+
+
+class FakeCache:
+    def __init__(self):
+        self.entries = {}
+
+    def get(self, key):
+        return self.entries.get(key)
+
+    def set(self, key, text, trail=None, model=None):
+        self.entries[key] = text
+
+
+class FakeClient:
+    """Answers each chat call with the next canned reply, and counts the calls."""
+
+    def __init__(self, *replies):
+        self.replies = list(replies)
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, stream=False, **kwargs):
+        self.calls += 1
+        text = self.replies.pop(0)
+        if stream:
+            return iter([SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text[i:i + 9]))])
+                         for i in range(0, len(text), 9)])
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=text))])
+
+
+def test_valid_overview_is_cached():
+    cache = FakeCache()
+    client = FakeClient(json.dumps(OVERVIEW))
+    assert trail_content.generate_overview(client, cache, "Oak Loop", "San Jose")[1] == OVERVIEW["stops"]
+    assert trail_content.generate_overview(client, cache, "Oak Loop", "San Jose")[1] == OVERVIEW["stops"]
+    assert client.calls == 1
+
+
+@pytest.mark.parametrize("reply", [
+    json.dumps({**OVERVIEW, "facts": []}),                       # a section fails validation
+    "```json\n" + json.dumps(OVERVIEW)[:-40],                     # fenced and cut off at max_tokens
+    trail_content.render_overview(OVERVIEW),                      # Markdown despite the JSON format
+])
+def test_invalid_reply_is_repaired_locally_and_not_cached(reply):
+    cache = FakeCache()
+    client = FakeClient(reply)
+    overview, stops = trail_content.generate_overview(client, cache, "Oak Loop", "San Jose")
+    assert stops == OVERVIEW["stops"] and "Heron Pond" in overview
+    assert client.calls == 1 and cache.entries == {}
+
+
+def test_unusable_reply_falls_back_to_markdown_once():
+    cache = FakeCache()
+    markdown = trail_content.render_overview(OVERVIEW)
+    client = FakeClient('{"length": "5 miles"}', markdown)
+    assert trail_content.generate_overview(client, cache, "Oak Loop", "San Jose") == (markdown, OVERVIEW["stops"])
+    assert client.calls == 2
+    assert list(cache.entries.values()) == [markdown]  # only the usable Markdown reply
+
+
+def test_streamed_invalid_reply_is_not_cached():
+    cache = FakeCache()
+    client = FakeClient(json.dumps({**OVERVIEW, "safety": "none"}))
+    overview = trail_content.stream_overview(client, cache, "Oak Loop", "San Jose")
+    snapshots = list(overview)
+    assert snapshots and overview.result()[1] == OVERVIEW["stops"]
+    assert client.calls == 1 and cache.entries == {}
+
+
+def test_stream_yields_deltas_and_caches_the_whole_reply():
+    cache = FakeCache()
+    client = FakeClient("A heron wades through the shallows of the creek.")
+    chunks = list(trail_content.stream(client, cache, "prompt", 0.7, 300, trail="Oak Loop"))
+    assert len(chunks) > 1 and "".join(chunks) == "A heron wades through the shallows of the creek."
+    assert list(cache.entries.values()) == ["".join(chunks)]
+    assert list(trail_content.stream(client, cache, "prompt", 0.7, 300)) == ["".join(chunks)]  # one chunk
+    assert client.calls == 1
+
+
+def test_abandoned_stream_is_not_cached():
+    cache = FakeCache()
+    client = FakeClient("A heron wades through the shallows of the creek.")
+    chunks = trail_content.stream(client, cache, "prompt", 0.7, 300)
+    next(chunks)
+    chunks.close()
+    assert cache.entries == {}
@@ -0,0 +1,101 @@
+import pytest
+
+import trail_search
+from trail_catalog import TrailCatalog
+from trail_search import SearchIndex, TrailSearch
+
+CSV = """trail_name,location,flower,animal,eco_tips
+Coyote Creek Trail,San Jose,California poppies,Western pond turtles,Keep dogs leashed near the creek
+Alum Rock Trail,San Jose,Lupine,Red-tailed hawks,Stay on the trail near the mineral springs
+Rancho San Antonio,Cupertino,Buckeye,Black-tailed deer,Carry water on the summit loop
+"""
+
+
+class Content:
+    def __init__(self, version, items):
+        self.version = version
+        self.rows = items
+
+    def active_version(self):
+        return self.version
+
+    def items(self):
+        return list(self.rows)
+
+
+class Cache:
+    def __init__(self):
+        self.rows = []
+
+    def entries(self, since):
+        return [row for row in self.rows if row[3] > since]
+
+    def keys(self):
+        return [row[0] for row in self.rows]
+
+
+@pytest.fixture
+def index(tmp_path):
+    # An explicit path: the default directory is shared with the app, and an empty index is falsy
+    return SearchIndex(str(tmp_path / "search"))
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    path = tmp_path / "trail_info.csv"
+    path.write_text(CSV, encoding="utf-8")
+    return TrailCatalog(str(path))
+
+
+def slots(index):
+    return {slot for slot, in index._conn().execute("SELECT slot FROM docs")}
+
+
+def test_add_embeds_only_new_or_changed_docs(index):
+    docs = [("a", "Alum Rock Trail", "stop", "1", "Mineral springs along the creek."),
+            ("b", "Coyote Creek Trail", "stop", "1", "Turtles bask on logs in the pond.")]
+    assert index.add(docs) == 2
+    assert index.add(docs) == 0
+    assert index.add([("b", "Coyote Creek Trail", "stop", "1", "Herons fish in the shallows.")]) == 1
+    assert len(index) == 2 and index.orphans() == 1
+    assert [hit.trail for hit in index.search("herons")] == ["Coyote Creek Trail"]
+
+
+def test_compact_keeps_results(index):
+    index.add([(f"doc{i}", f"Trail {i}", "stop", "", f"Stop {i} has oaks and a creek.") for i in range(10)])
+    index.add([("doc3", "Trail 3", "stop", "", "Western pond turtles sun on the rocks.")])
+    assert index.retain({f"doc{i}" for i in range(5)}) == 5
+    assert index.orphans() == 6
+    before = [(hit.trail, hit.snippet) for hit in index.search("turtles")]
+
+    assert index.compact() == 5
+    assert index.orphans() == 0
+    assert [(hit.trail, hit.snippet) for hit in index.search("turtles")] == before == [
+        ("Trail 3", "Western pond turtles sun on the rocks.")
+    ]
+    # Another process opening the same directory sees the compacted generation
+    assert [hit.trail for hit in SearchIndex(index.path).search("turtles")] == ["Trail 3"]
+
+
+def test_sync_tracks_every_source(index, catalog, monkeypatch):
+    content = Content(1, [("Alum Rock Trail", "overview", "", "A shaded canyon walk under old oaks.")])
+    cache = Cache()
+    cache.rows.append(("k1", "Rancho San Antonio", "Deer graze in the meadow at dusk.", 10.0))
+    search = TrailSearch(catalog, content, cache, index)
+
+    assert search.sync() == 5
+    assert search.sync() == 0
+    assert search.search("which trail has turtles?")[0].trail == "Coyote Creek Trail"
+    assert search.search("shade")[0].trail == "Alum Rock Trail"
+
+    # A new build replaces the old one's documents; an evicted cache entry is dropped
+    content.version, content.rows = 2, [("Coyote Creek Trail", "overview", "", "Paved and flat for strollers.")]
+    cache.rows = [("k2", "Alum Rock Trail", "Hawks circle over the ridge.", 20.0)]
+    monkeypatch.setattr(trail_search, "COMPACT_MIN_ORPHANS", 1)
+    assert search.sync() == 2
+    assert slots(index) == {
+        "catalog:Coyote Creek Trail", "catalog:Alum Rock Trail", "catalog:Rancho San Antonio",
+        "build:overview:Coyote Creek Trail:", "cache:k2",
+    }
+    assert index.orphans() == 2  # not compacted while most rows are live
+    assert search.search("family friendly")[0].trail == "Coyote Creek Trail"